@@ -19,6 +19,9 @@ DATABASE_URL = os.getenv(
 # Alembic Config object
 config = context.config
 
+# Set by db.init_db when it targets a database other than DATABASE_URL's
+DATABASE_URL = config.attributes.get("database_url", DATABASE_URL)
+
 # Setup Python logging from alembic.ini
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
@@ -0,0 +1,30 @@
+"""Drop properties.mongo_document_id
+
+Revision ID: 3f9c2b7d1e64
+Revises: ec5552485b80
+Create Date: 2026-10-18 22:10:07.331842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2b7d1e64'
+down_revision: Union[str, Sequence[str], None] = 'ec5552485b80'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Mongo documents are keyed by the property id now (db.mongo_migrations rekey-ids)
+    op.drop_column('properties', 'mongo_document_id')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('properties', sa.Column('mongo_document_id', sa.String(length=24), nullable=True))
+    op.create_unique_constraint('properties_mongo_document_id_key', 'properties', ['mongo_document_id'])
@@ -0,0 +1,36 @@
+"""Add properties.search_address and the full-text GIN index
+
+Revision ID: 5e8a2c7f9b14
+Revises: b7e3d91c4a25
+Create Date: 2026-10-19 00:18:52.604117
+
+Existing rows get their address text from `python -m db.mongo_migrations backfill-search`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a2c7f9b14'
+down_revision: Union[str, Sequence[str], None] = 'b7e3d91c4a25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('properties', sa.Column('search_address', sa.Text(), nullable=True))
+    # Must stay identical to app.properties.models.search_vector()
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_properties_search_vector ON properties USING gin (("
+        "setweight(to_tsvector(CAST('english' AS REGCONFIG), title), 'A') || "
+        "setweight(to_tsvector(CAST('english' AS REGCONFIG), coalesce(search_address, '')), 'B')))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_properties_search_vector', table_name='properties', if_exists=True)
+    op.drop_column('properties', 'search_address')
@@ -0,0 +1,32 @@
+"""Add properties.updated_at for incremental exports
+
+Revision ID: 9d41c6a2f0b3
+Revises: 3f9c2b7d1e64
+Create Date: 2026-10-18 23:02:44.918305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d41c6a2f0b3'
+down_revision: Union[str, Sequence[str], None] = '3f9c2b7d1e64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('properties', sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True))
+    op.execute("UPDATE properties SET updated_at = created_at")
+    op.alter_column('properties', 'updated_at', existing_type=sa.TIMESTAMP(), nullable=False)
+    op.create_index('ix_properties_updated_at_id', 'properties', ['updated_at', 'id'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_properties_updated_at_id', table_name='properties', if_exists=True)
+    op.drop_column('properties', 'updated_at')
@@ -0,0 +1,43 @@
+"""Add property_outbox for the SQL -> MongoDB sync worker
+
+Revision ID: b7e3d91c4a25
+Revises: 9d41c6a2f0b3
+Create Date: 2026-10-18 23:41:07.315640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3d91c4a25'
+down_revision: Union[str, Sequence[str], None] = '9d41c6a2f0b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'property_outbox',
+        sa.Column('id', sa.BIGINT(), autoincrement=True, nullable=False),
+        sa.Column('property_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('operation', sa.Enum('insert', 'update', 'delete', name='outbox_operation_enum'), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.TIMESTAMP(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_property_outbox_property_id_id', 'property_outbox', ['property_id', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_property_outbox_property_id_id', table_name='property_outbox')
+    op.drop_table('property_outbox')
+    sa.Enum(name='outbox_operation_enum').drop(op.get_bind(), checkfirst=True)
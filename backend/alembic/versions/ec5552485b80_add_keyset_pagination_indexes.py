@@ -0,0 +1,39 @@
+"""Add keyset pagination indexes to properties
+
+Revision ID: ec5552485b80
+Revises: a0e5ddf568a4
+Create Date: 2026-10-18 20:25:41.512903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ec5552485b80'
+down_revision: Union[str, Sequence[str], None] = 'a0e5ddf568a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pagination orders by (created_at, id), so created_at can no longer be NULL
+    op.execute("UPDATE properties SET created_at = now() WHERE created_at IS NULL")
+    op.alter_column('properties', 'created_at', existing_type=sa.TIMESTAMP(), nullable=False)
+
+    op.create_index('ix_properties_created_at_id', 'properties', ['created_at', 'id'], if_not_exists=True)
+    op.create_index('ix_properties_price_id', 'properties', ['price', 'id'], if_not_exists=True)
+    op.create_index('ix_properties_user_id_created_at_id', 'properties', ['user_id', 'created_at', 'id'], if_not_exists=True)
+    op.create_index('ix_properties_user_id_price_id', 'properties', ['user_id', 'price', 'id'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_properties_user_id_price_id', table_name='properties', if_exists=True)
+    op.drop_index('ix_properties_user_id_created_at_id', table_name='properties', if_exists=True)
+    op.drop_index('ix_properties_price_id', table_name='properties', if_exists=True)
+    op.drop_index('ix_properties_created_at_id', table_name='properties', if_exists=True)
+    op.alter_column('properties', 'created_at', existing_type=sa.TIMESTAMP(), nullable=True)
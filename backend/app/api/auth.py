@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status,Form
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.hashing import HashingBusyError
 from app.core.security import create_access_token
 from db.database import get_db
 from app.users.schemas import Token, UserCreate
@@ -10,13 +11,21 @@ from app.config import settings
 
 router = APIRouter(tags=["auth"])
 
+# Password hashing is admission-limited (app.core.hashing); shed load rather than queue
+def hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins in progress, please retry",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", status_code=status.HTTP_201_CREATED)
 async def register_user(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Check if user already exists
-    existing_user = get_user(db, user_data.email)
+    existing_user = await get_user(db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -24,16 +33,22 @@ async def register_user(
         )
     
     # Create new user
-    user = create_user(db, user_data)
+    try:
+        user = await create_user(db, user_data)
+    except HashingBusyError:
+        raise hashing_busy()
     return {"message": "User created successfully"}
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = authenticate_user(db, email, password)
+    try:
+        user = await authenticate_user(db, email, password)
+    except HashingBusyError:
+        raise hashing_busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
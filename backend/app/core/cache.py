@@ -0,0 +1,195 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats:
+    """Counters shared by every cache backend."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0      # dropped to stay within the size bounds
+        self.expirations = 0    # dropped because the TTL ran out
+        self.invalidations = 0  # removed explicitly via delete()
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hit_ratio, 4),
+        }
+
+
+class LRUCache:
+    """
+    In-process LRU cache of byte strings with a per-entry TTL.
+
+    Bounded by the total size of keys plus values (`max_bytes`) as well as by entry
+    count. Only used from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int, ttl_seconds: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(key) + len(value)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None):
+        if key in self._entries:
+            self._remove(key)
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (self._clock() + ttl, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    async def delete(self, key: str):
+        if key in self._entries:
+            self._remove(key)
+            self.stats.invalidations += 1
+
+    async def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+
+class RedisCache:
+    """
+    Shared cache backed by Redis, for deployments running several workers.
+
+    Requires the optional `redis` package. The byte bound is enforced by the Redis
+    server's own `maxmemory` policy; Redis errors degrade to cache misses.
+    """
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = "realestate:"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("The redis cache backend requires the 'redis' package") from e
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.stats = CacheStats()
+        self._client = redis_asyncio.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = await self._client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Redis cache get failed: {e}")
+            value = None
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        try:
+            await self._client.set(self.prefix + key, value, px=int(ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Redis cache set failed: {e}")
+
+    async def delete(self, key: str):
+        try:
+            await self._client.delete(self.prefix + key)
+            self.stats.invalidations += 1
+        except Exception as e:
+            logger.warning(f"Redis cache delete failed: {e}")
+
+    async def clear(self):
+        try:
+            async for key in self._client.scan_iter(match=self.prefix + "*"):
+                await self._client.delete(key)
+        except Exception as e:
+            logger.warning(f"Redis cache clear failed: {e}")
+
+
+class Generations:
+    """
+    Per-key write counters that stop a slow load from caching what a write replaced.
+
+    A loader reads `current(key)` before fetching and only caches the result if the value
+    is unchanged afterwards; every invalidation calls `bump(key)` first. Values come from
+    one global counter and only the `max_keys` most recently bumped keys are kept. Keys
+    dropped from the table report the highest value dropped so far. A key can therefore
+    look changed when it was not, which only skips one cache fill, but never the other
+    way round. The counters are per process, like the single-flight groups.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._clock = 0
+        self._floor = 0
+        self._keys: "OrderedDict[str, int]" = OrderedDict()
+
+    def current(self, key: str) -> int:
+        return self._keys.get(key, self._floor)
+
+    def bump(self, key: str):
+        self._clock += 1
+        self._keys.pop(key, None)
+        self._keys[key] = self._clock
+        while len(self._keys) > self.max_keys:
+            _, self._floor = self._keys.popitem(last=False)
+
+
+def build_cache(backend: str, ttl_seconds: float, max_bytes: int, max_entries: int,
+                redis_url: Optional[str] = None, prefix: str = "realestate:"):
+    """Create the cache backend named in settings ("memory", "redis" or "none")."""
+    if backend == "none":
+        return None
+    if backend == "redis":
+        if not redis_url:
+            raise RuntimeError("REDIS_URL must be set to use the redis cache backend")
+        return RedisCache(redis_url, ttl_seconds, prefix=prefix)
+    if backend != "memory":
+        raise RuntimeError(f"Unknown cache backend: {backend}")
+    return LRUCache(max_bytes=max_bytes, max_entries=max_entries, ttl_seconds=ttl_seconds)
@@ -0,0 +1,178 @@
+"""
+Password hashing off the event loop.
+
+Hashing and verifying are CPU-bound by design (pbkdf2 with tens of thousands of
+rounds), so running them inline stalls every other request on the loop. They run in a
+dedicated thread pool instead: hashlib's pbkdf2 releases the GIL, so the threads hash
+in parallel without the pickling overhead of a process pool.
+
+Admission is bounded: once PASSWORD_HASH_MAX_PENDING operations are running or queued,
+new ones fail fast with HashingBusyError (a 503 for the client) rather than queueing
+without limit during a login burst.
+
+There is one policy, PASSWORD_HASH_SCHEME at PASSWORD_HASH_ROUNDS. Hashes made under an
+older policy (fewer rounds, or another scheme passlib knows) still verify and are
+re-hashed transparently on the user's next successful login. The CryptContext (and
+passlib with it) is only loaded on first use, keeping it out of the app's import time.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing pool is at its admission limit."""
+
+
+def build_context(scheme: str, rounds: int) -> "CryptContext":
+    from passlib.context import CryptContext
+
+    schemes = list(dict.fromkeys([scheme, "pbkdf2_sha256"]))  # always able to verify the legacy hashes
+    return CryptContext(
+        schemes=schemes,
+        default=scheme,
+        deprecated="auto",  # every scheme but the default is re-hashed on login
+        **{f"{scheme}__default_rounds": rounds, f"{scheme}__min_rounds": rounds},
+    )
+
+
+class HashingStats:
+    """Load on the hashing pool."""
+
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0           # raised (e.g. a malformed stored hash) or cancelled
+        self.rejected = 0         # refused at the admission limit
+        self.rehashed = 0         # legacy hashes upgraded on login
+        self.pending = 0          # running or queued now
+        self.running = 0
+        self.max_queue_depth = 0
+        self.wait_seconds = 0.0   # total time spent queued
+        self.run_seconds = 0.0    # total time spent hashing
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.pending - self.running, 0)
+
+    def as_dict(self) -> Dict[str, Any]:
+        done = (self.completed + self.failed) or 1
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "pending": self.pending,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "avg_wait_ms": round(self.wait_seconds / done * 1000, 3),
+            "avg_run_ms": round(self.run_seconds / done * 1000, 3),
+        }
+
+
+class PasswordHasher:
+    """Runs a CryptContext in a bounded thread pool; `workers=0` hashes inline on the loop."""
+
+    def __init__(self, context_factory: Callable[[], "CryptContext"], workers: int, max_pending: int):
+        self.context_factory = context_factory
+        self._context: Optional["CryptContext"] = None
+        self.workers = workers
+        self.max_pending = max_pending
+        self.stats = HashingStats()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()  # guards the counters updated from the worker threads
+
+    @property
+    def context(self) -> "CryptContext":
+        if self._context is None:
+            self._context = self.context_factory()
+        return self._context
+
+    def _timed(self, fn: Callable, *args, submitted: float):
+        started = time.perf_counter()
+        with self._lock:
+            self.stats.running += 1
+            self.stats.wait_seconds += started - submitted
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.stats.running -= 1
+                self.stats.run_seconds += time.perf_counter() - started
+
+    async def _submit(self, fn: Callable, *args):
+        if self.stats.pending >= self.max_pending:
+            self.stats.rejected += 1
+            raise HashingBusyError("Too many password operations in progress; retry shortly")
+        self.stats.pending += 1
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.stats.queue_depth)
+        submitted = time.perf_counter()
+        try:
+            if self.workers <= 0:
+                try:
+                    result = self._timed(fn, *args, submitted=submitted)
+                finally:
+                    self.stats.pending -= 1
+            else:
+                result = await self._run_in_pool(fn, args, submitted)
+        except BaseException:
+            self.stats.failed += 1
+            raise
+        else:
+            self.stats.completed += 1
+            return result
+
+    async def _run_in_pool(self, fn: Callable, args: tuple, submitted: float):
+        try:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hash")
+            job = self._executor.submit(self._timed, fn, *args, submitted=submitted)
+        except BaseException:
+            self.stats.pending -= 1
+            raise
+        # Released when the job ends, not when its caller stops waiting: a cancelled
+        # request's hash keeps a worker busy until it finishes, and stays counted
+        loop = asyncio.get_running_loop()
+        job.add_done_callback(lambda _: self._job_done(loop))
+        return await asyncio.wrap_future(job)
+
+    def _job_done(self, loop: asyncio.AbstractEventLoop):
+        # Called from the worker thread; `pending` is only changed on the loop
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            pass  # the loop has closed, and with it everything that reads the counters
+
+    def _release(self):
+        self.stats.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(valid, replacement hash); the replacement is set when `hashed` predates the policy."""
+        valid, new_hash = await self._submit(self.context.verify_and_update, password, hashed)
+        if new_hash is not None:
+            self.stats.rehashed += 1
+        return valid, new_hash
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    lambda: build_context(settings.PASSWORD_HASH_SCHEME, settings.PASSWORD_HASH_ROUNDS),
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
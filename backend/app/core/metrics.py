@@ -0,0 +1,270 @@
+"""
+Prometheus text-format metrics, without a client library.
+
+MetricsMiddleware is pure ASGI and times every HTTP request. It records a latency
+histogram per (method, route template), a response counter per status, and a gauge of
+requests in flight. The route is the template FastAPI matched
+(`/properties/{property_id}`), so ids never become label values. Requests that match
+no route share the `unmatched` label. The middleware and its bookkeeping run only on
+the event loop, so none of it takes a lock. A request costs two perf_counter calls, two
+dict lookups and a bisect (see benchmarks/metrics.py).
+
+Everything else is collected at scrape time. Collectors registered with
+`Metrics.add_collector` read the stats objects the app already keeps: the SQL pool,
+the Mongo pool (MongoPoolStats, a pymongo pool listener), the caches, the outbox worker
+and the hashing pool. Scrapes therefore cost nothing between scrapes.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import monitoring
+
+# Prometheus' default buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Dict[str, Any]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsWriter:
+    """Accumulates metric families in the text exposition format."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str, samples: Iterable[Tuple[Labels, float]]):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_format_labels(labels)} {float(value):g}")
+
+    def gauge(self, name: str, help_text: str, samples: Iterable[Tuple[Labels, float]]):
+        self.family(name, "gauge", help_text, samples)
+
+    def counter(self, name: str, help_text: str, samples: Iterable[Tuple[Labels, float]]):
+        self.family(name, "counter", help_text, samples)
+
+    def histogram(self, name: str, help_text: str, series: Iterable[Tuple[Labels, "Histogram"]]):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in series:
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                self.lines.append(f"{name}_bucket{_format_labels({**labels, 'le': f'{bound:g}'})} {cumulative}")
+            self.lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+            self.lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:g}")
+            self.lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+class Histogram:
+    """Per-bucket counts (cumulated when rendered); the last slot counts values above every bound."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """HTTP request metrics plus the collectors that are read at scrape time."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.in_flight = 0
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self._collectors: List[Callable[[MetricsWriter], None]] = []
+
+    def add_collector(self, collector: Callable[[MetricsWriter], None]):
+        self._collectors.append(collector)
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        histogram = self.latency.get((method, route))
+        if histogram is None:
+            histogram = self.latency[(method, route)] = Histogram(self.buckets)
+        histogram.observe(seconds)
+        key = (method, route, status)
+        self.responses[key] = self.responses.get(key, 0) + 1
+
+    def render(self) -> str:
+        writer = MetricsWriter()
+        writer.histogram(
+            "http_request_duration_seconds", "Request latency by route.",
+            (({"method": method, "route": route}, histogram)
+             for (method, route), histogram in sorted(self.latency.items())),
+        )
+        writer.counter(
+            "http_responses_total", "Responses by route and status.",
+            (({"method": method, "route": route, "status": status}, count)
+             for (method, route, status), count in sorted(self.responses.items())),
+        )
+        writer.gauge("http_requests_in_flight", "Requests being handled now.", [({}, self.in_flight)])
+        for collector in self._collectors:
+            collector(writer)
+        return writer.text()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware feeding Metrics; see the module docstring."""
+
+    def __init__(self, app, metrics: Optional[Metrics] = None):
+        self.app = app
+        self.metrics = metrics if metrics is not None else http_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # if the app raises before starting a response
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.in_flight -= 1
+            route = scope.get("route")
+            metrics.observe(scope["method"], route.path if route is not None else "unmatched", status,
+                            time.perf_counter() - started)
+
+
+class MongoPoolStats(monitoring.ConnectionPoolListener):
+    """Connection counts of the Motor client's pools, kept from pymongo's pool events."""
+
+    def __init__(self):
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checked_in = 0
+        self.checkout_failures = 0
+        self._lock = threading.Lock()  # pymongo reports from Motor's executor threads
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @property
+    def open(self) -> int:
+        return self.created - self.closed
+
+    @property
+    def in_use(self) -> int:
+        return self.checked_out - self.checked_in
+
+    def connection_created(self, event):
+        self._count("created")
+
+    def connection_closed(self, event):
+        self._count("closed")
+
+    def connection_checked_out(self, event):
+        self._count("checked_out")
+
+    def connection_checked_in(self, event):
+        self._count("checked_in")
+
+    def connection_check_out_failed(self, event):
+        self._count("checkout_failures")
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+def collect_sql_pool(writer: MetricsWriter, stats: Dict[str, Any]):
+    """`stats` is Resources.pool_stats()."""
+    writer.gauge("sql_pool_open", "Whether the SQL engine has been created.", [({}, stats.get("open", False))])
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if name in stats:
+            writer.gauge(f"sql_pool_{name}", f"SQLAlchemy pool {name}().", [({}, stats[name])])
+
+
+def collect_mongo_pool(writer: MetricsWriter, stats: MongoPoolStats):
+    writer.gauge("mongo_pool_connections", "Open MongoDB connections.", [({}, stats.open)])
+    writer.gauge("mongo_pool_connections_in_use", "MongoDB connections checked out.", [({}, stats.in_use)])
+    writer.counter("mongo_pool_checkout_failures_total", "Failed MongoDB connection checkouts.",
+                   [({}, stats.checkout_failures)])
+
+
+def collect_caches(writer: MetricsWriter, caches: Dict[str, Any]):
+    """`caches` maps a cache name to a cache with CacheStats (or None when disabled)."""
+    enabled = [(name, cache.stats) for name, cache in caches.items() if cache is not None]
+    for field in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        writer.counter(f"cache_{field}_total", f"Cache {field}.",
+                       (({"cache": name}, getattr(stats, field)) for name, stats in enabled))
+    writer.gauge("cache_hit_ratio", "Hits over lookups since startup.",
+                 (({"cache": name}, stats.hit_ratio) for name, stats in enabled))
+
+
+def collect_singleflight(writer: MetricsWriter, name: str, flight):
+    writer.counter("singleflight_calls_total", "Calls made.", [({"group": name}, flight.calls)])
+    writer.counter("singleflight_coalesced_total", "Calls that joined one already in flight.",
+                   [({"group": name}, flight.coalesced)])
+    writer.gauge("singleflight_in_flight", "Keys being fetched now.", [({"group": name}, flight.in_flight)])
+
+
+def collect_outbox(writer: MetricsWriter, stats):
+    writer.counter("outbox_applied_total", "Outbox rows written to MongoDB.", [({}, stats.applied)])
+    writer.counter("outbox_failures_total", "Failed sync attempts.", [({}, stats.failed)])
+    writer.gauge("outbox_pending", "Rows in the outbox at the last check.", [({}, stats.pending)])
+    writer.gauge("outbox_lag_seconds", "Age of the oldest pending row at the last check.", [({}, stats.lag_seconds)])
+
+
+def collect_password_hashing(writer: MetricsWriter, stats):
+    writer.counter("password_hash_completed_total", "Hash and verify operations done.", [({}, stats.completed)])
+    writer.counter("password_hash_failed_total", "Operations that raised or were cancelled.", [({}, stats.failed)])
+    writer.counter("password_hash_rejected_total", "Operations refused at the admission limit.",
+                   [({}, stats.rejected)])
+    writer.gauge("password_hash_pending", "Operations running or queued.", [({}, stats.pending)])
+    writer.gauge("password_hash_queue_depth", "Operations waiting for a worker.", [({}, stats.queue_depth)])
+
+
+http_metrics = Metrics()
+mongo_pool_stats = MongoPoolStats()
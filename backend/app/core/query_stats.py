@@ -0,0 +1,228 @@
+"""
+Per-request database accounting and N+1 detection.
+
+Every SQL statement (SQLAlchemy `before_cursor_execute` / `after_cursor_execute` on
+every Engine) and every MongoDB command (a pymongo CommandListener on the Motor client)
+is charged to the QueryStats of the request that issued it. That QueryStats lives in a
+ContextVar, which tasks and Motor's executor threads inherit. Each query is reduced to
+a shape: a SQL statement with literals and placeholder lists collapsed, or a Mongo
+command with its collection and filter keys. The same lookup made once per row of a
+page then shows up as one shape seen N times.
+
+QueryStatsMiddleware opens a QueryStats per HTTP request and reports it in the
+`X-DB-Queries` and `Server-Timing` response headers. When one shape repeats more than
+QUERY_REPEAT_WARN_THRESHOLD times, it logs a warning. Queries made after the response
+headers went out (streamed bodies) still count toward the warning.
+
+Tests assert query budgets with `track_queries(max_queries=..., max_repeats=...)`, or
+read the `X-DB-Queries` header of a response. Outside a request or a `track_queries`
+block nothing is recorded, so background workers pay only for a ContextVar lookup.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import monitoring
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+_SQL_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+# qmark, format, pyformat, asyncpg's numeric and named styles; `::type` casts are not placeholders
+_PLACEHOLDER = re.compile(r"\?|%s|%\(\w+\)s|\$\d+|(?<!:):\w+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROW_LIST = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+
+
+def sql_shape(statement: str) -> str:
+    """The statement with values replaced by `?`; `IN (?, ?, ?)` and multi-row VALUES collapse to one."""
+    shape = _SQL_LITERAL.sub("?", _PLACEHOLDER.sub("?", " ".join(statement.split())))
+    return _ROW_LIST.sub("(?)", _PLACEHOLDER_LIST.sub("(?)", shape))
+
+
+def _keys_shape(value: Any) -> str:
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{key}: {_keys_shape(item)}" for key, item in value.items()) + "}"
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        return "[" + ", ".join(_keys_shape(item) for item in value) + "]"
+    return "?"
+
+
+def mongo_shape(command_name: str, command: Dict[str, Any]) -> str:
+    """`find properties {_id: {$in: ?}}`: the command, its collection and the keys it filters on."""
+    collection = command.get(command_name)
+    shape = f"{command_name} {collection}" if isinstance(collection, str) else command_name
+    if "filter" in command:
+        shape += " " + _keys_shape(command["filter"])
+    elif "pipeline" in command:
+        shape += " [" + ", ".join(next(iter(stage), "?") for stage in command["pipeline"]) + "]"
+    for key in ("updates", "deletes"):
+        if key in command:
+            shape += " " + _keys_shape([{"q": item.get("q")} for item in command[key]])
+    return shape
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by `track_queries` when a block makes more queries than its budget allows."""
+
+
+class QueryStats:
+    """Queries one request (or one `track_queries` block) made."""
+
+    def __init__(self):
+        self.sql = 0
+        self.mongo = 0
+        self.sql_seconds = 0.0
+        self.mongo_seconds = 0.0
+        self.shapes: Counter = Counter()
+        self._lock = threading.Lock()  # Motor reports from its executor threads
+
+    @property
+    def queries(self) -> int:
+        return self.sql + self.mongo
+
+    @property
+    def seconds(self) -> float:
+        return self.sql_seconds + self.mongo_seconds
+
+    def record(self, kind: str, shape: str):
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+            self.shapes[f"{kind}: {shape}"] += 1
+
+    def add_time(self, kind: str, seconds: float):
+        with self._lock:
+            setattr(self, f"{kind}_seconds", getattr(self, f"{kind}_seconds") + seconds)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Shapes issued more than `threshold` times, most repeated first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def server_timing(self) -> str:
+        return (f'sql;dur={self.sql_seconds * 1000:.2f};desc="{self.sql} queries", '
+                f'mongo;dur={self.mongo_seconds * 1000:.2f};desc="{self.mongo} commands"')
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "queries": self.queries,
+            "sql": self.sql,
+            "mongo": self.mongo,
+            "db_ms": round(self.seconds * 1000, 3),
+            "max_repeats": max(self.shapes.values(), default=0),
+        }
+
+
+def record(kind: str, shape: str, seconds: float = 0.0):
+    """Charge one query to the current request; a no-op outside one."""
+    stats = _current.get()
+    if stats is not None:
+        stats.record(kind, shape)
+        if seconds:
+            stats.add_time(kind, seconds)
+
+
+@contextmanager
+def track_queries(max_queries: Optional[int] = None, max_repeats: Optional[int] = None) -> Iterator[QueryStats]:
+    """
+    Count the queries made inside the block; with a budget, fail when it is exceeded.
+
+    `max_queries` bounds the total and `max_repeats` the number of times any one shape
+    may be issued (1 rules out N+1 loops).
+    """
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+    problems = []
+    if max_queries is not None and stats.queries > max_queries:
+        problems.append(f"{stats.queries} queries, budget {max_queries}")
+    if max_repeats is not None and stats.repeated(max_repeats):
+        problems.append(f"shapes repeated more than {max_repeats} times")
+    if problems:
+        shapes = "\n".join(f"  {count}x {shape}" for shape, count in stats.shapes.most_common())
+        raise QueryBudgetExceeded(f"{'; '.join(problems)}:\n{shapes}")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        stats.record("sql", sql_shape(statement))
+        conn.info["query_stats_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_stats_started", None)
+    stats = _current.get()
+    if stats is not None and started is not None:
+        stats.add_time("sql", time.perf_counter() - started)
+
+
+def install_sql_listeners():
+    """Account the statements of every Engine, including the sync side of async engines."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Charges each MongoDB command to the request whose context issued it."""
+
+    def started(self, event):
+        record("mongo", mongo_shape(event.command_name, event.command))
+
+    def succeeded(self, event):
+        stats = _current.get()
+        if stats is not None:
+            stats.add_time("mongo", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        self.succeeded(event)
+
+
+mongo_command_listener = MongoCommandListener()
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware: one QueryStats per HTTP request, reported in headers and logs."""
+
+    def __init__(self, app, warn_threshold: int = settings.QUERY_REPEAT_WARN_THRESHOLD):
+        self.app = app
+        self.warn_threshold = warn_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Queries", str(stats.queries))
+                headers.append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            repeated = stats.repeated(self.warn_threshold)
+            if repeated:
+                route = getattr(scope.get("route"), "path", scope["path"])
+                for shape, count in repeated:
+                    logger.warning(f"Possible N+1 on {scope['method']} {route}: {count}x {shape}")
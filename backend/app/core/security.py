@@ -1,26 +1,23 @@
 import os
 from datetime import datetime, timedelta
-from typing import Union, Any
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from typing import Any, Optional, Union
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.config import settings
 from app.users.models import User
 # Remove the problematic import from app.users.service
 # from app.users.service import get_user, create_user, authenticate_user
-from db.database import SessionLocal, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.database import get_db
 from app.users.repository import UserRepository # Keep this import
+from app.users.cache import principal_cache
+from app.users.schemas import Principal
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto", pbkdf2_sha256__default_rounds=5000) # Reduced rounds for faster development
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+# Password hashing lives in app.core.hashing (one policy, run off the event loop)
 
 def create_access_token(data: dict):
+    from jose import jwt  # deferred: only needed once a request asks for or presents a token
+
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
@@ -34,12 +31,35 @@ def create_access_token(data: dict):
 # Add this after your existing token creation functions
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: SessionLocal = Depends(get_db)) -> User: # Add db dependency
+async def load_principal(db: AsyncSession, subject: str) -> Optional[Principal]:
+    """
+    The user a token subject names, from the principal cache when possible.
+
+    Hot clients are authenticated without touching the users table; the session is
+    only used (and a connection only checked out) on a miss.
+    """
+    if principal_cache is not None:
+        cached = await principal_cache.get(subject)
+        if cached is not None:
+            return Principal.model_validate_json(cached)
+
+    user = await UserRepository(db).get_by_email(subject)
+    if user is None:
+        return None  # not cached: the account may be created at any moment
+    principal = Principal.model_validate(user)
+    if principal_cache is not None:
+        await principal_cache.set(subject, principal.model_dump_json().encode())
+    return principal
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Principal: # Add db dependency
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(
             token,
@@ -52,16 +72,13 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: SessionLocal = Dep
     except JWTError:
         raise credentials_exception
 
-    # Use UserRepository to get the user
-    user_repository = UserRepository(db)
-    user = user_repository.get_by_email(username) # Corrected to use get_by_email
-    
+    user = await load_principal(db, username)
     if user is None:
         raise credentials_exception
     return user
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
\ No newline at end of file
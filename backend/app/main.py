@@ -1,38 +1,99 @@
+import asyncio
+from contextlib import asynccontextmanager
+from importlib import import_module
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.api import auth # Keep this for auth.router
 from app.users.router import router as users_router # Correct import for users_router
 from app.properties.router import router as properties_router
-from db.database import Base, engine
 from db.mongo import mongo_db # Keep this import
+from db.resources import resources
+from app.config import settings
+from app.properties.outbox import outbox_worker
+from app.properties.autocomplete import address_index
+from app.users.cache import principal_cache
+from app.core.hashing import password_hasher
+from app.core.query_stats import QueryStatsMiddleware, install_sql_listeners
+from app.core import metrics
+from app.properties.cache import facet_cache, property_cache, property_fetches
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Real Estate API")
+def preload_deferred_imports():
+    """Load what the auth code otherwise imports on its first request (jose, passlib)."""
+    import_module("jose.jwt")
+    password_hasher.context
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the SQL pool and the Motor client, start the background tasks; undo it all on exit."""
+    # Nothing connects at import time; the pools are created and warmed up here
+    # No DDL here: tables and Mongo indexes come from `python -m db.init_db`, run before deploying
+    await resources.startup()
+
+    # Keeps MongoDB in step with SQL writes; retries on its own if Mongo is down
+    if settings.OUTBOX_WORKER_ENABLED:
+        outbox_worker.start()
+
+    # Loaded in the background; until then suggestions cover only listings written since startup
+    if settings.AUTOCOMPLETE_ENABLED:
+        address_index.start(lambda: mongo_db.properties, settings.AUTOCOMPLETE_REFRESH_SECONDS)
+
+    # In a thread after startup, so it never delays readiness; off, the first sign-in pays for it
+    if settings.PRELOAD_DEFERRED_IMPORTS:
+        asyncio.get_running_loop().run_in_executor(None, preload_deferred_imports)
+
+    yield
+
+    await outbox_worker.stop()
+    await address_index.stop()
+    password_hasher.shutdown()
+    await resources.shutdown()
+
+
+app = FastAPI(title="Real Estate API", lifespan=lifespan)
+
+if settings.QUERY_STATS_ENABLED:
+    install_sql_listeners()
+    app.add_middleware(QueryStatsMiddleware)
+
+if settings.METRICS_ENABLED:
+    # Added last, so it is outermost and its latency covers the other middleware too
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.http_metrics.add_collector(lambda writer: metrics.collect_sql_pool(writer, resources.pool_stats()))
+    metrics.http_metrics.add_collector(lambda writer: metrics.collect_mongo_pool(writer, metrics.mongo_pool_stats))
+    metrics.http_metrics.add_collector(lambda writer: metrics.collect_caches(writer, {
+        "property": property_cache, "facets": facet_cache, "principal": principal_cache,
+    }))
+    metrics.http_metrics.add_collector(
+        lambda writer: metrics.collect_singleflight(writer, "property_fetches", property_fetches))
+    metrics.http_metrics.add_collector(lambda writer: metrics.collect_outbox(writer, outbox_worker.stats))
+    metrics.http_metrics.add_collector(
+        lambda writer: metrics.collect_password_hashing(writer, password_hasher.stats))
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(users_router, prefix="/users", tags=["users"])
 app.include_router(properties_router, prefix="/properties", tags=["properties"])
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize MongoDB connection on startup"""
-    # Test MongoDB connection
-    try:
-        await mongo_db.client.admin.command('ping') # Changed to await
-        print("✅ MongoDB connection successful")
-    except Exception as e:
-        print(f"❌ MongoDB connection failed: {e}")
-
 @app.get("/")
 async def root():
     return {
         "message": "Real Estate API",
         "databases": {
-            "postgres": "connected",
-            "mongodb": "connected" if mongo_db.client else "disconnected"
-        }
+            "postgres": resources.pool_stats(),
+            "mongodb": {
+                "open": mongo_db.is_open,
+                "connections": metrics.mongo_pool_stats.open,
+                "in_use": metrics.mongo_pool_stats.in_use,
+            },
+        },
+        "mongo_sync": outbox_worker.stats.as_dict(),
+        "principal_cache": principal_cache.stats.as_dict() if principal_cache is not None else None,
+        "password_hashing": password_hasher.stats.as_dict()
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.http_metrics.render(), media_type=metrics.CONTENT_TYPE)
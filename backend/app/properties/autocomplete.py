@@ -0,0 +1,282 @@
+"""
+Address autocomplete served from an in-memory prefix index.
+
+Every listing contributes up to three phrases: its `location.address`, its
+`location.street_address` and, when that starts with a house number, the bare street
+name. Each distinct phrase is stored once with the number of listings using it, and is
+findable from the start of any of its words: "sel" finds "Haile Selassie Road". The
+word suffixes live in one sorted list, so two bisects find the run of suffixes
+matching the typed prefix; no query reaches MongoDB. Suggestions are ranked by listing
+count. A short run is scanned and ranked on the spot. A run longer than
+RANKED_PREFIX_MIN_RUN (one or two letters, or a word like "road" that most phrases
+share) instead keeps its phrases bucketed by listing count; prefixes spanning several
+words narrow the run enough to stay scanned. Every write moves a phrase
+between buckets in constant time, and a lookup walks the counts from the top, ranking
+only the buckets it needs. The buckets are built while loading; a prefix whose run only
+grows long later gets them on first use (benchmarks/autocomplete.py).
+
+The index is loaded from a snapshot of the `properties` collection at startup (and
+reloaded every AUTOCOMPLETE_REFRESH_SECONDS, which also picks up writes made by other
+processes) and kept current in between by PropertyService and the bulk importer.
+"""
+import asyncio
+import heapq
+import logging
+import re
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.properties.identity import document_property_id
+
+logger = logging.getLogger(__name__)
+
+# Leading house number of a street address: "12", "12A", "12-14"
+HOUSE_NUMBER = re.compile(r"^\s*\d+[\w/-]*[\s,]+")
+
+SNAPSHOT_PROJECTION = {"location.address": 1, "location.street_address": 1}
+
+# Matching suffixes beyond which a prefix keeps ranked buckets rather than being scanned per lookup
+RANKED_PREFIX_MIN_RUN = 512
+
+# Sorts after every character that can follow a prefix in a suffix
+_RUN_END = "\U0010ffff"
+
+
+def normalize(text: str) -> str:
+    """Lowercased words separated by single spaces; punctuation is dropped."""
+    return " ".join(re.findall(r"\w+", text.casefold()))
+
+
+def location_phrases(location: Optional[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """(kind, text) for every phrase a listing at `location` contributes."""
+    if not location:
+        return []
+    phrases = []
+    if location.get("address"):
+        phrases.append(("address", location["address"].strip()))
+    street_address = (location.get("street_address") or "").strip()
+    if street_address:
+        phrases.append(("street_address", street_address))
+        street = HOUSE_NUMBER.sub("", street_address)
+        if street != street_address and normalize(street):
+            phrases.append(("street", street))
+    return phrases
+
+
+class _Phrase:
+    __slots__ = ("kind", "text", "listings")
+
+    def __init__(self, kind: str, text: str):
+        self.kind = kind
+        self.text = text  # as first written; later spellings that normalize the same share it
+        self.listings = 0
+
+
+class AddressIndex:
+    """Phrases with listing counts, searchable by word prefix."""
+
+    def __init__(self, ranked_min_run: int = RANKED_PREFIX_MIN_RUN):
+        self.ranked_min_run = ranked_min_run
+        self._phrases: Dict[Tuple[str, str], _Phrase] = {}  # (kind, normalized text)
+        self._suffixes: List[Tuple[str, str, str]] = []     # sorted (word suffix, kind, normalized text)
+        # Prefix with a long run -> listing count -> its phrases with that count
+        self._ranked: Dict[str, Dict[int, Set[Tuple[str, str]]]] = {}
+        self._listings: Dict[str, Tuple[Tuple[str, str], ...]] = {}  # property id -> its phrase keys
+        self._touched: Optional[Set[str]] = None  # ids written while a reload is running
+        self._task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    @staticmethod
+    def _suffixes_of(key: Tuple[str, str]) -> List[Tuple[str, str, str]]:
+        kind, normalized = key
+        words = normalized.split(" ")
+        return [(" ".join(words[i:]), kind, normalized) for i in range(len(words))]
+
+    @staticmethod
+    def _rank(key: Tuple[str, str], listings: int) -> Tuple[int, int, Tuple[str, str]]:
+        return -listings, len(key[1]), key
+
+    def _run_bounds(self, prefix: str) -> Tuple[int, int]:
+        """Bounds of the suffixes starting with `prefix`."""
+        start = bisect_left(self._suffixes, (prefix,))
+        return start, bisect_left(self._suffixes, (prefix + _RUN_END,), start)
+
+    def _build_ranked(self, prefix: str, start: int, end: int) -> Dict[int, Set[Tuple[str, str]]]:
+        ranked = self._ranked[prefix] = defaultdict(set)
+        for _, kind, normalized in self._suffixes[start:end]:
+            ranked[self._phrases[kind, normalized].listings].add((kind, normalized))
+        return ranked
+
+    def _reorder(self, key: Tuple[str, str], before: int, after: int):
+        """Move `key` between the buckets of its ranked prefixes as its count goes from `before` to `after`."""
+        if not self._ranked:
+            return
+        prefixes = {word[:n] for word in key[1].split(" ") for n in range(1, len(word) + 1)}
+        for prefix in prefixes.intersection(self._ranked):
+            ranked = self._ranked[prefix]
+            if before:
+                ranked[before].discard(key)
+                if not ranked[before]:
+                    del ranked[before]
+            if after:
+                ranked[after].add(key)
+
+    def _add_phrase(self, key: Tuple[str, str], kind: str, text: str):
+        phrase = self._phrases.get(key)
+        if phrase is None:
+            phrase = self._phrases[key] = _Phrase(kind, text)
+            for suffix in self._suffixes_of(key):
+                insort(self._suffixes, suffix)
+        phrase.listings += 1
+        self._reorder(key, phrase.listings - 1, phrase.listings)
+
+    def _remove_phrase(self, key: Tuple[str, str]):
+        phrase = self._phrases[key]
+        phrase.listings -= 1
+        self._reorder(key, phrase.listings + 1, phrase.listings)
+        if phrase.listings == 0:
+            del self._phrases[key]
+            for suffix in self._suffixes_of(key):
+                del self._suffixes[bisect_left(self._suffixes, suffix)]
+
+    def _set(self, property_id: str, phrases: Iterable[Tuple[str, str]]):
+        for key in self._listings.pop(property_id, ()):
+            self._remove_phrase(key)
+        keys = []
+        for kind, text in phrases:
+            key = (kind, normalize(text))
+            if key[1] and key not in keys:
+                self._add_phrase(key, kind, text)
+                keys.append(key)
+        if keys:
+            self._listings[property_id] = tuple(keys)
+
+    def set_location(self, property_id: Any, location: Optional[Dict[str, Any]]):
+        """Index a created listing, or re-index a moved one."""
+        property_id = str(property_id)
+        if self._touched is not None:
+            self._touched.add(property_id)
+        self._set(property_id, location_phrases(location))
+
+    def remove(self, property_id: Any):
+        self.set_location(property_id, None)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """The `limit` phrases with the most listings having a word that starts with `prefix`."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        ranked = self._ranked.get(prefix)
+        if ranked is None:
+            start, end = self._run_bounds(prefix)
+            # Only single words get buckets: _reorder maintains the prefixes of each word
+            if end - start < self.ranked_min_run or " " in prefix:
+                matched = {(kind, normalized) for _, kind, normalized in self._suffixes[start:end]}
+                best = heapq.nsmallest(limit, matched, key=lambda key: self._rank(key, self._phrases[key].listings))
+                return self._entries(best)
+            ranked = self._build_ranked(prefix, start, end)
+        best = []
+        for listings in sorted(ranked, reverse=True):
+            best += heapq.nsmallest(limit - len(best), ranked[listings], key=lambda key: self._rank(key, listings))
+            if len(best) == limit:
+                break
+        return self._entries(best)
+
+    def _entries(self, keys: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        return [
+            {"text": phrase.text, "kind": phrase.kind, "listings": phrase.listings}
+            for phrase in (self._phrases[key] for key in keys)
+        ]
+
+    async def load(self, documents: AsyncIterator[Dict[str, Any]]):
+        """
+        Replace the contents with a snapshot of property documents.
+
+        The index keeps serving the old contents while the snapshot is read. Listings
+        written in the meantime keep their live entry rather than the snapshot's,
+        which may predate the write.
+        """
+        snapshot = AddressIndex(self.ranked_min_run)
+        self._touched = set()
+        try:
+            phrases: Dict[Tuple[str, str], _Phrase] = {}
+            async for document in documents:
+                keys = []
+                for kind, text in location_phrases(document.get("location")):
+                    key = (kind, normalize(text))
+                    if key[1] and key not in keys:
+                        phrases.setdefault(key, _Phrase(kind, text)).listings += 1
+                        keys.append(key)
+                if keys:
+                    snapshot._listings[document_property_id(document)] = tuple(keys)
+            snapshot._phrases = phrases
+            # One sort instead of an insort per phrase
+            snapshot._suffixes = sorted(suffix for key in phrases for suffix in self._suffixes_of(key))
+            # Rank the long runs now so no lookup pays for it. Writes landing between the
+            # builds are replayed below and reorder these lists like any other write.
+            words = Counter(suffix.split(" ", 1)[0] for suffix, _, _ in snapshot._suffixes)
+            runs: Dict[str, int] = defaultdict(int)
+            for word, count in words.items():
+                for n in range(1, len(word) + 1):
+                    runs[word[:n]] += count
+            for prefix, run in runs.items():
+                if run >= self.ranked_min_run:
+                    snapshot._build_ranked(prefix, *snapshot._run_bounds(prefix))
+                    await asyncio.sleep(0)
+
+            # No awaits from here on: the replay and the swap are atomic for request handlers
+            for property_id in self._touched:
+                live = self._listings.get(property_id, ())
+                snapshot._set(property_id, [(key[0], self._phrases[key].text) for key in live])
+        finally:
+            self._touched = None
+        self._phrases, self._suffixes, self._listings = snapshot._phrases, snapshot._suffixes, snapshot._listings
+        self._ranked = snapshot._ranked  # longer prefixes are ranked again on demand
+        self.loaded_at = datetime.utcnow()
+
+    async def load_from(self, collection, batch_size: int = 5000):
+        await self.load(collection.find({}, SNAPSHOT_PROJECTION, batch_size=batch_size))
+        logger.info(f"Address autocomplete index loaded: {len(self._phrases)} phrases, "
+                    f"{len(self._listings)} listings")
+
+    def start(self, collection_factory: Callable[[], Any], refresh_interval: float = 0):
+        """Load the index in the background; with `refresh_interval`, reload it periodically."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(collection_factory, refresh_interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, collection_factory: Callable[[], Any], refresh_interval: float):
+        while True:
+            try:
+                await self.load_from(collection_factory())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Loading the address autocomplete index failed: {e}")
+            if refresh_interval <= 0:
+                return
+            await asyncio.sleep(refresh_interval)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "phrases": len(self._phrases),
+            "listings": len(self._listings),
+            "ranked_prefixes": len(self._ranked),
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+        }
+
+
+address_index = AddressIndex()
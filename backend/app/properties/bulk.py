@@ -0,0 +1,343 @@
+"""
+Streaming bulk import of listings from NDJSON or CSV feeds.
+
+Rows are parsed one line at a time and validated with PropertyCreate in chunks. Each
+chunk commits as one multi-row insert of properties plus one of their outbox entries,
+so memory stays bounded by the chunk size whatever the size of the feed. The Mongo
+documents are written from the outbox (app.properties.outbox) like any other property
+write, so a chunk that fails to commit leaves nothing behind in MongoDB.
+
+Property ids are derived from (import_id, row number). Re-running an import with the
+same import_id therefore skips rows that are already in. With `skip` set to the
+`checkpoint` of an earlier report, parse_rows only counts the rows of the committed
+part of the feed: they are split into records but not decoded or validated.
+
+Besides PropertyCreate, rows are checked against the limits of the SQL columns (title
+length, price precision), which SQLite does not enforce. Should the database still
+reject a chunk's data, the chunk is retried row by row, so only the offending rows are
+reported as failed; other database errors stop the import.
+
+CSV feeds use dotted column names for nested fields, e.g.
+    title,property_type,price,location.address,location.coordinates.lat,location.coordinates.lng,details.bedrooms
+
+Usage:
+    python -m app.properties.bulk listings.ndjson --user-id <uuid> [--import-id feed-2026-10]
+    python -m app.properties.bulk listings.csv --user-id <uuid> --checkpoint-file listings.ckpt
+"""
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import math
+import os
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4, uuid5
+
+from pydantic import ValidationError
+from pymongo.errors import PyMongoError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+
+from app.properties.autocomplete import address_index
+from app.properties.models import Property, PropertyOutbox
+from app.properties.outbox import apply_pending, encode_payload, outbox_worker
+from app.properties.schema import ImportReport, ImportRowError, PropertyCreate
+from app.properties.services import new_property_records
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+MAX_LINE_LENGTH = 1024 * 1024
+
+# Namespace for the uuid5 property ids derived from (import_id, row)
+IMPORT_ID_NAMESPACE = UUID("7aa98cc0-4e45-4b79-9e3e-020488a30da9")
+
+# (row number, parsed record or None, parse error or None)
+ParsedRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+# Limits of the SQL columns, taken from the model so the two cannot drift apart
+TITLE_MAX_LENGTH = Property.__table__.c.title.type.length
+PRICE_SCALE = Property.__table__.c.price.type.scale
+PRICE_LIMIT = 10 ** (Property.__table__.c.price.type.precision - PRICE_SCALE)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a stream of UTF-8 byte chunks into lines without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+        if len(buffer) > MAX_LINE_LENGTH:
+            raise ValueError(f"Line longer than {MAX_LINE_LENGTH} characters")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[str], skip: int = 0) -> AsyncIterator[ParsedRow]:
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        if row <= skip:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield row, None, "Expected a JSON object"
+            continue
+        yield row, record, None
+
+
+def nest_columns(header: List[str], values: List[str]) -> Dict[str, Any]:
+    """Turn dotted CSV columns into nested dicts; empty cells are left out."""
+    record: Dict[str, Any] = {}
+    for column, value in zip(header, values):
+        if value == "":
+            continue
+        target = record
+        *parents, leaf = column.strip().split(".")
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value
+    return record
+
+
+async def iter_csv_rows(lines: AsyncIterator[str], skip: int = 0) -> AsyncIterator[ParsedRow]:
+    header = None
+    pending = ""
+    row = 0
+    async for line in lines:
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            # Inside a quoted field that continues on the next line
+            if len(pending) > MAX_LINE_LENGTH:
+                raise ValueError(f"CSV record longer than {MAX_LINE_LENGTH} characters")
+            continue
+        text, pending = pending, ""
+        if not text.strip():
+            continue
+        if header is None:
+            header = next(csv.reader([text]))
+            continue
+        row += 1
+        if row <= skip:
+            continue  # only the quote tracking above runs for rows already imported
+        values = next(csv.reader([text]))
+        if len(values) != len(header):
+            yield row, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row, nest_columns(header, values), None
+    if pending:
+        yield row + 1, None, "Unterminated quoted field"
+
+
+def parse_rows(chunks: AsyncIterator[bytes], file_format: str, skip: int = 0) -> AsyncIterator[ParsedRow]:
+    """Parsed feed rows after the first `skip` (a resumed import's checkpoint)."""
+    if file_format == "csv":
+        return iter_csv_rows(iter_lines(chunks), skip)
+    if file_format == "ndjson":
+        return iter_ndjson_rows(iter_lines(chunks), skip)
+    raise ValueError(f"Unsupported import format: {file_format}")
+
+
+def _record_error(report: ImportReport, row: int, errors: List[str]):
+    report.failed += 1
+    if len(report.errors) < MAX_REPORTED_ERRORS:
+        report.errors.append(ImportRowError(row=row, errors=errors))
+
+
+def _validation_messages(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()]
+
+
+def _column_errors(sql_values: Dict[str, Any]) -> List[str]:
+    """Values PropertyCreate accepts but the properties table cannot store."""
+    errors = []
+    if len(sql_values["title"]) > TITLE_MAX_LENGTH:
+        errors.append(f"title: String should have at most {TITLE_MAX_LENGTH} characters")
+    price = sql_values["price"]
+    if not math.isfinite(price) or abs(round(price, PRICE_SCALE)) >= PRICE_LIMIT:
+        errors.append(f"price: Input should be a finite number below {PRICE_LIMIT}")
+    return errors
+
+
+async def _insert_rows(db, rows):
+    # One multi-row INSERT each for the rows and their outbox entries
+    await db.execute(insert(Property), [sql_values for _, sql_values, _ in rows])
+    await db.execute(insert(PropertyOutbox), [
+        {"property_id": sql_values["id"], "operation": "insert", "payload": encode_payload(document)}
+        for _, sql_values, document in rows
+    ])
+
+
+async def _insert_each(db, rows, report: ImportReport):
+    """Commit `rows` one at a time, reporting those the database rejects; returns the others."""
+    inserted = []
+    for parsed in rows:
+        try:
+            await _insert_rows(db, [parsed])
+            await db.commit()
+        except (DataError, IntegrityError) as e:
+            await db.rollback()
+            _record_error(report, parsed[0], [f"Rejected by the database: {e.orig}"])
+        else:
+            inserted.append(parsed)
+    return inserted
+
+
+async def _write_chunk(db, chunk: List[ParsedRow], user_id: UUID, import_id: str, report: ImportReport):
+    rows = []
+    for row, record, error in chunk:
+        if error:
+            _record_error(report, row, [error])
+            continue
+        try:
+            property_data = PropertyCreate.model_validate({**record, "user_id": user_id})
+        except ValidationError as e:
+            _record_error(report, row, _validation_messages(e))
+            continue
+        property_id = uuid5(IMPORT_ID_NAMESPACE, f"{import_id}:{row}")
+        sql_values, document = new_property_records(property_data, property_id)
+        errors = _column_errors(sql_values)
+        if errors:
+            _record_error(report, row, errors)
+            continue
+        rows.append((row, sql_values, document))
+
+    if rows:
+        existing = set(await db.scalars(
+            select(Property.id).filter(Property.id.in_([sql_values["id"] for _, sql_values, _ in rows]))
+        ))
+        report.skipped += len(existing)
+        rows = [r for r in rows if r[1]["id"] not in existing]
+
+    if rows:
+        try:
+            await _insert_rows(db, rows)
+            await db.commit()
+        except (DataError, IntegrityError) as e:
+            await db.rollback()
+            logger.warning(f"Import {import_id}: chunk ending at row {chunk[-1][0]} rejected ({e.orig}); "
+                           f"retrying its rows one by one")
+            rows = await _insert_each(db, rows, report)
+    else:
+        await db.commit()
+    report.imported += len(rows)
+    for _, sql_values, document in rows:
+        address_index.set_location(sql_values["id"], document["location"])
+    if rows:
+        outbox_worker.notify()
+    report.checkpoint = chunk[-1][0]
+
+
+async def import_properties(
+    db, rows: AsyncIterator[ParsedRow], user_id: UUID, import_id: Optional[str] = None,
+    resume_from: int = 0, chunk_size: int = IMPORT_CHUNK_SIZE,
+    on_checkpoint: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """
+    Import parsed feed rows for `user_id`, one chunk at a time.
+
+    Invalid rows are reported and skipped; a database failure stops the import and the
+    report's `checkpoint` says where to resume from. Rows up to `resume_from` are
+    ignored; parse_rows(..., skip=resume_from) avoids parsing them in the first place.
+    """
+    report = ImportReport(import_id=import_id or str(uuid4()), checkpoint=resume_from)
+    chunk: List[ParsedRow] = []
+    try:
+        async for parsed in rows:
+            if parsed[0] <= resume_from:
+                continue
+            chunk.append(parsed)
+            if len(chunk) == chunk_size:
+                await _write_chunk(db, chunk, user_id, report.import_id, report)
+                chunk = []
+                if on_checkpoint:
+                    on_checkpoint(report)
+        if chunk:
+            await _write_chunk(db, chunk, user_id, report.import_id, report)
+            if on_checkpoint:
+                on_checkpoint(report)
+    except (SQLAlchemyError, ValueError) as e:
+        await db.rollback()
+        logger.error(f"Import {report.import_id} stopped after row {report.checkpoint}: {e}")
+        report.aborted = True
+        report.error = str(e)
+    return report
+
+
+async def _read_file(path: str, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    with open(path, "rb") as feed:
+        while True:
+            chunk = await asyncio.to_thread(feed.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def run_import(path: str, file_format: str, user_id: UUID, import_id: Optional[str],
+                     checkpoint_file: Optional[str], chunk_size: int) -> ImportReport:
+    from db.database import AsyncSessionLocal
+    from db.mongo import mongo_db
+
+    resume_from = 0
+    if checkpoint_file and os.path.exists(checkpoint_file):
+        with open(checkpoint_file) as f:
+            saved = json.load(f)
+        import_id = import_id or saved["import_id"]
+        if saved["import_id"] == import_id:
+            resume_from = saved["checkpoint"]
+
+    def save_checkpoint(report: ImportReport):
+        if checkpoint_file:
+            with open(checkpoint_file, "w") as f:
+                json.dump({"import_id": report.import_id, "checkpoint": report.checkpoint}, f)
+
+    async with AsyncSessionLocal() as db:
+        report = await import_properties(
+            db, parse_rows(_read_file(path), file_format, skip=resume_from), user_id,
+            import_id=import_id, resume_from=resume_from, chunk_size=chunk_size, on_checkpoint=save_checkpoint,
+        )
+        # No outbox worker runs in this process; write the documents before exiting
+        try:
+            while await apply_pending(db, mongo_db.db.properties):
+                pass
+        except (SQLAlchemyError, PyMongoError) as e:
+            logger.warning(f"Imported rows are committed; the API's outbox worker will sync the rest: {e}")
+        finally:
+            mongo_db.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--user-id", type=UUID, required=True, help="owner of the imported listings")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="defaults to the file extension")
+    parser.add_argument("--import-id", help="reuse to resume or re-run an import idempotently")
+    parser.add_argument("--checkpoint-file", help="records progress after every chunk; resumed from if present")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    report = asyncio.run(run_import(
+        args.path, file_format, args.user_id, args.import_id, args.checkpoint_file, args.chunk_size
+    ))
+    print(report.model_dump_json(indent=2))
+    if report.aborted:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
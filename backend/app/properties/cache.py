@@ -0,0 +1,30 @@
+from app.config import settings
+from app.core.cache import Generations, build_cache
+from app.core.singleflight import SingleFlight
+
+# Serialized PropertyResponse JSON keyed by property id; see PropertyService.get_property_by_id
+property_cache = build_cache(
+    settings.PROPERTY_CACHE_BACKEND,
+    ttl_seconds=settings.PROPERTY_CACHE_TTL_SECONDS,
+    max_bytes=settings.PROPERTY_CACHE_MAX_BYTES,
+    max_entries=settings.PROPERTY_CACHE_MAX_ENTRIES,
+    redis_url=settings.REDIS_URL,
+    prefix="realestate:property:",
+)
+
+# Serialized PropertyFacets JSON keyed by the normalized filter set; see app.properties.facets
+facet_cache = build_cache(
+    settings.PROPERTY_CACHE_BACKEND,
+    ttl_seconds=settings.FACET_CACHE_TTL_SECONDS,
+    max_bytes=settings.PROPERTY_CACHE_MAX_BYTES // 8,
+    max_entries=settings.FACET_CACHE_MAX_ENTRIES,
+    redis_url=settings.REDIS_URL,
+    prefix="realestate:facets:",
+)
+
+# Bumped on every invalidation of a property_cache key, so an in-flight load of the old
+# state does not write it back (see Generations)
+property_generations = Generations()
+
+# Concurrent detail fetches for the same property id share one backend round trip
+property_fetches = SingleFlight()
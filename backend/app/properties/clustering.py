@@ -0,0 +1,54 @@
+from typing import Any, Dict, List
+
+from app.properties.identity import LEGACY_ID_FIELD
+
+MIN_ZOOM = 0
+MAX_ZOOM = 20
+
+# Each 256px map tile is split into 2**CELLS_PER_TILE_LOG2 cells per side (64px cells)
+CELLS_PER_TILE_LOG2 = 2
+
+# Cells with at most this many listings also return their individual pins
+SPARSE_CELL_THRESHOLD = 5
+
+
+def cell_size_for_zoom(zoom: int) -> float:
+    """Width (and height) of a cluster cell in degrees at the given map zoom level."""
+    return 360.0 / 2 ** (zoom + CELLS_PER_TILE_LOG2)
+
+
+def cluster_pipeline(match: Dict[str, Any], cell_size: float) -> List[Dict[str, Any]]:
+    """
+    Aggregation that buckets matching listings into a fixed lat/lng grid.
+
+    The grid cell is computed from the coordinates inside $group, so no per-zoom
+    field has to be stored; the $match on `geo` is served by the 2dsphere index.
+    """
+    lng = "$location.coordinates.lng"
+    lat = "$location.coordinates.lat"
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "x": {"$floor": {"$divide": [{"$add": [lng, 180]}, cell_size]}},
+                "y": {"$floor": {"$divide": [{"$add": [lat, 90]}, cell_size]}},
+            },
+            "count": {"$sum": 1},
+            "lat": {"$avg": lat},
+            "lng": {"$avg": lng},
+            "min_price": {"$min": "$price"},
+            "max_price": {"$max": "$price"},
+            # Bounded per cell; only kept for sparse cells
+            "pins": {"$firstN": {
+                "n": SPARSE_CELL_THRESHOLD,
+                "input": {
+                    # Documents not yet rekeyed keep the property id in LEGACY_ID_FIELD
+                    "id": {"$ifNull": [f"${LEGACY_ID_FIELD}", "$_id"]},
+                    "lat": lat,
+                    "lng": lng,
+                    "price": "$price",
+                    "property_type": "$property_type",
+                },
+            }},
+        }},
+    ]
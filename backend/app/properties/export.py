@@ -0,0 +1,97 @@
+"""
+Streaming NDJSON export of the property catalog.
+
+SQL rows are read through a server-side cursor in `yield_per` partitions; each partition
+is merged with its Mongo documents in one `$in` query and written out before the next
+one is fetched, so memory stays flat however large the catalog is.
+
+Rows are ordered by (updated_at, id). An incremental dump passes the largest
+`updated_at` of the previous dump as `updated_since`. Deletions are not part of an
+incremental dump.
+
+Usage:
+    python -m app.properties.export > catalog.ndjson
+    python -m app.properties.export --gzip --updated-since 2026-10-01T00:00:00 -o delta.ndjson.gz
+"""
+import argparse
+import asyncio
+import sys
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import select
+
+from app.properties.identity import document_property_id, ids_filter
+from app.properties.models import Property
+from app.properties.services import build_property_response
+
+EXPORT_BATCH_SIZE = 1000
+
+
+async def export_lines(session_factory, mongo_db, updated_since: Optional[datetime] = None,
+                       batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """
+    Yield one NDJSON-encoded chunk per batch of properties.
+
+    Opens its own session from `session_factory`: a StreamingResponse body runs after
+    the request's dependencies (and their sessions) have been closed.
+    """
+    query = select(Property).order_by(Property.updated_at, Property.id)
+    if updated_since is not None:
+        query = query.filter(Property.updated_at > updated_since)
+
+    async with session_factory() as db:
+        result = await db.stream_scalars(query.execution_options(yield_per=batch_size))
+        async for batch in result.partitions():
+            cursor = mongo_db.properties.find(ids_filter(p.id for p in batch))
+            documents = {document_property_id(d): d for d in await cursor.to_list(length=len(batch))}
+            yield b"".join(
+                build_property_response(p, documents.get(str(p.id))).model_dump_json().encode() + b"\n"
+                for p in batch
+            )
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # 31: gzip container
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def run_export(output, use_gzip: bool, updated_since: Optional[datetime], batch_size: int) -> int:
+    from db.database import AsyncSessionLocal
+    from db.mongo import mongo_db
+
+    chunks = export_lines(AsyncSessionLocal, mongo_db.db, updated_since, batch_size)
+    if use_gzip:
+        chunks = gzip_chunks(chunks)
+    written = 0
+    async for chunk in chunks:
+        output.write(chunk)
+        written += len(chunk)
+    output.flush()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", help="defaults to stdout")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--updated-since", type=datetime.fromisoformat)
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        written = asyncio.run(run_export(output, args.gzip, args.updated_since, args.batch_size))
+    finally:
+        if args.output:
+            output.close()
+    print(f"✅ Exported {written} bytes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import json
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import String, case, cast, func, literal_column, union_all
+
+from app.properties.models import Property
+from app.properties.schema import FacetCount, Features, PriceBandCount, PropertyFacets
+
+# Lower bounds of the price bands; the last band is open-ended
+PRICE_BANDS = (0, 100_000, 250_000, 500_000, 1_000_000, 2_500_000)
+
+# Boolean Features counted as "listings with this feature"
+FEATURE_FIELDS = tuple(Features.model_fields)
+
+# Facets over columns owned by SQL
+SQL_FACETS = ("property_type", "status", "price_band")
+
+# Ids per $facet aggregation when a free-text match restricts the document facets
+FACET_ID_CHUNK = 5000
+
+
+def facet_cache_key(filters: Dict[str, Any]) -> str:
+    """Key equal for filter sets that select the same listings, however they were spelled."""
+    normalized = {}
+    for key, value in filters.items():
+        if value is None:
+            continue
+        if key == "location":
+            value = value.strip().casefold()  # matched case-insensitively
+        elif key == "bbox":
+            value = [round(float(part), 6) for part in value.split(",")]
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value)
+        normalized[key] = value
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+
+
+def price_band_column():
+    # Inlined literals: Postgres only matches the GROUP BY expression if it is textually identical
+    return case(
+        *[(Property.price < literal_column(str(upper)), literal_column(str(lower)))
+          for lower, upper in zip(PRICE_BANDS, PRICE_BANDS[1:])],
+        else_=literal_column(str(PRICE_BANDS[-1])),
+    )
+
+
+def sql_facet_query(query, dialect_name: str):
+    """
+    Counts for every SQL facet of `query` (a filtered select of Property) in one statement.
+
+    Rows are (facet, value, count). Postgres answers it with a single GROUPING SETS
+    scan; SQLite, which has no GROUPING SETS, with a UNION ALL of one GROUP BY per facet.
+    """
+    band = price_band_column()
+    if dialect_name == "postgresql":
+        facet = case(
+            (func.grouping(Property.property_type) == 0, literal_column("'property_type'")),
+            (func.grouping(Property.status) == 0, literal_column("'status'")),
+            else_=literal_column("'price_band'"),
+        )
+        # Outside its own grouping set each column is NULL, so the first non-NULL one is the value
+        value = func.coalesce(cast(Property.property_type, String), cast(Property.status, String), cast(band, String))
+        return query.with_only_columns(
+            facet.label("facet"), value.label("value"), func.count().label("count")
+        ).group_by(func.grouping_sets(Property.property_type, Property.status, band))
+
+    columns = {"property_type": Property.property_type, "status": Property.status, "price_band": band}
+    return union_all(*[
+        query.with_only_columns(
+            literal_column(f"'{name}'").label("facet"), cast(column, String).label("value"), func.count().label("count")
+        ).group_by(column)
+        for name, column in columns.items()
+    ])
+
+
+def facet_pipeline(match: Dict[str, Any], include_sql_facets: bool) -> List[Dict[str, Any]]:
+    """One aggregation computing the document facets (and optionally the SQL ones) via $facet."""
+    facets = {
+        "total": [{"$group": {"_id": None, "count": {"$sum": 1}}}],
+        "bedrooms": [{"$group": {"_id": "$details.bedrooms", "count": {"$sum": 1}}}],
+        "features": [{"$group": {"_id": None, **{
+            field: {"$sum": {"$cond": [{"$eq": [f"$features.{field}", True]}, 1, 0]}}
+            for field in FEATURE_FIELDS
+        }}}],
+    }
+    if include_sql_facets:
+        # From the Mongo copies of the SQL columns
+        facets["property_type"] = [{"$group": {"_id": "$property_type", "count": {"$sum": 1}}}]
+        facets["status"] = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        facets["price_band"] = [{"$bucket": {
+            "groupBy": "$price",
+            "boundaries": list(PRICE_BANDS),
+            "default": PRICE_BANDS[-1],  # at or above the last boundary
+            "output": {"count": {"$sum": 1}},
+        }}]
+    stages = [{"$match": match}] if match else []
+    return stages + [{"$facet": facets}]
+
+
+def merge_facet_documents(documents: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum the document facets of $facet results computed over disjoint sets of listings."""
+    total, bedrooms, features = 0, Counter(), Counter()
+    for document in documents:
+        total += sum(bucket["count"] for bucket in document.get("total", []))
+        for bucket in document.get("bedrooms", []):
+            bedrooms[bucket["_id"]] += bucket["count"]
+        for group in document.get("features", []):
+            features.update({field: group.get(field, 0) for field in FEATURE_FIELDS})
+    return {
+        "total": [{"_id": None, "count": total}],
+        "bedrooms": [{"_id": value, "count": count} for value, count in bedrooms.items()],
+        "features": [dict(features)],
+    }
+
+
+def _value_counts(pairs: Iterable, sort_by_value: bool = False) -> List[FacetCount]:
+    counts = [FacetCount(value=value, count=count) for value, count in pairs if count]
+    if sort_by_value:
+        return sorted(counts, key=lambda c: (c.value is None, c.value if c.value is not None else 0))
+    return sorted(counts, key=lambda c: (-c.count, str(c.value)))
+
+
+def _price_bands(pairs: Iterable) -> List[PriceBandCount]:
+    upper_bounds = dict(zip(PRICE_BANDS, PRICE_BANDS[1:]))
+    bands = []
+    for lower, count in sorted((float(lower), count) for lower, count in pairs if count):
+        upper = upper_bounds.get(int(lower))
+        bands.append(PriceBandCount(min_price=lower, max_price=upper, count=count))
+    return bands
+
+
+def build_facets(facet_document: Dict[str, Any], sql_rows: Optional[Iterable] = None) -> PropertyFacets:
+    """Assemble the response from the $facet document and, if SQL ran, its (facet, value, count) rows."""
+    sql_counts: Dict[str, List] = {name: [] for name in SQL_FACETS}
+    if sql_rows is not None:
+        for facet, value, count in sql_rows:
+            sql_counts[facet].append((value, count))
+    else:
+        for name in SQL_FACETS:
+            sql_counts[name] = [(bucket["_id"], bucket["count"]) for bucket in facet_document.get(name, [])]
+
+    features = (facet_document.get("features") or [{}])[0]
+    if sql_rows is not None:
+        total = sum(count for _, count in sql_counts["property_type"])
+    else:
+        total = sum(bucket["count"] for bucket in facet_document.get("total", []))
+
+    return PropertyFacets(
+        total=total,
+        property_type=_value_counts(sql_counts["property_type"]),
+        status=_value_counts(sql_counts["status"]),
+        price_band=_price_bands(sql_counts["price_band"]),
+        bedrooms=_value_counts(
+            ((bucket["_id"], bucket["count"]) for bucket in facet_document.get("bedrooms", [])), sort_by_value=True
+        ),
+        features={field: features.get(field, 0) for field in FEATURE_FIELDS},
+    )
@@ -0,0 +1,57 @@
+"""
+Free-text (`q=`) matching over the listing title and address.
+
+The addresses live in Mongo, so their text is copied onto `properties.search_address`
+whenever a location is written. On PostgreSQL the match is a tsquery against a
+weighted tsvector (title "A", address "B") served by a GIN expression index, with
+English stemming, prefix matching on every term and ts_rank_cd ranking. Other
+databases (SQLite in tests) fall back to a case-insensitive substring match per
+term, without stemming or ranking.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, cast, func, literal, or_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+
+from app.properties.models import Property, inline, search_vector
+
+# Terms beyond this are ignored; every term must match
+MAX_SEARCH_TERMS = 8
+
+# Matches the configuration of the indexed vector (app.properties.models.search_vector)
+TEXT_SEARCH_CONFIG = "english"
+
+
+def search_address(location: Optional[Dict[str, Any]]) -> Optional[str]:
+    """The address text indexed for `location` (a Location dict)."""
+    if not location:
+        return None
+    parts = [location.get("address"), location.get("street_address")]
+    return " ".join(part for part in parts if part) or None
+
+
+def search_terms(q: str) -> List[str]:
+    terms = re.findall(r"\w+", q.casefold())[:MAX_SEARCH_TERMS]
+    if not terms:
+        raise ValueError("q must contain at least one word")
+    return terms
+
+
+def text_match(q: str, dialect_name: str) -> Tuple[Any, Any]:
+    """(WHERE predicate, rank expression) for a free-text query."""
+    terms = search_terms(q)
+    if dialect_name == "postgresql":
+        # Every term as a prefix: "sea vie" matches "Sea view"; stemming applies per term
+        query = func.to_tsquery(
+            cast(inline(TEXT_SEARCH_CONFIG), REGCONFIG), " & ".join(f"{term}:*" for term in terms)
+        )
+        vector = search_vector()
+        return vector.op("@@")(query), func.ts_rank_cd(vector, query)
+
+    predicate = and_(*[
+        or_(Property.title.icontains(term, autoescape=True),
+            Property.search_address.icontains(term, autoescape=True))
+        for term in terms
+    ])
+    return predicate, literal(0.0)
@@ -0,0 +1,43 @@
+from typing import Any, Dict, Tuple
+
+MAX_RADIUS_KM = 200.0
+
+# Radius used by Mongo to convert $centerSphere distances to radians
+EARTH_RADIUS_KM = 6378.1
+
+
+def geo_point(coordinates: Dict[str, float]) -> Dict[str, Any]:
+    """GeoJSON projection of Location.coordinates, stored as the document's indexed `geo` field."""
+    # GeoJSON is [longitude, latitude]
+    return {"type": "Point", "coordinates": [coordinates["lng"], coordinates["lat"]]}
+
+
+def parse_bbox(bbox: str) -> Tuple[float, float, float, float]:
+    """Parse "min_lng,min_lat,max_lng,max_lat" into floats."""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise ValueError("bbox must be 'min_lng,min_lat,max_lng,max_lat'")
+    if not (-180 <= min_lng < max_lng <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise ValueError("bbox corners are out of range or not ordered min,max")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def bbox_filter(bbox: str) -> Dict[str, Any]:
+    """Mongo predicate matching documents whose `geo` point lies inside the box."""
+    min_lng, min_lat, max_lng, max_lat = parse_bbox(bbox)
+    ring = [[min_lng, min_lat], [max_lng, min_lat], [max_lng, max_lat], [min_lng, max_lat], [min_lng, min_lat]]
+    return {"geo": {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [ring]}}}}
+
+
+def near_filter(lat: float, lng: float, radius_km: float) -> Dict[str, Any]:
+    """Mongo predicate for a radius search where no distance ordering is needed (unlike $geoNear)."""
+    return {"geo": {"$geoWithin": {"$centerSphere": [[lng, lat], radius_km / EARTH_RADIUS_KM]}}}
+
+
+def validate_near(lat: float, lng: float, radius_km: float):
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("near_lat/near_lng are out of range")
+    if not (0 < radius_km <= MAX_RADIUS_KM):
+        raise ValueError(f"radius_km must be between 0 and {MAX_RADIUS_KM:g}")
+
@@ -0,0 +1,34 @@
+"""
+How property documents in MongoDB are keyed.
+
+A property's document uses the SQL primary key as its `_id` (the UUID as a string), so
+every read and write is a primary-key lookup and nothing has to be written back to SQL.
+Documents created before that carry an ObjectId `_id` plus a `sql_property_id` link
+field; `python -m db.mongo_migrations rekey-ids` moves them over.
+"""
+from typing import Any, Dict, Iterable
+from uuid import UUID
+
+from app.config import settings
+
+# Link field used by documents written before `_id` was the property id
+LEGACY_ID_FIELD = "sql_property_id"
+
+
+def id_filter(property_id: UUID) -> Dict[str, Any]:
+    key = str(property_id)
+    if settings.MONGO_LEGACY_ID_FALLBACK:
+        return {"$or": [{"_id": key}, {LEGACY_ID_FIELD: key}]}
+    return {"_id": key}
+
+
+def ids_filter(property_ids: Iterable[Any]) -> Dict[str, Any]:
+    keys = [str(property_id) for property_id in property_ids]
+    if settings.MONGO_LEGACY_ID_FALLBACK:
+        return {"$or": [{"_id": {"$in": keys}}, {LEGACY_ID_FIELD: {"$in": keys}}]}
+    return {"_id": {"$in": keys}}
+
+
+def document_property_id(document: Dict[str, Any]) -> str:
+    """The property id (as a string) a document belongs to."""
+    return document.get(LEGACY_ID_FIELD) or document["_id"]
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, BIGINT, String, Enum, DECIMAL, TIMESTAMP, ForeignKey, func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    Column, BIGINT, JSON, Integer, String, Text, Enum, DECIMAL, TIMESTAMP, ForeignKey, Index, cast, func, literal
+)
+from sqlalchemy.dialects.postgresql import JSONB, REGCONFIG, UUID
 from sqlalchemy.orm import declarative_base
 from db.database import Base
 import uuid # Import uuid module
+from datetime import datetime
 
 class Property(Base):
     """
@@ -11,6 +14,15 @@ class Property(Base):
     This model holds the core, filterable, and relational data for a property listing.
     """
     __tablename__ = "properties"
+    __table_args__ = (
+        # Keyset pagination: every listing order is (sort column, id)
+        Index("ix_properties_created_at_id", "created_at", "id"),
+        Index("ix_properties_price_id", "price", "id"),
+        Index("ix_properties_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_properties_user_id_price_id", "user_id", "price", "id"),
+        # Incremental exports (updated_since) walk this in order
+        Index("ix_properties_updated_at_id", "updated_at", "id"),
+    )
 
     # Define columns, matching your SQL schema
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4) # Changed to UUID and added default
@@ -35,11 +47,69 @@ class Property(Base):
         index=True
     )
     
-    # Let the database handle the default timestamp
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    # Stamped client-side so keyset cursors compare against the same representation
+    # the row was stored with; the server default covers raw SQL inserts
+    created_at = Column(TIMESTAMP, default=datetime.utcnow, server_default=func.now(), nullable=False)
+
+    # Bumped on every change, including ones that only touch the Mongo document
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, server_default=func.now(), nullable=False)
+
+    # Location.address and street_address, copied from Mongo for full-text search
+    search_address = Column(Text, nullable=True)
+
+    # The MongoDB document for this property is keyed by the same id (see app.properties.identity)
+
+    def __repr__(self):
+        return f"<Property(id={self.id}, title='{self.title}')>"
+
+
+def inline(value):
+    """A constant rendered into the SQL text rather than sent as a bound parameter."""
+    return literal(value, literal_execute=True)
+
+
+def search_vector():
+    """
+    Weighted tsvector over the title ("A") and address ("B"); see app.properties.fulltext.
+
+    Constants are inlined: Postgres only uses the expression index below when a query
+    repeats the indexed expression exactly.
+    """
+    config = cast(inline("english"), REGCONFIG)
+    return func.setweight(func.to_tsvector(config, Property.title), inline("A")).op("||")(
+        func.setweight(func.to_tsvector(config, func.coalesce(Property.search_address, inline(""))), inline("B"))
+    )
+
+
+Index("ix_properties_search_vector", search_vector(), postgresql_using="gin").ddl_if(dialect="postgresql")
+
+
+class PropertyOutbox(Base):
+    """
+    Pending MongoDB changes for the 'property_outbox' table.
+
+    A row is inserted in the same transaction as the SQL change it mirrors and deleted
+    once app.properties.outbox has applied it to MongoDB.
+    """
+    __tablename__ = "property_outbox"
+    __table_args__ = (
+        # Per-property ordering: a row waits for any older row of the same property
+        Index("ix_property_outbox_property_id_id", "property_id", "id"),
+    )
+
+    # Assigned at insert, not commit; per-property order relies on the property's row lock
+    # (see app.properties.outbox)
+    id = Column(BIGINT().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    property_id = Column(UUID(as_uuid=True), nullable=False)
+    operation = Column(Enum('insert', 'update', 'delete', name='outbox_operation_enum'), nullable=False)
+    # The full document for inserts, the `$set` fields for updates, empty for deletes
+    payload = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow, nullable=False)
 
-    # This field is crucial for linking to the NoSQL document
-    mongo_document_id = Column(String(24), unique=True, nullable=True)
+    # Retry bookkeeping; a failed row is not picked up again before available_at
+    attempts = Column(Integer, default=0, nullable=False)
+    available_at = Column(TIMESTAMP, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
 
     def __repr__(self):
-        return f"<Property(id={self.id}, title='{self.title}')>"
\ No newline at end of file
+        return f"<PropertyOutbox(id={self.id}, property_id={self.property_id}, operation='{self.operation}')>"
@@ -0,0 +1,293 @@
+"""
+Transactional outbox for the SQL -> MongoDB half of every property write.
+
+PropertyService writes the SQL row and a PropertyOutbox row in one transaction and
+never waits on MongoDB. OutboxWorker drains the table into the `properties`
+collection in id order, one `bulk_write` per batch:
+
+* Idempotent: inserts are upserts keyed by `_id`, updates are `$set`s and deletes are
+  by id, so re-applying a batch whose rows were not yet removed is harmless.
+* Ordered per property: a row is never applied ahead of an older row for the same
+  property, so a failing row holds back later changes to that listing only. Ids come
+  from a sequence at insert time, not at commit, so id order is change order only
+  because writes to one property are serialized by its SQL row lock: PropertyService
+  flushes the row change, taking the lock, before it adds the outbox row.
+* Retried: a failing row is retried with exponential backoff (capped at
+  OUTBOX_MAX_BACKOFF_SECONDS) and stays in the table until it succeeds.
+
+Batches are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so workers in several
+processes share the table instead of queueing behind each other's batch. A claimed row
+whose property has an older row held by another worker is left for a later pass.
+"""
+import asyncio
+import json
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from bson import json_util
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.config import settings
+from app.properties.cache import property_cache, property_fetches, property_generations
+from app.properties.identity import id_filter
+from app.properties.models import PropertyOutbox
+from db.database import AsyncSessionLocal
+from db.mongo import mongo_db
+
+logger = logging.getLogger(__name__)
+
+
+def _plain(value: Any) -> Any:
+    # BSON has no date-only type; keep those as ISO strings
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_payload(document: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe copy of a Mongo document; datetimes survive as extended JSON."""
+    return json.loads(json_util.dumps(_plain(document)))
+
+
+def decode_payload(payload: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return json_util.loads(json.dumps(payload or {}))
+
+
+def enqueue(db: AsyncSession, property_id: UUID, operation: str,
+            payload: Optional[Dict[str, Any]] = None) -> PropertyOutbox:
+    """Add an outbox row to the caller's transaction; it is applied once that commits."""
+    entry = PropertyOutbox(
+        property_id=property_id,
+        operation=operation,
+        payload=encode_payload(payload) if payload else None,
+    )
+    db.add(entry)
+    return entry
+
+
+def _write_request(entry: PropertyOutbox):
+    payload = decode_payload(entry.payload)
+    if entry.operation == "insert":
+        payload.pop("_id", None)
+        return ReplaceOne({"_id": str(entry.property_id)}, payload, upsert=True)
+    if entry.operation == "update":
+        return UpdateOne(id_filter(entry.property_id), {"$set": payload})
+    return DeleteOne(id_filter(entry.property_id))
+
+
+def retry_delay(attempts: int) -> float:
+    return min(2 ** attempts, settings.OUTBOX_MAX_BACKOFF_SECONDS)
+
+
+def _pending_query(now: datetime, batch_size: int):
+    older = aliased(PropertyOutbox)
+    blocked = exists().where(
+        older.property_id == PropertyOutbox.property_id,
+        older.id < PropertyOutbox.id,
+        older.available_at > now,
+    )
+    return (
+        select(PropertyOutbox)
+        .filter(PropertyOutbox.available_at <= now, ~blocked)
+        .order_by(PropertyOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+
+
+async def _claim_pending(db: AsyncSession, now: datetime, batch_size: int) -> List[PropertyOutbox]:
+    """
+    Lock a batch of due rows, minus those queued behind an older row left out of it.
+
+    SKIP LOCKED leaves out the rows other workers hold. A later row of the same property
+    must not overtake those, so it is dropped from this batch (and retried next pass).
+    """
+    entries = (await db.scalars(_pending_query(now, batch_size))).all()
+    if not entries:
+        return entries
+    first_unclaimed = dict((await db.execute(
+        select(PropertyOutbox.property_id, func.min(PropertyOutbox.id))
+        .filter(PropertyOutbox.property_id.in_({entry.property_id for entry in entries}),
+                PropertyOutbox.id.not_in([entry.id for entry in entries]))
+        .group_by(PropertyOutbox.property_id)
+    )).all())
+    return [entry for entry in entries
+            if entry.property_id not in first_unclaimed or entry.id < first_unclaimed[entry.property_id]]
+
+
+async def apply_pending(db: AsyncSession, collection, batch_size: int = 500,
+                        property_id: Optional[UUID] = None, up_to_id: Optional[int] = None,
+                        stats: Optional["OutboxStats"] = None) -> List[UUID]:
+    """
+    Apply one batch of outbox rows to `collection` and delete them in the same transaction.
+
+    With `property_id`, only that property's rows up to `up_to_id` are applied, ignoring
+    any retry backoff (the read-your-writes path). Returns the property ids whose
+    documents changed. A row that fails is rescheduled; rows before it still count.
+    """
+    now = datetime.utcnow()
+    if property_id is None:
+        entries = await _claim_pending(db, now, batch_size)
+    else:
+        # Waits for a worker holding any of these rows, rather than skipping them
+        entries = (await db.scalars(
+            select(PropertyOutbox)
+            .filter(PropertyOutbox.property_id == property_id, PropertyOutbox.id <= up_to_id)
+            .order_by(PropertyOutbox.id)
+            .with_for_update()
+        )).all()
+    if not entries:
+        await db.commit()
+        return []
+
+    applied, error = len(entries), None
+    try:
+        # Ordered, so the write stops at the first failing row and nothing after it runs
+        await collection.bulk_write([_write_request(entry) for entry in entries], ordered=True)
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors") or [{}]
+        applied = write_errors[0].get("index", 0)
+        error = write_errors[0].get("errmsg", str(e))
+    except PyMongoError as e:
+        applied, error = 0, str(e)
+
+    done = entries[:applied]
+    if done:
+        await db.execute(delete(PropertyOutbox).filter(PropertyOutbox.id.in_([entry.id for entry in done])))
+    if error is not None:
+        failed = entries[applied]
+        failed.attempts += 1
+        failed.last_error = error[:1000]
+        failed.available_at = now + timedelta(seconds=retry_delay(failed.attempts))
+        logger.warning(f"Outbox entry {failed.id} for property {failed.property_id} failed "
+                       f"(attempt {failed.attempts}): {error}")
+    await db.commit()
+
+    if stats is not None:
+        stats.applied += len(done)
+        stats.failed += 0 if error is None else 1
+        if done:
+            stats.last_applied_at = datetime.utcnow()
+    return list(dict.fromkeys(entry.property_id for entry in done))
+
+
+class OutboxStats:
+    """Throughput and lag of the sync worker."""
+
+    def __init__(self):
+        self.applied = 0        # rows written to MongoDB
+        self.failed = 0         # failed attempts (each one is retried)
+        self.pending = 0        # rows in the outbox at the last check
+        self.lag_seconds = 0.0  # age of the oldest pending row at the last check
+        self.last_applied_at: Optional[datetime] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "applied": self.applied,
+            "failed": self.failed,
+            "pending": self.pending,
+            "lag_seconds": round(self.lag_seconds, 3),
+            "last_applied_at": self.last_applied_at.isoformat() if self.last_applied_at else None,
+        }
+
+
+class OutboxWorker:
+    """Background task that keeps MongoDB in step with the outbox table."""
+
+    def __init__(self, session_factory, collection_factory, batch_size: int = 500,
+                 poll_interval: float = 1.0, cache=property_cache, fetches=property_fetches,
+                 generations=property_generations):
+        self.session_factory = session_factory
+        self.collection_factory = collection_factory  # resolved lazily, after the app has started
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.cache = cache
+        self.fetches = fetches
+        self.generations = generations
+        self.stats = OutboxStats()
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self):
+        """Wake the worker early; called after a write commits."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _invalidate(self, property_ids: List[UUID]):
+        for property_id in property_ids:
+            self.generations.bump(str(property_id))
+            if self.fetches is not None:
+                self.fetches.forget(str(property_id))
+            if self.cache is not None:
+                await self.cache.delete(str(property_id))
+
+    async def refresh_lag(self, db: AsyncSession):
+        oldest, pending = (await db.execute(
+            select(func.min(PropertyOutbox.created_at), func.count(PropertyOutbox.id))
+        )).one()
+        self.stats.pending = pending
+        self.stats.lag_seconds = (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0
+
+    async def drain_once(self) -> int:
+        """Apply one batch; returns the number of outbox rows applied."""
+        applied_before = self.stats.applied
+        async with self.session_factory() as db:
+            property_ids = await apply_pending(db, self.collection_factory(), self.batch_size, stats=self.stats)
+            await self.refresh_lag(db)
+        await self._invalidate(property_ids)
+        return self.stats.applied - applied_before
+
+    async def _run(self):
+        failures = 0
+        while True:
+            try:
+                applied = await self.drain_once()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                applied = 0
+                logger.error(f"Outbox worker iteration failed: {e}")
+            if applied >= self.batch_size:
+                continue  # more is probably waiting
+            timeout = self.poll_interval if not failures else min(
+                self.poll_interval * 2 ** failures, settings.OUTBOX_MAX_BACKOFF_SECONDS
+            )
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+outbox_worker = OutboxWorker(
+    AsyncSessionLocal,
+    lambda: mongo_db.properties,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+)
@@ -0,0 +1,115 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Tuple
+from uuid import UUID
+
+from sqlalchemy import tuple_
+
+from app.properties.models import Property
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Each sort key is paired with Property.id as a tie-breaker; see the matching
+# composite indexes on the Property model
+SORT_COLUMNS = {
+    "created_at": Property.created_at,
+    "price": Property.price,
+}
+
+# Full-text rank; only valid with a `q` search, which supplies the rank expression
+RELEVANCE = "relevance"
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor is malformed or was issued for a different ordering."""
+
+
+def _encode(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> dict:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(db_property: Property, sort: str, order: str, value: Any = None) -> str:
+    """
+    Build the opaque cursor pointing just past `db_property` in the given ordering.
+
+    `value` is the row's sort key when it is not a column (the relevance rank).
+    """
+    if value is None:
+        value = getattr(db_property, sort)
+    return _encode({
+        "s": sort,
+        "o": order,
+        "v": value.isoformat() if isinstance(value, datetime) else str(value),
+        "id": str(db_property.id),
+    })
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Tuple[Any, UUID]:
+    """Return the (sort value, id) position stored in a cursor."""
+    try:
+        payload = _decode(cursor)
+        if payload["s"] != sort or payload["o"] != order:
+            raise InvalidCursorError("Cursor was issued for a different sort order")
+        if sort == "created_at":
+            value = datetime.fromisoformat(payload["v"])
+        elif sort == RELEVANCE:
+            value = float(payload["v"])
+        else:
+            value = Decimal(payload["v"])
+        return value, UUID(payload["id"])
+    except InvalidCursorError:
+        raise
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError,
+            ValueError, InvalidOperation) as e:
+        raise InvalidCursorError("Malformed cursor") from e
+
+
+def encode_distance_cursor(distance_m: float, tied_ids: List[str]) -> str:
+    """
+    Cursor for distance-ordered (radius search) pages.
+
+    Distances are not unique, so the ids already returned at exactly `distance_m`
+    travel with the cursor and are excluded from the next page.
+    """
+    return _encode({"s": "distance", "d": distance_m, "ex": tied_ids})
+
+
+def decode_distance_cursor(cursor: str) -> Tuple[float, List[str]]:
+    try:
+        payload = _decode(cursor)
+        if payload["s"] != "distance":
+            raise InvalidCursorError("Cursor was issued for a different sort order")
+        return float(payload["d"]), [str(UUID(i)) for i in payload["ex"]]
+    except InvalidCursorError:
+        raise
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        raise InvalidCursorError("Malformed cursor") from e
+
+
+def apply_keyset(query, sort: str, order: str, after: Tuple[Any, UUID] = None, column=None):
+    """
+    Order `query` by (sort column, id) and start it strictly after the `after` position.
+
+    The row-value comparison lets the database seek straight into the composite
+    index, so page N costs the same as page 1. `column` overrides the sort expression
+    (the relevance rank).
+    """
+    if column is None:
+        column = SORT_COLUMNS[sort]
+    descending = order == "desc"
+    if after is not None:
+        key = tuple_(column, Property.id)
+        query = query.filter(key < after if descending else key > after)
+    if descending:
+        return query.order_by(column.desc(), Property.id.desc())
+    return query.order_by(column.asc(), Property.id.asc())
@@ -0,0 +1,288 @@
+"""
+Drift detection between the SQL `properties` table and the Mongo `properties` collection.
+
+Both stores are keyed by the property id (a UUID in SQL, its string form as the Mongo
+`_id`) and sort those keys the same way, since UUIDs compare bytewise, in the order
+of their hex strings. The check is therefore a merge join: each side is read in
+id-ordered keyset batches and walked in step, so memory is bounded by the batch
+size, not by the catalog size.
+
+Each id is reported as one of:
+
+* missing_in_mongo: a SQL row without a document
+* missing_in_sql: an orphaned document without a SQL row
+* mismatch: the document's copies of the SQL columns (title, price, ...) differ
+
+Ids with a pending outbox row are skipped; the sync worker has not caught up yet.
+After every batch the last id checked is handed to `on_checkpoint`; pass it back as
+`start_after` to resume. With `repair`, mismatches are overwritten from SQL and
+orphaned documents deleted, both through the outbox so they stay ordered with live
+writes. A missing document cannot be rebuilt from SQL and is only reported.
+Documents still keyed by ObjectId (see `db.mongo_migrations rekey-ids`) are not scanned.
+
+Usage:
+    python -m app.properties.reconcile > drift.ndjson
+    python -m app.properties.reconcile --repair --checkpoint-file reconcile.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from pymongo import ASCENDING
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.properties.models import Property, PropertyOutbox
+from app.properties.outbox import enqueue
+from app.properties.services import DENORMALIZED_SQL_FIELDS
+
+RECONCILE_BATCH_SIZE = 1000
+
+
+class ReconcileReport:
+    """Totals for one reconciliation run (or, when resumed, everything since the first)."""
+
+    def __init__(self, **counts):
+        self.checked = counts.get("checked", 0)
+        self.missing_in_mongo = counts.get("missing_in_mongo", 0)
+        self.missing_in_sql = counts.get("missing_in_sql", 0)
+        self.mismatched = counts.get("mismatched", 0)
+        self.in_flight = counts.get("in_flight", 0)  # skipped: a sync is still pending
+        self.repaired = counts.get("repaired", 0)
+        self.checkpoint: Optional[str] = counts.get("checkpoint")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "checked": self.checked,
+            "missing_in_mongo": self.missing_in_mongo,
+            "missing_in_sql": self.missing_in_sql,
+            "mismatched": self.mismatched,
+            "in_flight": self.in_flight,
+            "repaired": self.repaired,
+            "checkpoint": self.checkpoint,
+        }
+
+
+def _same(field: str, sql_value, mongo_value) -> bool:
+    if field == "price":
+        try:
+            return round(float(sql_value), 2) == round(float(mongo_value), 2)
+        except (TypeError, ValueError):
+            return False
+    return sql_value == mongo_value
+
+
+def field_differences(row, document: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """The denormalized fields whose Mongo copy differs from SQL."""
+    return {
+        field: {"sql": getattr(row, field), "mongo": document.get(field)}
+        for field in DENORMALIZED_SQL_FIELDS
+        if not _same(field, getattr(row, field), document.get(field))
+    }
+
+
+async def _sql_rows(db: AsyncSession, start_after: Optional[UUID], batch_size: int) -> AsyncIterator[Any]:
+    columns = [Property.id] + [getattr(Property, field) for field in DENORMALIZED_SQL_FIELDS]
+    last = start_after
+    while True:
+        query = select(*columns).order_by(Property.id).limit(batch_size)
+        if last is not None:
+            query = query.filter(Property.id > last)
+        rows = (await db.execute(query)).all()
+        for row in rows:
+            yield row
+        if len(rows) < batch_size:
+            return
+        last = rows[-1].id
+
+
+async def _mongo_documents(collection, start_after: Optional[UUID], batch_size: int) -> AsyncIterator[Dict[str, Any]]:
+    projection = {field: 1 for field in DENORMALIZED_SQL_FIELDS}
+    last = str(start_after) if start_after is not None else None
+    while True:
+        id_range = {"$type": "string"}
+        if last is not None:
+            id_range["$gt"] = last
+        cursor = collection.find({"_id": id_range}, projection).sort("_id", ASCENDING).limit(batch_size)
+        documents = await cursor.to_list(length=batch_size)
+        for document in documents:
+            yield document
+        if len(documents) < batch_size:
+            return
+        last = documents[-1]["_id"]
+
+
+async def _merge(rows: AsyncIterator[Any], documents: AsyncIterator[Dict[str, Any]]):
+    """Yield (property id, SQL row or None, document or None) in id order."""
+    row = await anext(rows, None)
+    document = await anext(documents, None)
+    while row is not None or document is not None:
+        row_key = str(row.id) if row is not None else None
+        document_key = document["_id"] if document is not None else None
+        if document_key is None or (row_key is not None and row_key < document_key):
+            yield row_key, row, None
+            row = await anext(rows, None)
+        elif row_key is None or document_key < row_key:
+            yield document_key, None, document
+            document = await anext(documents, None)
+        else:
+            yield row_key, row, document
+            row, document = await anext(rows, None), await anext(documents, None)
+
+
+async def _in_flight(db: AsyncSession, property_ids: List[UUID]) -> set:
+    result = await db.scalars(
+        select(PropertyOutbox.property_id).filter(PropertyOutbox.property_id.in_(property_ids)).distinct()
+    )
+    return set(result.all())
+
+
+async def _repair(db: AsyncSession, issues: List[Dict[str, Any]]) -> int:
+    """Queue outbox rows that bring Mongo back in line with SQL; returns how many were queued."""
+    mismatched = [UUID(i["property_id"]) for i in issues if i["issue"] == "mismatch"]
+    orphaned = [UUID(i["property_id"]) for i in issues if i["issue"] == "missing_in_sql"]
+    queued = 0
+    # Re-read under lock: the values written are current even if the row changed since the scan
+    current = (await db.scalars(
+        select(Property).filter(Property.id.in_(mismatched + orphaned)).with_for_update()
+    )).all() if mismatched or orphaned else []
+    for db_property in current:
+        if db_property.id in mismatched:
+            enqueue(db, db_property.id, "update", {
+                field: float(getattr(db_property, field)) if field == "price" else getattr(db_property, field)
+                for field in DENORMALIZED_SQL_FIELDS
+            })
+            queued += 1
+    revived = {db_property.id for db_property in current}
+    for property_id in orphaned:
+        if property_id not in revived:
+            enqueue(db, property_id, "delete")
+            queued += 1
+    await db.commit()
+    return queued
+
+
+async def reconcile(
+    db: AsyncSession,
+    mongo_db,
+    start_after: Optional[UUID] = None,
+    batch_size: int = RECONCILE_BATCH_SIZE,
+    repair: bool = False,
+    report: Optional[ReconcileReport] = None,
+    on_issue: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    on_checkpoint: Optional[Callable[[ReconcileReport], Any]] = None,
+) -> ReconcileReport:
+    """
+    Compare every property id after `start_after` across both stores.
+
+    `on_issue` is called with each discrepancy as a dict, and `on_checkpoint`
+    with the running report after each batch.
+    """
+    report = report or ReconcileReport()
+    pending: List[Tuple[str, Any, Optional[Dict[str, Any]]]] = []
+
+    async def flush():
+        skipped = await _in_flight(db, [UUID(key) for key, _, _ in pending])
+        issues = []
+        for key, row, document in pending:
+            if UUID(key) in skipped:
+                report.in_flight += 1
+                continue
+            if document is None:
+                report.missing_in_mongo += 1
+                issues.append({"property_id": key, "issue": "missing_in_mongo"})
+            elif row is None:
+                report.missing_in_sql += 1
+                issues.append({"property_id": key, "issue": "missing_in_sql"})
+            else:
+                report.mismatched += 1
+                issues.append({"property_id": key, "issue": "mismatch",
+                               "fields": field_differences(row, document)})
+        if repair and issues:
+            report.repaired += await _repair(db, issues)
+        else:
+            # Release the read snapshot between batches
+            await db.commit()
+        if on_issue is not None:
+            for issue in issues:
+                on_issue(issue)
+        pending.clear()
+
+    checked_in_batch = 0
+    async for key, row, document in _merge(
+        _sql_rows(db, start_after, batch_size), _mongo_documents(mongo_db.properties, start_after, batch_size)
+    ):
+        report.checked += 1
+        checked_in_batch += 1
+        if row is None or document is None or field_differences(row, document):
+            pending.append((key, row, document))
+        if checked_in_batch >= batch_size:
+            await flush()
+            report.checkpoint = key
+            checked_in_batch = 0
+            if on_checkpoint is not None:
+                on_checkpoint(report)
+
+    await flush()
+    report.checkpoint = None  # the scan completed
+    if on_checkpoint is not None:
+        on_checkpoint(report)
+    return report
+
+
+def _json_default(value):
+    return str(value)
+
+
+async def run_reconcile(output, checkpoint_file: Optional[str], batch_size: int, repair: bool) -> ReconcileReport:
+    from db.database import AsyncSessionLocal
+    from db.mongo import mongo_db
+
+    report = ReconcileReport()
+    if checkpoint_file and os.path.exists(checkpoint_file):
+        with open(checkpoint_file) as f:
+            saved = json.load(f)
+        if saved.get("checkpoint"):  # otherwise the previous run finished; start over
+            report = ReconcileReport(**saved)
+    start_after = UUID(report.checkpoint) if report.checkpoint else None
+
+    def write_issue(issue):
+        output.write(json.dumps(issue, default=_json_default) + "\n")
+
+    def save_checkpoint(current: ReconcileReport):
+        output.flush()
+        if checkpoint_file:
+            with open(checkpoint_file, "w") as f:
+                json.dump(current.as_dict(), f)
+
+    async with AsyncSessionLocal() as db:
+        report = await reconcile(db, mongo_db.db, start_after, batch_size, repair, report,
+                                 on_issue=write_issue, on_checkpoint=save_checkpoint)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", help="NDJSON list of discrepancies; defaults to stdout")
+    parser.add_argument("--checkpoint-file", help="resume from, and record progress in, this file")
+    parser.add_argument("--batch-size", type=int, default=RECONCILE_BATCH_SIZE)
+    parser.add_argument("--repair", action="store_true", help="queue fixes through the outbox")
+    args = parser.parse_args()
+
+    output = open(args.output, "a") if args.output else sys.stdout
+    try:
+        report = asyncio.run(run_reconcile(output, args.checkpoint_file, args.batch_size, args.repair))
+    finally:
+        if args.output:
+            output.close()
+    totals = report.as_dict()
+    totals.pop("checkpoint")
+    print(f"✅ Reconciled properties: {json.dumps(totals)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,18 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.properties.schema import PropertyCreate, PropertyResponse, PropertyUpdate
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.properties.autocomplete import address_index
+from app.properties.bulk import import_properties, parse_rows
+from app.properties.clustering import MAX_ZOOM, MIN_ZOOM
+from app.properties.export import export_lines, gzip_chunks
+from app.properties.schema import (
+    AddressSuggestion, ImportReport, MapClusters, PageParams, PropertyCreate, PropertyFacets, PropertyPage, PropertyResponse, PropertySearchParams, PropertyUpdate
+)
 from app.properties.services import PropertyService
-from db.database import get_db
+from db.database import AsyncSessionLocal, get_db
 from db.mongo import get_mongo_db_async # Changed import
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.dependencies import get_current_user_from_token # Import get_current_user_from_token
@@ -12,34 +20,117 @@ from app.users.schemas import UserResponse # Import UserResponse to type hint cu
 
 router = APIRouter()
 
+# MongoDB is synced in the background (app.properties.outbox); this waits for it instead
+CONSISTENT_DESCRIPTION = "Wait until the change is visible in every read (read-your-writes)"
+
 @router.post("/", response_model=PropertyResponse, status_code=status.HTTP_201_CREATED)
 async def create_property(
     property_data: PropertyCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     mongo_db: AsyncIOMotorDatabase = Depends(get_mongo_db_async),
-    current_user: UserResponse = Depends(get_current_user_from_token) # Add this dependency
+    current_user: UserResponse = Depends(get_current_user_from_token), # Add this dependency
+    consistent: bool = Query(False, description=CONSISTENT_DESCRIPTION)
 ):
     # Assign the user_id from the authenticated user
     property_data.user_id = current_user.id
     
     service = PropertyService(db, mongo_db)
     try:
-        new_property = await service.create_property(property_data)
-        # Fetch the full property details including MongoDB fields for the response
-        full_property_details = await service.get_property_by_id(new_property.id) # Add await here
-        if not full_property_details:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to retrieve created property details."
-            )
-        return full_property_details
+        # Assembled from the written data; no re-read from either store
+        return await service.create_property(property_data, consistent=consistent)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+@router.post("/import", response_model=ImportReport)
+async def import_properties_feed(
+    request: Request,
+    file_format: Literal['ndjson', 'csv'] = Query('ndjson', alias="format"),
+    import_id: Optional[str] = None,
+    resume_from: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user_from_token)
+):
+    """
+    Bulk-import listings owned by the current user from an NDJSON or CSV request body.
+
+    The body is streamed, never held in memory. Per-row errors are reported without
+    stopping the import; re-send with the same `import_id` and `resume_from` set to
+    the report's `checkpoint` to resume. The documents reach MongoDB through the outbox.
+    """
+    rows = parse_rows(request.stream(), file_format, skip=resume_from)
+    return await import_properties(db, rows, current_user.id, import_id, resume_from)
+
+# Declared before "/{property_id}" so "export", "search" etc. are not parsed as ids
+@router.get("/export")
+async def export_properties(
+    updated_since: Optional[datetime] = None,
+    gzip: bool = False,
+    mongo_db: AsyncIOMotorDatabase = Depends(get_mongo_db_async),
+    current_user: UserResponse = Depends(get_current_user_from_token)
+):
+    """Stream the catalog as NDJSON, ordered by (updated_at, id); optionally gzip-compressed."""
+    chunks = export_lines(AsyncSessionLocal, mongo_db, updated_since)
+    if gzip:
+        return StreamingResponse(
+            gzip_chunks(chunks), media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="properties.ndjson.gz"'},
+        )
+    return StreamingResponse(chunks, media_type="application/x-ndjson")
+
+
+@router.get("/autocomplete", response_model=List[AddressSuggestion])
+async def autocomplete_addresses(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Addresses and streets with a word starting with `q`, most listings first; served from memory."""
+    return address_index.suggest(q, limit)
+
+
+@router.get("/search", response_model=PropertyPage)
+async def search_properties(
+    filters: PropertySearchParams = Depends(),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    mongo_db: AsyncIOMotorDatabase = Depends(get_mongo_db_async)
+):
+    service = PropertyService(db, mongo_db)
+    try:
+        return await service.search_properties(filters.model_dump(exclude_none=True), page)
+    except ValueError as e:  # bad cursor, bbox or radius parameters
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/facets", response_model=PropertyFacets)
+async def get_property_facets(
+    filters: PropertySearchParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    mongo_db: AsyncIOMotorDatabase = Depends(get_mongo_db_async)
+):
+    """Listing counts by type, status, price band, bedrooms and feature for the given search filters."""
+    service = PropertyService(db, mongo_db)
+    try:
+        return await service.get_facets(filters.model_dump(exclude_none=True))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/map/clusters", response_model=MapClusters)
+async def get_map_clusters(
+    filters: PropertySearchParams = Depends(),
+    zoom: int = Query(..., ge=MIN_ZOOM, le=MAX_ZOOM),
+    db: AsyncSession = Depends(get_db),
+    mongo_db: AsyncIOMotorDatabase = Depends(get_mongo_db_async)
+):
+    """Listing counts per grid cell for the map viewport given by `bbox`."""
+    service = PropertyService(db, mongo_db)
+    try:
+        return await service.get_map_clusters(filters.model_dump(exclude_none=True), zoom)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @router.get("/{property_id}", response_model=PropertyResponse)
 async def get_property_by_id( # Changed to async def
     property_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     mongo_db: AsyncIOMotorDatabase = Depends(get_mongo_db_async) # Changed dependency
 ):
     service = PropertyService(db, mongo_db)
@@ -48,44 +139,44 @@ async def get_property_by_id( # Changed to async def
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Property not found")
     return property_details
 
-@router.get("/user/{user_id}", response_model=List[PropertyResponse])
+@router.get("/user/{user_id}", response_model=PropertyPage)
 async def get_user_properties( # Changed to async def
     user_id: UUID,
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
     mongo_db: AsyncIOMotorDatabase = Depends(get_mongo_db_async) # Changed dependency
 ):
     service = PropertyService(db, mongo_db)
-    properties = await service.get_user_properties(user_id) # Changed to await
-    return properties
+    try:
+        return await service.get_user_properties(user_id, page) # Changed to await
+    except ValueError as e:  # bad cursor, or sort=relevance without a q search
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @router.put("/{property_id}", response_model=PropertyResponse)
 async def update_property( # Changed to async def
     property_id: UUID,
     update_data: PropertyUpdate,
-    db: Session = Depends(get_db),
-    mongo_db: AsyncIOMotorDatabase = Depends(get_mongo_db_async) # Changed dependency
+    db: AsyncSession = Depends(get_db),
+    mongo_db: AsyncIOMotorDatabase = Depends(get_mongo_db_async), # Changed dependency
+    consistent: bool = Query(False, description=CONSISTENT_DESCRIPTION)
 ):
     service = PropertyService(db, mongo_db)
-    updated_property = await service.update_property(property_id, update_data.model_dump(exclude_unset=True)) # Changed to await
+    # Built from the updated row and the update itself, like the create response; not cached
+    updated_property = await service.update_property(
+        property_id, update_data.model_dump(exclude_unset=True), consistent=consistent
+    )
     if not updated_property:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Property not found")
-    
-    # Fetch the full property details including MongoDB fields for the response
-    full_property_details = await service.get_property_by_id(updated_property.id) # Add await here
-    if not full_property_details:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve updated property details."
-        )
-    return full_property_details
+    return updated_property
 
 @router.delete("/{property_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_property( # Changed to async def
     property_id: UUID,
-    db: Session = Depends(get_db),
-    mongo_db: AsyncIOMotorDatabase = Depends(get_mongo_db_async) # Changed dependency
+    db: AsyncSession = Depends(get_db),
+    mongo_db: AsyncIOMotorDatabase = Depends(get_mongo_db_async), # Changed dependency
+    consistent: bool = Query(False, description=CONSISTENT_DESCRIPTION)
 ):
     service = PropertyService(db, mongo_db)
-    if not await service.delete_property(property_id): # Changed to await
+    if not await service.delete_property(property_id, consistent=consistent): # Changed to await
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Property not found")
     return {"message": "Property deleted successfully"}
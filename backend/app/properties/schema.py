@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal, Dict
+from app.properties.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import List, Optional, Literal, Dict, Union
 from uuid import UUID as PyUUID
 from datetime import date, datetime
 
@@ -69,7 +70,7 @@ class Media(BaseModel):
 # --- Main MongoDB Document Schema ---
 
 class PropertyDetailsMongo(BaseModel):
-    sql_property_id: Optional[PyUUID] = None  # linked after SQL insert
+    id: Optional[PyUUID] = Field(None, alias="_id")  # same UUID as the SQL row
     location: Location
     details: Optional[Details] = None
     amenities: Optional[Amenities] = None
@@ -105,7 +106,9 @@ class PropertyResponse(BaseModel):
     property_type: str
     price: float
     status: str
-    mongo_document_id: Optional[str] = None # Add this field
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    distance_km: Optional[float] = None  # only set by radius searches
 
     # MongoDB fields
     location: Optional[Location] = None  # Make location optional
@@ -132,6 +135,107 @@ class PropertyUpdate(BaseModel):
     points_of_interest: Optional[PointsOfInterest] = None
     media: Optional[List[Media]] = None
 
+class PropertySearchParams(BaseModel):
+    # Free text over the title and address (see app.properties.fulltext)
+    q: Optional[str] = Field(None, max_length=200)
+
+    # SQL filters
+    property_type: Optional[Literal['house', 'apartment', 'land', 'commercial']] = None
+    status: Optional[Literal['available', 'rented', 'sold']] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+    # MongoDB filters (see app.properties.search.MONGO_FILTER_FIELDS)
+    location: Optional[str] = None
+    min_bedrooms: Optional[int] = None
+    max_bedrooms: Optional[int] = None
+    min_bathrooms: Optional[int] = None
+    min_floor_size_m2: Optional[int] = None
+    max_floor_size_m2: Optional[int] = None
+    pets_allowed: Optional[bool] = None
+    furnished: Optional[bool] = None
+    pool: Optional[bool] = None
+    balcony: Optional[bool] = None
+    flatlet: Optional[bool] = None
+    retirement: Optional[bool] = None
+    repossessed: Optional[bool] = None
+    on_show: Optional[bool] = None
+    security_estate_cluster: Optional[bool] = None
+    min_parking: Optional[int] = None
+    min_gardens: Optional[int] = None
+
+    # Geospatial filters
+    near_lat: Optional[float] = None
+    near_lng: Optional[float] = None
+    radius_km: Optional[float] = None
+    bbox: Optional[str] = None  # "min_lng,min_lat,max_lng,max_lat"
+
+class PageParams(BaseModel):
+    cursor: Optional[str] = None
+    page_size: int = Field(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    sort: Literal['created_at', 'price', 'relevance'] = 'created_at'  # relevance needs `q`
+    order: Literal['asc', 'desc'] = 'desc'
+
+class PropertyPage(BaseModel):
+    items: List[PropertyResponse]
+    next_cursor: Optional[str] = None  # pass back as `cursor` to fetch the next page
+
+class MapPin(BaseModel):
+    id: PyUUID
+    lat: float
+    lng: float
+    price: Optional[float] = None
+    property_type: Optional[str] = None
+
+class ClusterCell(BaseModel):
+    count: int
+    lat: float  # centroid of the listings in the cell
+    lng: float
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    pins: List[MapPin] = []  # only filled for sparse cells
+
+class MapClusters(BaseModel):
+    zoom: int
+    cell_size_deg: float
+    clusters: List[ClusterCell]
+
+class FacetCount(BaseModel):
+    value: Optional[Union[int, str]] = None  # None counts listings without the field
+    count: int
+
+class PriceBandCount(BaseModel):
+    min_price: float
+    max_price: Optional[float] = None  # None for the open-ended top band
+    count: int
+
+class PropertyFacets(BaseModel):
+    total: int
+    property_type: List[FacetCount] = []
+    status: List[FacetCount] = []
+    price_band: List[PriceBandCount] = []
+    bedrooms: List[FacetCount] = []
+    features: Dict[str, int] = {}  # listings that have each feature
+
+class AddressSuggestion(BaseModel):
+    text: str
+    kind: Literal['address', 'street_address', 'street']  # which Location field it came from
+    listings: int  # listings at this address or street
+
+class ImportRowError(BaseModel):
+    row: int  # 1-based data row (CSV header and blank lines not counted)
+    errors: List[str]
+
+class ImportReport(BaseModel):
+    import_id: str  # pass back with `resume_from` to resume; rows already imported are skipped
+    imported: int = 0
+    skipped: int = 0  # already imported under this import_id
+    failed: int = 0
+    errors: List[ImportRowError] = []  # the first MAX_REPORTED_ERRORS failures
+    checkpoint: int = 0  # last row of the last committed chunk
+    aborted: bool = False
+    error: Optional[str] = None
+
 class Property(PropertyBase):
     id: int
     owner_id: int
@@ -0,0 +1,107 @@
+import re
+from typing import Any, Dict, Optional, Tuple
+
+from app.properties.geo import bbox_filter, validate_near
+
+# Filters answered by columns on the SQL `properties` table
+SQL_FILTERS = ("q", "property_type", "status", "min_price", "max_price")
+
+# Friendly query parameter -> (Mongo document path, comparison operator)
+MONGO_FILTER_FIELDS = {
+    "min_bedrooms": ("details.bedrooms", "$gte"),
+    "max_bedrooms": ("details.bedrooms", "$lte"),
+    "min_bathrooms": ("details.bathrooms", "$gte"),
+    "min_floor_size_m2": ("details.floor_size_m2", "$gte"),
+    "max_floor_size_m2": ("details.floor_size_m2", "$lte"),
+    "pets_allowed": ("amenities.pets_allowed", "$eq"),
+    "furnished": ("amenities.furnished", "$eq"),
+    "pool": ("features.pool", "$eq"),
+    "balcony": ("features.balcony", "$eq"),
+    "flatlet": ("features.flatlet", "$eq"),
+    "retirement": ("features.retirement", "$eq"),
+    "repossessed": ("features.repossessed", "$eq"),
+    "on_show": ("features.on_show", "$eq"),
+    "security_estate_cluster": ("features.security_estate_cluster", "$eq"),
+    "min_parking": ("external_features.parking", "$gte"),
+    "min_gardens": ("external_features.gardens", "$gte"),
+}
+
+# Nested sub-documents that may also be filtered on directly by dotted path,
+# e.g. {"details.bedrooms": 3} or {"features.pool": True}
+MONGO_FILTER_PREFIXES = ("location.", "details.", "amenities.", "features.", "external_features.")
+
+# Radius search parameters; handled by a $geoNear stage rather than a filter clause
+NEAR_FILTERS = ("near_lat", "near_lng", "radius_km")
+
+# Case-insensitive comparison; the location indexes are built with the same collation
+LOCATION_COLLATION = {"locale": "en", "strength": 2}
+
+
+def location_filter(location: str) -> Dict[str, Any]:
+    """Exact, case-insensitive match on either address field (evaluated under LOCATION_COLLATION)."""
+    return {"$or": [{"location.address": location}, {"location.street_address": location}]}
+
+
+def split_filters(filters: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Split a flat search filter into its SQL predicates and a Mongo query document.
+
+    Unknown keys raise ValueError so a typo never silently widens a search.
+    """
+    sql_filters: Dict[str, Any] = {}
+    mongo_clauses = []
+
+    for key, value in filters.items():
+        if value is None:
+            continue
+        if key in SQL_FILTERS:
+            sql_filters[key] = value
+        elif key == "location":
+            if value:
+                mongo_clauses.append(location_filter(value))
+        elif key == "bbox":
+            mongo_clauses.append(bbox_filter(value))
+        elif key in MONGO_FILTER_FIELDS:
+            path, operator = MONGO_FILTER_FIELDS[key]
+            mongo_clauses.append({path: value if operator == "$eq" else {operator: value}})
+        elif key.startswith(MONGO_FILTER_PREFIXES) and re.fullmatch(r"[a-z_]+(\.[a-z_]+)+", key):
+            mongo_clauses.append({key: value})
+        else:
+            raise ValueError(f"Unsupported search filter: {key}")
+
+    if not mongo_clauses:
+        return sql_filters, {}
+    if len(mongo_clauses) == 1:
+        return sql_filters, mongo_clauses[0]
+    return sql_filters, {"$and": mongo_clauses}
+
+
+def pop_near(filters: Dict[str, Any]) -> Optional[Tuple[float, float, float]]:
+    """Remove the radius-search parameters from `filters`, returning (lat, lng, radius_km)."""
+    values = [filters.pop(key, None) for key in NEAR_FILTERS]
+    if all(value is None for value in values):
+        return None
+    if any(value is None for value in values):
+        raise ValueError("near_lat, near_lng and radius_km must be given together")
+    validate_near(*values)
+    return tuple(values)
+
+
+def denormalized_sql_filter(sql_filters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Translate SQL predicates onto the copies of those columns kept on the Mongo document.
+
+    Used to pre-filter inside Mongo-driven plans (e.g. $geoNear); SQL still has the final say.
+    """
+    query: Dict[str, Any] = {}
+    for key in ("property_type", "status"):
+        if key in sql_filters:
+            query[key] = sql_filters[key]
+    price = {}
+    if "min_price" in sql_filters:
+        price["$gte"] = sql_filters["min_price"]
+    if "max_price" in sql_filters:
+        price["$lte"] = sql_filters["max_price"]
+    if price:
+        query["price"] = price
+    return query
@@ -1,144 +1,234 @@
-from typing import Optional, List, Dict, Any
+import asyncio
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
 from uuid import UUID, uuid4
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from pymongo.errors import PyMongoError
 import logging
 
 from app.properties.models import Property
-from app.properties.schema import PropertyCreate, PropertyResponse
+from app.properties.autocomplete import address_index
+from app.properties.cache import facet_cache, property_cache, property_fetches, property_generations
+from app.properties.clustering import SPARSE_CELL_THRESHOLD, cell_size_for_zoom, cluster_pipeline
+from app.properties.facets import (
+    FACET_ID_CHUNK, build_facets, facet_cache_key, facet_pipeline, merge_facet_documents, sql_facet_query
+)
+from app.properties.fulltext import search_address, text_match
+from app.properties.geo import geo_point, near_filter
+from app.properties.identity import LEGACY_ID_FIELD, document_property_id, id_filter, ids_filter
+from app.properties.outbox import apply_pending, enqueue, outbox_worker
+from app.properties.pagination import (
+    RELEVANCE, apply_keyset, decode_cursor, decode_distance_cursor, encode_cursor, encode_distance_cursor
+)
+from app.properties.schema import (
+    ClusterCell, MapClusters, PageParams, PropertyCreate, PropertyFacets, PropertyPage, PropertyResponse
+)
+from app.properties.search import LOCATION_COLLATION, denormalized_sql_filter, pop_near, split_filters
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on the rows counted when estimating how selective each side of a search is
+SEARCH_ESTIMATE_CAP = 1000
+
+# SQL columns copied onto the Mongo document so Mongo-driven plans can pre-filter on them
+DENORMALIZED_SQL_FIELDS = ("title", "property_type", "price", "status")
+
+# Columns owned by PostgreSQL; the Mongo copy of these is never trusted over SQL
+SQL_RESPONSE_FIELDS = ("id", "user_id", "title", "property_type", "price", "status", "created_at", "updated_at")
+
+
+def build_property_response(db_property: Property, mongo_document: Optional[Dict[str, Any]]) -> PropertyResponse:
+    """Merge a SQL row with its Mongo document into a PropertyResponse."""
+    data = {
+        key: value
+        for key, value in (mongo_document or {}).items()
+        if key in PropertyResponse.model_fields and key not in SQL_RESPONSE_FIELDS
+    }
+    for field in SQL_RESPONSE_FIELDS:
+        data[field] = getattr(db_property, field)
+    return PropertyResponse.model_validate(data)
+
+
+def new_property_records(
+    property_data: PropertyCreate, property_id: Optional[UUID] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """The SQL column values and the Mongo document for a new listing, sharing one id."""
+    property_id = property_id or uuid4()
+    now = datetime.utcnow()
+    sql_values = {
+        "id": property_id,
+        "user_id": property_data.user_id,
+        "title": property_data.title,
+        "property_type": property_data.property_type,
+        "price": property_data.price,
+        "status": property_data.status,
+        "created_at": now,
+        "updated_at": now,
+        "search_address": search_address(property_data.location.model_dump()),
+    }
+
+    mongo_data = property_data.model_dump(exclude_unset=True)
+    mongo_data["_id"] = str(property_id)
+    if property_data.user_id:
+        mongo_data["user_id"] = str(property_data.user_id)
+    # Copies of the SQL columns, fields left at their schema defaults included
+    for field in DENORMALIZED_SQL_FIELDS:
+        mongo_data[field] = getattr(property_data, field)
+    mongo_data["geo"] = geo_point(mongo_data["location"]["coordinates"])
+    return sql_values, mongo_data
+
+
 class PropertyService:
     """Service class for handling property operations across PostgreSQL and MongoDB."""
 
-    def __init__(self, db: Session, mongo_db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncSession, mongo_db: AsyncIOMotorDatabase, cache=property_cache,
+                 fetches=property_fetches, facets_cache=facet_cache, suggestions=address_index,
+                 generations=property_generations):
         self.db = db
         self.mongo_db = mongo_db
         self.properties_collection = self.mongo_db.properties # Get the collection here
+        self.cache = cache  # detail cache (app.core.cache); None disables it
+        self.fetches = fetches  # app.core.singleflight group; None disables coalescing
+        self.facets_cache = facets_cache  # facet counts per normalized filter set; None disables it
+        self.suggestions = suggestions  # address autocomplete index, kept current on writes; None skips it
+        self.generations = generations  # app.core.cache.Generations guarding cache fills against writes
+
+    async def create_property(self, property_data: PropertyCreate, consistent: bool = False) -> PropertyResponse:
+        """
+        Create a property; the SQL row and its outbox entry commit in one transaction.
+
+        The Mongo document is written by the outbox worker (app.properties.outbox), so
+        the request only waits on PostgreSQL. With `consistent`, the document is written
+        before returning (read-your-writes for the author). The property id (also the
+        Mongo `_id`) is assigned up front and the response is assembled from the data
+        already in hand.
+        """
+        sql_values, mongo_data = new_property_records(property_data)
+        db_property = Property(**sql_values)
 
-    async def create_property(self, property_data: PropertyCreate) -> PropertyResponse:
         try:
-            # Create SQL property
-            sql_property_id = uuid4()
-            db_property = Property(
-                id=sql_property_id,
-                user_id=property_data.user_id,
-                title=property_data.title,
-                property_type=property_data.property_type,
-                price=property_data.price,
-                status=property_data.status,
-            )
             self.db.add(db_property)
-            self.db.commit()
-            self.db.refresh(db_property)
-
-            # Prepare data for MongoDB
-            mongo_data = property_data.model_dump(exclude_unset=True)
-            mongo_data["sql_property_id"] = str(sql_property_id) # Link to SQL ID
-            
-            # Convert user_id to string for MongoDB
-            if property_data.user_id:
-                mongo_data["user_id"] = str(property_data.user_id)
-
-            # Insert into MongoDB
-            # Corrected: Use insert_one on the collection
-            mongo_result = await self.properties_collection.insert_one(mongo_data)
-            mongo_document_id = str(mongo_result.inserted_id)
-
-            # Update SQL property with MongoDB document ID
-            db_property.mongo_document_id = mongo_document_id
-            self.db.commit()
-            self.db.refresh(db_property)
-
-            # Combine data for response
-            # Convert db_property to a dictionary and merge with mongo_data
-            # Ensure all fields expected by PropertyResponse are present
-            combined_data = db_property.__dict__.copy()
-            combined_data.update(mongo_data)
-            
-            # Remove SQLAlchemy internal state if present
-            combined_data.pop('_sa_instance_state', None)
-
-            # Create PropertyResponse from the combined data
-            response_obj = PropertyResponse.model_validate(combined_data)
-
-            return response_obj
+            entry = enqueue(self.db, db_property.id, "insert", mongo_data)
+            await self.db.commit()
         except Exception as e:
-            self.db.rollback()
-            print(f"Failed to create property: {e}")
+            await self.db.rollback()
+            logger.error(f"Failed to create property: {e}")
             raise e
 
+        if self.suggestions is not None:
+            self.suggestions.set_location(db_property.id, mongo_data["location"])
+        await self._after_write(db_property.id, entry.id, consistent)
+        return build_property_response(db_property, mongo_data)
+
     async def get_property_by_id(self, property_id: UUID) -> Optional[PropertyResponse]:
+        """Fetch one property, served from the detail cache when possible."""
+        key = str(property_id)
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return PropertyResponse.model_validate_json(cached)
+
+        if self.fetches is None:
+            return await self._load_and_cache(property_id, self.db)
+        return await self.fetches.do(key, lambda: self._shared_load(property_id))
+
+    async def _shared_load(self, property_id: UUID) -> Optional[PropertyResponse]:
+        """
+        The coalesced fetch, on a session of its own.
+
+        It keeps running for the other waiters when the request that started it is
+        cancelled or finishes, and get_db closes that request's session either way.
+        """
+        async with AsyncSession(self.db.bind, autoflush=False, expire_on_commit=False) as db:
+            return await self._load_and_cache(property_id, db)
+
+    async def _load_and_cache(self, property_id: UUID, db: AsyncSession) -> Optional[PropertyResponse]:
+        key = str(property_id)
+        generation = self.generations.current(key)
+        property_details = await self._load_property(property_id, db)
+        # No location means the document has not been synced yet; don't cache the partial view
+        if property_details is not None and property_details.location is not None and self.cache is not None:
+            # Skipped if a write invalidated the key while this load ran: what it read may predate it
+            if self.generations.current(key) == generation:
+                await self.cache.set(key, property_details.model_dump_json().encode())
+        return property_details
+
+    async def _invalidate(self, property_id: UUID):
+        self.generations.bump(str(property_id))
+        if self.fetches is not None:
+            self.fetches.forget(str(property_id))
+        if self.cache is not None:
+            await self.cache.delete(str(property_id))
+
+    async def _after_write(self, property_id: UUID, entry_id: Optional[int], consistent: bool):
+        """Sync the committed outbox entry now (`consistent`) or hand it to the worker."""
+        if entry_id is not None:
+            if consistent:
+                try:
+                    await apply_pending(self.db, self.properties_collection,
+                                        property_id=property_id, up_to_id=entry_id)
+                except SQLAlchemyError as e:
+                    await self.db.rollback()
+                    logger.error(f"Failed to sync property {property_id} to MongoDB: {e}")
+            else:
+                outbox_worker.notify()
+        await self._invalidate(property_id)
+
+    async def _load_property(self, property_id: UUID, db: AsyncSession) -> Optional[PropertyResponse]:
         """Fetch one property from both SQL and Mongo."""
         try:
-            db_property = self.db.query(Property).filter(Property.id == property_id).first()
+            # Both lookups are keyed by the id alone, so they run side by side
+            db_property, mongo_document = await asyncio.gather(
+                db.scalar(select(Property).filter(Property.id == property_id)),
+                self.properties_collection.find_one(id_filter(property_id)),
+            )
             if not db_property:
                 return None
 
-            # Assuming get_property_by_sql_id returns a dictionary
-            mongo_document = await self.properties_collection.find_one({"sql_property_id": str(property_id)})
             if not mongo_document:
-                logger.warning(f"Property {property_id} found in SQL but not in MongoDB")
-                return None
-
-            # Create PropertyResponse from db_property
-            response_obj = PropertyResponse.model_validate(db_property)
+                # Usually a new listing the outbox worker has not synced yet
+                logger.info(f"Property {property_id} found in SQL but not yet in MongoDB")
 
-            # Update with MongoDB fields from mongo_document
-            # Remove _id from mongo_document if present, as it's not in PropertyResponse
-            if "_id" in mongo_document:
-                del mongo_document["_id"]
-            
-            # Remove sql_property_id from mongo_document if present, as it's already handled by db_property.id
-            if "sql_property_id" in mongo_document:
-                del mongo_document["sql_property_id"]
-
-            # Update response_obj with remaining mongo_document fields
-            for key, value in mongo_document.items():
-                if hasattr(response_obj, key):
-                    setattr(response_obj, key, value)
-
-            return response_obj
+            return build_property_response(db_property, mongo_document)
 
         except (SQLAlchemyError, PyMongoError) as e:
             logger.error(f"Failed to get property {property_id}: {e}")
             return None
 
-    async def get_user_properties(self, user_id: UUID) -> List[PropertyResponse]:
-        """Fetch all properties owned by a user."""
+    async def get_mongo_documents(self, property_ids: List[UUID]) -> Dict[str, Dict[str, Any]]:
+        """Fetch the Mongo documents for a batch of SQL ids in a single `$in` query."""
+        if not property_ids:
+            return {}
+
+        cursor = self.properties_collection.find(ids_filter(property_ids))
+        documents = await cursor.to_list(length=len(property_ids))
+        return {document_property_id(document): document for document in documents}
+
+    async def get_user_properties(self, user_id: UUID, page: Optional[PageParams] = None) -> PropertyPage:
+        """Fetch one page of the properties owned by a user."""
+        page = page or PageParams()
         try:
-            db_properties = self.db.query(Property).filter(Property.user_id == user_id).all()
-            result = []
-
-            for db_property in db_properties:
-                mongo_document = self.mongo_db.get_property_by_sql_id(str(db_property.id))
-                item = {
-                    "id": db_property.id,
-                    "user_id": db_property.user_id,
-                    "title": db_property.title,
-                    "property_type": db_property.property_type,
-                    "price": float(db_property.price) if db_property.price else None,
-                    "status": db_property.status,
-                    "created_at": db_property.created_at,
-                    "mongo_document_id": db_property.mongo_document_id,
-                }
-                if mongo_document:
-                    item.update(mongo_document)
-                result.append(item)
-
-            return result
+            query = select(Property).filter(Property.user_id == user_id)
+            return await self._sql_driven_page(query, {}, {}, page, require_document=False)
 
         except (SQLAlchemyError, PyMongoError) as e:
             logger.error(f"Failed to get properties for user {user_id}: {e}")
-            return []
+            return PropertyPage(items=[])
+
+    async def update_property(self, property_id: UUID, update_data: dict,
+                              consistent: bool = False) -> Optional[PropertyResponse]:
+        """
+        Update a property in SQL and queue the matching Mongo `$set` in the same transaction.
 
-    async def update_property(self, property_id: UUID, update_data: dict) -> Optional[PropertyResponse]:
-        """Update property in both SQL and MongoDB."""
+        The response is the updated row merged with the stored document, with that `$set`
+        applied on top, so it shows the update whether or not the outbox has synced it
+        yet. It is read past the detail cache and not stored there.
+        """
         try:
-            db_property = self.db.query(Property).filter(Property.id == property_id).first()
+            db_property = await self.db.scalar(select(Property).filter(Property.id == property_id))
             if not db_property:
                 return None
 
@@ -153,87 +243,358 @@ class PropertyService:
 
             for k, v in sql_updates.items():
                 setattr(db_property, k, v)
+            db_property.updated_at = datetime.utcnow()
 
-            if mongo_updates and db_property.mongo_document_id:
-                self.mongo_db.update_property(db_property.mongo_document_id, mongo_updates)
+            # Keep the Mongo copies of SQL columns (used for geo/facet pre-filtering) in step
+            mongo_updates.update({k: v for k, v in sql_updates.items() if k in DENORMALIZED_SQL_FIELDS})
+            if mongo_updates.get("location"):
+                mongo_updates["geo"] = geo_point(mongo_updates["location"]["coordinates"])
+                db_property.search_address = search_address(mongo_updates["location"])
 
-            self.db.commit()
-            self.db.refresh(db_property)
-            return db_property
+            # Flushing takes the row lock first, so outbox ids follow the order of changes (see outbox)
+            await self.db.flush()
+            entry = enqueue(self.db, property_id, "update", mongo_updates) if mongo_updates else None
+            await self.db.commit()
 
-        except (SQLAlchemyError, PyMongoError) as e:
-            self.db.rollback()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
             logger.error(f"Failed to update property {property_id}: {e}")
             return None
 
-    async def delete_property(self, property_id: UUID) -> bool:
-        """Delete property from both SQL and MongoDB."""
+        if self.suggestions is not None and mongo_updates.get("location"):
+            self.suggestions.set_location(property_id, mongo_updates["location"])
+        await self._after_write(property_id, entry.id if entry else None, consistent)
+        await self.db.refresh(db_property)
         try:
-            db_property = self.db.query(Property).filter(Property.id == property_id).first()
+            mongo_document = await self.properties_collection.find_one(id_filter(property_id))
+        except PyMongoError as e:
+            logger.error(f"Failed to read the document of updated property {property_id}: {e}")
+            mongo_document = None
+        return build_property_response(db_property, {**(mongo_document or {}), **mongo_updates})
+
+    async def delete_property(self, property_id: UUID, consistent: bool = False) -> bool:
+        """Delete a property from SQL and queue the Mongo delete in the same transaction."""
+        try:
+            db_property = await self.db.scalar(select(Property).filter(Property.id == property_id))
             if not db_property:
                 return False
 
-            if db_property.mongo_document_id:
-                self.mongo_db.delete_property(db_property.mongo_document_id)
-
-            self.db.delete(db_property)
-            self.db.commit()
-            return True
+            await self.db.delete(db_property)
+            await self.db.flush()
+            entry = enqueue(self.db, property_id, "delete")
+            await self.db.commit()
 
-        except (SQLAlchemyError, PyMongoError) as e:
-            self.db.rollback()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
             logger.error(f"Failed to delete property {property_id}: {e}")
             return False
 
-    def search_properties(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Search properties using SQL and Mongo filters."""
-        try:
-            query = self.db.query(Property)
-
-            # SQL filters
-            if "property_type" in filters:
-                query = query.filter(Property.property_type == filters["property_type"])
-            if "min_price" in filters:
-                query = query.filter(Property.price >= filters["min_price"])
-            if "max_price" in filters:
-                query = query.filter(Property.price <= filters["max_price"])
-            if "status" in filters:
-                query = query.filter(Property.status == filters["status"])
-
-            db_properties = query.all()
-            results = []
-
-            for db_property in db_properties:
-                mongo_document = self.mongo_db.get_property_by_sql_id(str(db_property.id))
-                if not mongo_document:
-                    continue
+        if self.suggestions is not None:
+            self.suggestions.remove(property_id)
+        await self._after_write(property_id, entry.id, consistent)
+        return True
+
+    def _sql_search_query(self, sql_filters: Dict[str, Any]):
+        query = select(Property)
+        if "q" in sql_filters:
+            query = query.filter(text_match(sql_filters["q"], self.db.bind.dialect.name)[0])
+        if "property_type" in sql_filters:
+            query = query.filter(Property.property_type == sql_filters["property_type"])
+        if "min_price" in sql_filters:
+            query = query.filter(Property.price >= sql_filters["min_price"])
+        if "max_price" in sql_filters:
+            query = query.filter(Property.price <= sql_filters["max_price"])
+        if "status" in sql_filters:
+            query = query.filter(Property.status == sql_filters["status"])
+        return query
+
+    async def _estimate_sql_matches(self, query) -> int:
+        capped = query.with_only_columns(Property.id).limit(SEARCH_ESTIMATE_CAP).subquery()
+        return await self.db.scalar(select(func.count()).select_from(capped))
+
+    async def search_properties(self, filters: Dict[str, Any], page: Optional[PageParams] = None) -> PropertyPage:
+        """
+        Search properties using SQL and Mongo filters, one keyset page at a time.
+
+        The filter is split into SQL column predicates and Mongo document predicates.
+        When both sides filter, whichever matches fewer rows (counted up to
+        SEARCH_ESTIMATE_CAP) runs first and its ids restrict the other side.
+        A radius search (near_lat/near_lng/radius_km) always runs in Mongo first
+        and is ordered by distance instead of `page.sort`. A free-text `q` is matched in
+        SQL and may be ordered by rank with `page.sort == "relevance"`.
+        """
+        page = page or PageParams()
+        filters = dict(filters)
+        near = pop_near(filters)
+        sql_filters, mongo_filter = split_filters(filters)
+        find_options = {"collation": LOCATION_COLLATION} if filters.get("location") else {}
+        rank = text_match(sql_filters["q"], self.db.bind.dialect.name)[1] if "q" in sql_filters else None
 
-                include = True
-                if "location" in filters and filters["location"]:
-                    loc_filter = filters["location"].lower()
-                    mongo_loc = mongo_document.get("location", {})
-                    if not any(
-                        mongo_loc.get(field, "").lower() == loc_filter
-                        for field in ["address", "street_address"]
-                    ):
-                        include = False
-
-                if include:
-                    item = {
-                        "id": db_property.id,
-                        "user_id": db_property.user_id,
-                        "title": db_property.title,
-                        "property_type": db_property.property_type,
-                        "price": float(db_property.price) if db_property.price else None,
-                        "status": db_property.status,
-                        "created_at": db_property.created_at,
-                        "mongo_document_id": db_property.mongo_document_id,
-                    }
-                    item.update(mongo_document)
-                    results.append(item)
-
-            return results
+        try:
+            query = self._sql_search_query(sql_filters)
+            if near:
+                return await self._near_page(near, query, sql_filters, mongo_filter, find_options, page)
+            if not mongo_filter:
+                return await self._sql_driven_page(query, {}, {}, page, rank=rank)
+
+            mongo_count = self.properties_collection.count_documents(
+                mongo_filter, limit=SEARCH_ESTIMATE_CAP, **find_options
+            )
+            if sql_filters:
+                mongo_estimate, sql_estimate = await asyncio.gather(
+                    mongo_count, self._estimate_sql_matches(query)
+                )
+            else:
+                mongo_estimate, sql_estimate = await mongo_count, SEARCH_ESTIMATE_CAP
+            mongo_first = mongo_estimate < SEARCH_ESTIMATE_CAP and mongo_estimate <= sql_estimate
+            if not mongo_first:
+                return await self._sql_driven_page(query, mongo_filter, find_options, page, rank=rank)
+
+            # Mongo matched fewer than SEARCH_ESTIMATE_CAP documents: narrow SQL to those ids
+            cursor = self.properties_collection.find(mongo_filter, {"_id": 1, LEGACY_ID_FIELD: 1}, **find_options)
+            matched = await cursor.to_list(length=SEARCH_ESTIMATE_CAP)
+            if not matched:
+                return PropertyPage(items=[])
+            query = query.filter(Property.id.in_([UUID(document_property_id(d)) for d in matched]))
+            return await self._sql_driven_page(query, {}, {}, page, rank=rank)
 
         except (SQLAlchemyError, PyMongoError) as e:
             logger.error(f"Failed to search properties: {e}")
-            return []
+            return PropertyPage(items=[])
+
+    async def get_map_clusters(self, filters: Dict[str, Any], zoom: int) -> MapClusters:
+        """
+        Aggregate the listings inside filters["bbox"] into grid cells for a map viewport.
+
+        Runs as a single Mongo aggregation: SQL predicates are applied to the Mongo copies
+        of those columns, and only sparse cells carry individual pins.
+        """
+        filters = dict(filters)
+        if not filters.get("bbox"):
+            raise ValueError("bbox is required for map clusters")
+        if pop_near(filters):
+            raise ValueError("Radius search cannot be combined with map clusters")
+        if filters.get("q"):
+            raise ValueError("Free-text search cannot be combined with map clusters")
+        sql_filters, mongo_filter = split_filters(filters)
+        find_options = {"collation": LOCATION_COLLATION} if filters.get("location") else {}
+
+        clauses = [c for c in (mongo_filter, denormalized_sql_filter(sql_filters)) if c]
+        match = clauses[0] if len(clauses) == 1 else {"$and": clauses}
+        cell_size = cell_size_for_zoom(zoom)
+
+        clusters = []
+        try:
+            cursor = self.properties_collection.aggregate(cluster_pipeline(match, cell_size), **find_options)
+            async for cell in cursor:
+                clusters.append(ClusterCell(
+                    count=cell["count"],
+                    lat=cell["lat"],
+                    lng=cell["lng"],
+                    min_price=cell["min_price"],
+                    max_price=cell["max_price"],
+                    pins=cell["pins"] if cell["count"] <= SPARSE_CELL_THRESHOLD else [],
+                ))
+        except PyMongoError as e:
+            logger.error(f"Failed to build map clusters: {e}")
+
+        return MapClusters(zoom=zoom, cell_size_deg=cell_size, clusters=clusters)
+
+    async def get_facets(self, filters: Dict[str, Any]) -> PropertyFacets:
+        """
+        Counts per facet value for a search filter set, for the filter sidebar.
+
+        Without document filters, the SQL facets come from one GROUPING SETS query and the
+        document facets from one $facet aggregation (pre-filtered on the Mongo copies of the
+        SQL columns), run side by side. A filter on document fields cannot be applied in
+        SQL, so then every facet comes from the $facet aggregation alone. A free-text `q`
+        is matched in SQL only, so its matching ids restrict the document facets (see
+        _text_facets). Results are cached for FACET_CACHE_TTL_SECONDS per normalized
+        filter set.
+        """
+        key = facet_cache_key(filters)
+        if self.facets_cache is not None:
+            cached = await self.facets_cache.get(key)
+            if cached is not None:
+                return PropertyFacets.model_validate_json(cached)
+
+        filters = dict(filters)
+        near = pop_near(filters)
+        sql_filters, mongo_filter = split_filters(filters)
+        find_options = {"collation": LOCATION_COLLATION} if filters.get("location") else {}
+        sql_side = not mongo_filter and not near
+        if "q" in sql_filters and not sql_side:
+            raise ValueError("Free-text facets cannot be combined with location or document filters")
+
+        try:
+            if "q" in sql_filters:
+                facets = await self._text_facets(sql_filters)
+            else:
+                facets = await self._filter_facets(sql_filters, mongo_filter, near, find_options)
+        except (SQLAlchemyError, PyMongoError) as e:
+            logger.error(f"Failed to compute facets: {e}")
+            return PropertyFacets(total=0)
+
+        if self.facets_cache is not None:
+            await self.facets_cache.set(key, facets.model_dump_json().encode())
+        return facets
+
+    async def _filter_facets(self, sql_filters: Dict[str, Any], mongo_filter: Dict[str, Any], near,
+                             find_options: Dict[str, Any]) -> PropertyFacets:
+        sql_side = not mongo_filter and not near
+        clauses = [c for c in (mongo_filter, near and near_filter(*near), denormalized_sql_filter(sql_filters)) if c]
+        match = clauses[0] if len(clauses) == 1 else ({"$and": clauses} if clauses else {})
+        pipeline = facet_pipeline(match, include_sql_facets=not sql_side)
+        aggregation = self.properties_collection.aggregate(pipeline, **find_options).to_list(length=1)
+        if sql_side:
+            query = sql_facet_query(self._sql_search_query(sql_filters), self.db.bind.dialect.name)
+            documents, sql_result = await asyncio.gather(aggregation, self.db.execute(query))
+            return build_facets(documents[0] if documents else {}, sql_result.all())
+        documents = await aggregation
+        return build_facets(documents[0] if documents else {})
+
+    async def _text_facets(self, sql_filters: Dict[str, Any]) -> PropertyFacets:
+        """
+        Facets for a free-text search, with both halves counting the same listings.
+
+        The ids matching in SQL restrict the document facets: one $facet aggregation per
+        FACET_ID_CHUNK ids, run side by side with the SQL facet query and summed.
+        """
+        query = self._sql_search_query(sql_filters)
+        ids = (await self.db.scalars(query.with_only_columns(Property.id))).all()
+        aggregations = [
+            self.properties_collection.aggregate(
+                facet_pipeline(ids_filter(ids[start:start + FACET_ID_CHUNK]), include_sql_facets=False)
+            ).to_list(length=1)
+            for start in range(0, len(ids), FACET_ID_CHUNK)
+        ]
+        sql_result, *documents = await asyncio.gather(
+            self.db.execute(sql_facet_query(query, self.db.bind.dialect.name)), *aggregations
+        )
+        return build_facets(merge_facet_documents(d[0] for d in documents if d), sql_result.all())
+
+    async def _near_page(
+        self, near, query, sql_filters: Dict[str, Any], mongo_filter: Dict[str, Any],
+        find_options: Dict[str, Any], page: PageParams,
+    ) -> PropertyPage:
+        """
+        One distance-ordered page of a radius search.
+
+        $geoNear walks the 2dsphere index outward from the centre, pre-filtering on the
+        Mongo copies of the SQL columns; the SQL filters then confirm each candidate.
+        """
+        lat, lng, radius_km = near
+        clauses = [c for c in (mongo_filter, denormalized_sql_filter(sql_filters)) if c]
+        geo_near = {
+            "near": geo_point({"lat": lat, "lng": lng}),
+            "key": "geo",
+            "distanceField": "distance_m",
+            "maxDistance": radius_km * 1000,
+            "spherical": True,
+        }
+        min_distance, seen_at_min = 0.0, []
+        if page.cursor:
+            min_distance, seen_at_min = decode_distance_cursor(page.cursor)
+            geo_near["minDistance"] = min_distance
+            clauses.append({"$nor": [ids_filter(seen_at_min)]})
+        if clauses:
+            geo_near["query"] = clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+        pipeline = [{"$geoNear": geo_near}, {"$limit": page.page_size + 1}]
+        documents = await self.properties_collection.aggregate(pipeline, **find_options).to_list(length=None)
+        if not documents:
+            return PropertyPage(items=[])
+
+        candidates = documents[:page.page_size]
+        rows = (await self.db.scalars(
+            query.filter(Property.id.in_([UUID(document_property_id(d)) for d in candidates]))
+        )).all()
+        rows_by_id = {str(row.id): row for row in rows}
+
+        items = []
+        for document in candidates:
+            db_property = rows_by_id.get(document_property_id(document))
+            if db_property is not None:
+                item = build_property_response(db_property, document)
+                item.distance_km = round(document["distance_m"] / 1000, 3)
+                items.append(item)
+
+        next_cursor = None
+        if len(documents) > page.page_size:
+            last_distance = candidates[-1]["distance_m"]
+            tied_ids = [document_property_id(d) for d in candidates if d["distance_m"] == last_distance]
+            if last_distance == min_distance:
+                # The whole page sat on the previous boundary; keep excluding those too
+                tied_ids += seen_at_min
+            next_cursor = encode_distance_cursor(last_distance, tied_ids)
+        return PropertyPage(items=items, next_cursor=next_cursor)
+
+    async def _sql_driven_page(
+        self, query, mongo_filter: Dict[str, Any], find_options: Dict[str, Any], page: PageParams,
+        require_document: bool = True, rank=None,
+    ) -> PropertyPage:
+        """
+        Walk `query` in keyset order, joining each SQL batch to Mongo, until a page is full.
+
+        Without a Mongo filter the first batch normally fills the page. Rows whose document
+        does not match `mongo_filter` are dropped, as are rows with no document at all
+        unless `require_document` is False. While the page is short, the next batch (twice
+        as large, up to SEARCH_ESTIMATE_CAP) is fetched from where the previous one stopped.
+
+        When `mongo_filter` may drop rows, the next SQL batch is read while Mongo joins
+        the current one. `rank` is the full-text rank expression, used by the relevance sort.
+        """
+        if page.sort == RELEVANCE and rank is None:
+            raise ValueError("sort=relevance requires a q search")
+        rank_column = rank.label("search_rank") if page.sort == RELEVANCE else None
+        after = decode_cursor(page.cursor, page.sort, page.order) if page.cursor else None
+        batch_size = page.page_size + 1
+        items: List[PropertyResponse] = []
+        last_returned = None
+
+        async def fetch_batch(after, size):
+            """(row, sort key) pairs of the next batch."""
+            keyset = apply_keyset(query, page.sort, page.order, after, rank_column).limit(size)
+            if rank_column is None:
+                return [(row, getattr(row, page.sort)) for row in (await self.db.scalars(keyset)).all()]
+            return [tuple(row) for row in (await self.db.execute(keyset.add_columns(rank_column))).all()]
+
+        batch = await fetch_batch(after, batch_size)
+        while batch:
+            mongo_query = ids_filter(p.id for p, _ in batch)
+            if mongo_filter:
+                mongo_query = {"$and": [mongo_filter, mongo_query]}
+            cursor = self.properties_collection.find(mongo_query, **find_options)
+
+            has_more = len(batch) == batch_size
+            after = (batch[-1][1], batch[-1][0].id)
+            next_size = min(batch_size * 2, SEARCH_ESTIMATE_CAP)
+            if has_more and mongo_filter:
+                found, next_batch = await asyncio.gather(
+                    cursor.to_list(length=len(batch)), fetch_batch(after, next_size)
+                )
+            else:
+                found, next_batch = await cursor.to_list(length=len(batch)), None
+            documents = {document_property_id(d): d for d in found}
+
+            for db_property, sort_value in batch:
+                document = documents.get(str(db_property.id))
+                if document is None and (require_document or mongo_filter):
+                    continue
+                if len(items) == page.page_size:
+                    # One more match exists beyond this page
+                    last_property, last_value = last_returned
+                    return PropertyPage(items=items, next_cursor=encode_cursor(
+                        last_property, page.sort, page.order, last_value
+                    ))
+                items.append(build_property_response(db_property, document))
+                last_returned = (db_property, sort_value)
+
+            if not has_more:
+                break
+            batch_size = next_size
+            if next_batch is None:
+                next_batch = await fetch_batch(after, batch_size)
+            batch = next_batch
+
+        return PropertyPage(items=items)
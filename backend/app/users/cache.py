@@ -0,0 +1,20 @@
+from app.config import settings
+from app.core.cache import build_cache
+
+# Serialized Principal JSON keyed by token subject (the user's email); see app.core.security.
+# Each process has its own copy unless PRINCIPAL_CACHE_BACKEND is "redis", so an
+# invalidation made in one worker reaches the others only through the TTL.
+principal_cache = build_cache(
+    settings.PRINCIPAL_CACHE_BACKEND,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_bytes=settings.PRINCIPAL_CACHE_MAX_ENTRIES * 1024,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    redis_url=settings.REDIS_URL,
+    prefix="realestate:principal:",
+)
+
+
+async def invalidate_principal(subject: str):
+    """Drop a cached principal; call after changing a user's role, is_active or email."""
+    if principal_cache is not None:
+        await principal_cache.delete(subject)
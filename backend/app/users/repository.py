@@ -1,25 +1,46 @@
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .models import User
+from .cache import invalidate_principal
 from .schemas import UserCreate
-from app.core.password_utils import get_password_hash
+from app.core.hashing import password_hasher
 
 class UserRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_by_email(self, email: str) -> Optional[User]:
-        return self.db.query(User).filter(User.email == email).first()
+    async def get_by_email(self, email: str) -> Optional[User]:
+        return await self.db.scalar(select(User).filter(User.email == email))
 
-    def create(self, user: UserCreate) -> User:
+    async def create(self, user: UserCreate) -> User:
         db_user = User(
             email=user.email,
             first_name=user.first_name,
             last_name=user.last_name,
             phone_number=user.phone_number,
-            hashed_password=get_password_hash(user.password)
+            hashed_password=await password_hasher.hash(user.password)
         )
         self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
         return db_user
+
+    async def update_access(self, user: User, is_active: Optional[bool] = None,
+                            role: Optional[str] = None) -> User:
+        """
+        Change whether a user may sign in and what they may do.
+
+        The change reaches this process's next request at once, and every process's with
+        the redis principal cache; other workers see it once their cached entry expires
+        (PRINCIPAL_CACHE_TTL_SECONDS). Changes made outside this method always wait for
+        the TTL.
+        """
+        if is_active is not None:
+            user.is_active = is_active
+        if role is not None:
+            user.role = role
+        await self.db.commit()
+        # Only after the commit: a miss in between would re-cache the old values
+        await invalidate_principal(user.email)
+        return user
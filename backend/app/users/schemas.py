@@ -23,6 +23,10 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes=True
 
+class Principal(UserResponse):
+    """The authenticated user as cached per token subject; see app.core.security."""
+    is_active: bool | None = True
+
 class UserOut(BaseModel):
     id: UUID
     email: EmailStr
@@ -1,28 +1,34 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.users.models import User
 from app.users.schemas import UserCreate
-from app.core.security import get_password_hash, verify_password
+from app.core.hashing import password_hasher
 from db.database import get_db
 from fastapi import Depends 
 
 
-def get_user(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+async def get_user(db: AsyncSession, email: str):
+    return await db.scalar(select(User).filter(User.email == email))
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+async def create_user(db: AsyncSession, user: UserCreate):
+    hashed_password = await password_hasher.hash(user.password)
     db_user = User(email=user.email, hashed_password=hashed_password ,first_name=user.first_name, last_name=user.last_name, phone_number=user.phone_number)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user(db, email)
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await get_user(db, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash is not None:
+        # Stored under an older hashing policy; upgrade it while we have the plain password
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 # Remove the following incomplete function
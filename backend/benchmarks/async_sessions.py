@@ -0,0 +1,129 @@
+"""
+Concurrent-request throughput with a sync Session versus an AsyncSession.
+
+Each simulated request does what GET /properties/{id} does: one SQL lookup by primary
+key plus one awaited Mongo round trip (simulated with asyncio.sleep). In "sync" mode the
+SQL call blocks the event loop, as the routes did with the old sync `get_db`; in "async"
+mode it goes through the AsyncSession used by the routes now.
+
+On SQLite a `sleep_ms()` SQL function stands in for server-side query latency; against
+PostgreSQL (--database-url postgresql://...) the real network round trip is measured.
+
+Usage:
+    python -m benchmarks.async_sessions --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from db.database import Base, create_async_db_engine
+from app.properties.models import Property
+from app.users.models import User
+
+
+def install_sleep_function(sync_engine):
+    @event.listens_for(sync_engine, "connect")
+    def register(dbapi_connection, connection_record):
+        dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or 1)
+
+
+def seed(url: str, listings: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        owner = User(email=f"bench-{uuid.uuid4()}@example.com", hashed_password="x", role="owner")
+        db.add(owner)
+        db.flush()
+        ids = [uuid.uuid4() for _ in range(listings)]
+        db.add_all(
+            Property(id=i, user_id=owner.id, title=f"Listing {n}", property_type="house",
+                     price=100000 + n, status="available")
+            for n, i in enumerate(ids)
+        )
+        db.commit()
+    engine.dispose()
+    return ids
+
+
+def lookup(property_id, sqlite: bool, latency_ms: float):
+    query = select(Property).filter(Property.id == property_id)
+    if sqlite and latency_ms:
+        query = query.filter(func.sleep_ms(latency_ms) == 1)
+    return query
+
+
+async def run(mode: str, url: str, ids, requests: int, concurrency: int, mongo_ms: float, sql_ms: float):
+    sqlite = url.startswith("sqlite")
+    if mode == "sync":
+        engine = create_engine(url, pool_size=concurrency) if not sqlite else create_engine(url)
+        if sqlite:
+            install_sleep_function(engine)
+        SessionLocal = sessionmaker(bind=engine)
+
+        async def request(property_id):
+            with SessionLocal() as db:
+                db.scalar(lookup(property_id, sqlite, sql_ms))
+            await asyncio.sleep(mongo_ms / 1000)
+    else:
+        engine = create_async_db_engine(url)
+        if sqlite:
+            install_sleep_function(engine.sync_engine)
+        AsyncSessionLocal = async_sessionmaker(engine)
+
+        async def request(property_id):
+            async with AsyncSessionLocal() as db:
+                await db.scalar(lookup(property_id, sqlite, sql_ms))
+            await asyncio.sleep(mongo_ms / 1000)
+
+    queue = [random.choice(ids) for _ in range(requests)]
+
+    async def worker():
+        while queue:
+            await request(queue.pop())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    if mode == "sync":
+        engine.dispose()
+    else:
+        await engine.dispose()
+    return {"mode": mode, "requests": requests, "seconds": round(elapsed, 3),
+            "requests_per_second": round(requests / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--listings", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mongo-latency-ms", type=float, default=2.0)
+    parser.add_argument("--sql-latency-ms", type=float, default=2.0, help="SQLite only")
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    ids = seed(url, args.listings)
+
+    results = [
+        asyncio.run(run(mode, url, ids, args.requests, args.concurrency,
+                        args.mongo_latency_ms, args.sql_latency_ms))
+        for mode in ("sync", "async")
+    ]
+    print(json.dumps({"concurrency": args.concurrency, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
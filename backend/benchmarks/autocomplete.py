@@ -0,0 +1,107 @@
+"""
+Address autocomplete latency (app.properties.autocomplete) at corpus size.
+
+Loads an AddressIndex with --listings synthetic listings drawn from --areas area names
+and --streets street names, each with a house number, as the startup snapshot would.
+It then times suggest() for prefixes of one to four letters plus whole words, and
+set_location() for listings moving address. A prefix's first lookup is reported
+separately, because that lookup builds the ranked list of a long run. The later
+lookups, and the writes that keep those lists in order, are the steady state.
+
+Usage:
+    python -m benchmarks.autocomplete --listings 1000000
+    python -m benchmarks.autocomplete --listings 100000 --ranked-min-run 1000000000  # scan every run
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import string
+import time
+from uuid import uuid4
+
+from app.properties.autocomplete import RANKED_PREFIX_MIN_RUN, AddressIndex
+
+
+def place_names(rng: random.Random, count: int, suffixes) -> list:
+    names = set()
+    while len(names) < count:
+        word = rng.choice(string.ascii_uppercase) + "".join(rng.choices("aeiou" + "bdhkmnrst", k=rng.randint(3, 8)))
+        names.add(f"{word} {rng.choice(suffixes)}".strip())
+    return sorted(names)
+
+
+def percentiles_us(samples) -> dict:
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6, 1)
+    return {"p50_us": pick(0.50), "p99_us": pick(0.99), "max_us": round(samples[-1] * 1e6, 1),
+            "mean_us": round(statistics.fmean(samples) * 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=1_000_000)
+    parser.add_argument("--areas", type=int, default=2000)
+    parser.add_argument("--streets", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=2000, help="timed suggest() calls per prefix length")
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--ranked-min-run", type=int, default=RANKED_PREFIX_MIN_RUN)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    areas = place_names(rng, args.areas, ["", "", "Beach", "Mashariki", "Magharibi"])
+    streets = place_names(rng, args.streets, ["Road", "Road", "Street", "Avenue", "Drive"])
+
+    def place():
+        return {"address": rng.choice(areas), "street_address": f"{rng.randint(1, 400)} {rng.choice(streets)}"}
+
+    ids = [str(uuid4()) for _ in range(args.listings)]
+
+    async def documents():
+        for property_id in ids:
+            yield {"_id": property_id, "location": place()}
+
+    index = AddressIndex(ranked_min_run=args.ranked_min_run)
+    started = time.perf_counter()
+    asyncio.run(index.load(documents()))
+    load_seconds = time.perf_counter() - started
+
+    words = [word.lower() for name in areas + streets for word in name.split()]
+    lookups = {}
+    for length in (1, 2, 3, 4, "word"):
+        prefixes = sorted({word if length == "word" else word[:length] for word in words})
+        first, steady = [], []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            index.suggest(prefix)
+            first.append(time.perf_counter() - started)
+        for _ in range(args.lookups):
+            prefix = rng.choice(prefixes)
+            started = time.perf_counter()
+            index.suggest(prefix)
+            steady.append(time.perf_counter() - started)
+        lookups[str(length)] = {"prefixes": len(prefixes), "first": percentiles_us(first),
+                                "steady": percentiles_us(steady)}
+
+    writes = []
+    for _ in range(args.writes):
+        property_id = rng.choice(ids)
+        location = place()
+        started = time.perf_counter()
+        index.set_location(property_id, location)
+        writes.append(time.perf_counter() - started)
+
+    print(json.dumps({
+        "listings": args.listings,
+        "ranked_min_run": args.ranked_min_run,
+        "index": index.as_dict() | {"loaded_at": None},
+        "load_seconds": round(load_seconds, 2),
+        "suggest": lookups,
+        "set_location": percentiles_us(writes),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
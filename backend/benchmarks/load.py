@@ -0,0 +1,414 @@
+"""
+Load test of every route in app/properties/router.py and app/api/auth.py against local
+stand-ins: a SQLite file and the in-memory MongoDB double from testing/fake_mongo.py.
+It needs neither PostgreSQL nor MongoDB, so any machine reproduces a run. The JSON
+output records the commit it ran at, so results can be diffed across commits.
+
+For each --sizes value, a fresh SQLite file is seeded with that many synthetic listings
+(the same ones for a given --seed) owned by --users users, and the double gets their
+documents. The app (app.main) is then called in-process over ASGI, with its Mongo
+dependency pointed at the double. The lifespan is not run, so no background worker
+competes with the measured requests; writes leave their Mongo side in the outbox, as
+they do for the request in production. Routes are driven one after another, each by
+--concurrency clients for --requests requests, or until --route-seconds have passed
+(then `requests` in the report is the number actually completed). Throughput and
+p50/p95/p99 latency are reported per route.
+
+Read the numbers for what they are:
+
+* The double answers `_id` lookups from a dict, as MongoDB's _id index would. Every
+  other filter and aggregation ($geoNear, $facet, clusters) scans all the documents in
+  Python. Routes that filter in Mongo therefore slow down linearly with the listing
+  count here, which indexed MongoDB does not; compare them across commits only.
+* SQLite serializes writes and has no full-text index (q= uses LIKE).
+* Sign-up and sign-in hash at PASSWORD_HASH_ROUNDS. Lower --hash-rounds to measure the
+  rest of their path.
+* A million listings take several GB of memory and some minutes to seed.
+
+Usage:
+    python -m benchmarks.load --sizes 10000 100000 1000000 --requests 200 --concurrency 16
+    python -m benchmarks.load --sizes 10000 --routes detail search_sql --output before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple
+
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.users.service as user_service
+from app.config import settings
+from app.core.hashing import PasswordHasher, build_context
+from app.core.security import create_access_token
+from app.main import app
+from app.properties.autocomplete import address_index
+from app.properties.cache import facet_cache, property_cache
+from app.properties.models import Property
+from app.properties.schema import PropertyCreate
+from app.properties.services import new_property_records
+from app.users.cache import principal_cache
+from app.users.models import User
+from db.init_db import create_all
+from db.mongo import get_mongo_db_async
+from db.resources import resources
+from testing.fake_mongo import FakeCollection, FakeCursor, FakeMongoDatabase, project, run_pipeline, uses_casefold
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "Load-Pass-123!"
+BASE_TIME = datetime(2024, 1, 1)
+EXPORT_ROWS = 500  # listings updated after the export's updated_since
+
+# Dar es Salaam neighbourhoods (name, lat, lng) and streets the listings are spread over
+AREAS = [
+    ("Kariakoo", -6.8190, 39.2720), ("Msasani", -6.7500, 39.2700), ("Mikocheni", -6.7630, 39.2480),
+    ("Sinza", -6.7850, 39.2200), ("Mbezi Beach", -6.7200, 39.2150), ("Kigamboni", -6.8500, 39.3000),
+    ("Upanga", -6.8090, 39.2830), ("Oyster Bay", -6.7780, 39.2900), ("Masaki", -6.7530, 39.2800),
+    ("Tegeta", -6.6500, 39.1800),
+]
+STREETS = [
+    "Haile Selassie Road", "Msimbazi Street", "Bagamoyo Road", "Morogoro Road", "Uhuru Street",
+    "Ali Hassan Mwinyi Road", "Nyerere Road", "Kawawa Road", "Toure Drive", "Chole Road",
+]
+PROPERTY_TYPES = ["house", "apartment", "land", "commercial"]
+STATUSES = ["available", "available", "available", "rented", "sold"]
+
+
+class IndexedCollection(FakeCollection):
+    """
+    The Mongo double with an `_id` index: lookups by id are dict hits instead of scans.
+
+    Aggregations also copy each document shallowly rather than deeply.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._indexed = 0     # documents[:_indexed] are in _by_id
+        self._stale = False   # set by writes that replace or remove documents
+
+    def _index(self):
+        if self._stale or len(self.documents) < self._indexed:
+            self._by_id = {document["_id"]: document for document in self.documents}
+        else:
+            for document in self.documents[self._indexed:]:
+                self._by_id[document["_id"]] = document
+        self._indexed, self._stale = len(self.documents), False
+
+    @staticmethod
+    def _ids(query):
+        if not query or list(query) != ["_id"]:
+            return None
+        value = query["_id"]
+        if isinstance(value, str):
+            return [value]
+        if isinstance(value, dict) and list(value) == ["$in"]:
+            return value["$in"]
+        return None
+
+    def _lookup(self, ids, projection):
+        self._index()
+        return [project(document, projection) for document in map(self._by_id.get, ids) if document is not None]
+
+    def find(self, query=None, projection=None, **kwargs):
+        ids = self._ids(query)
+        if ids is None:
+            return super().find(query, projection, **kwargs)
+        self._call("find", query)
+        return FakeCursor(self._lookup(ids, projection))
+
+    async def find_one(self, query=None, projection=None, **kwargs):
+        ids = self._ids(query)
+        if ids is None:
+            return await super().find_one(query, projection, **kwargs)
+        self._call("find_one", query)
+        found = self._lookup(ids, projection)
+        return found[0] if found else None
+
+    def aggregate(self, pipeline, **kwargs):
+        # Shallow copies: only $geoNear writes to the documents, and only a top-level field
+        self._call("aggregate", pipeline=pipeline)
+        return FakeCursor(run_pipeline([dict(d) for d in self.documents], pipeline, uses_casefold(kwargs)))
+
+    async def update_one(self, *args, **kwargs):
+        self._stale = True
+        return await super().update_one(*args, **kwargs)
+
+    async def delete_one(self, *args, **kwargs):
+        self._stale = True
+        return await super().delete_one(*args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        self._stale = True
+        return await super().bulk_write(*args, **kwargs)
+
+
+def listing(rng: random.Random, user_id=None) -> Dict[str, Any]:
+    """A PropertyCreate payload."""
+    area, lat, lng = rng.choice(AREAS)
+    property_type = rng.choice(PROPERTY_TYPES)
+    bedrooms = rng.randint(1, 6) if property_type in ("house", "apartment") else None
+    return {
+        "user_id": str(user_id) if user_id else None,
+        "title": f"{rng.choice(['Spacious', 'Modern', 'Sea view', 'Quiet', 'Renovated'])} {property_type} in {area}",
+        "property_type": property_type,
+        "price": float(rng.randrange(50, 5000) * 1000),
+        "status": rng.choice(STATUSES),
+        "location": {
+            "address": f"{area}, Dar es Salaam",
+            "street_address": f"{rng.randint(1, 400)} {rng.choice(STREETS)}",
+            "coordinates": {"lat": round(lat + rng.uniform(-0.02, 0.02), 6),
+                            "lng": round(lng + rng.uniform(-0.02, 0.02), 6)},
+        },
+        "details": {"bedrooms": bedrooms, "bathrooms": bedrooms and rng.randint(1, bedrooms),
+                    "floor_size_m2": rng.randint(40, 600)},
+        "amenities": {"pets_allowed": rng.random() < 0.4, "furnished": rng.random() < 0.3},
+        "features": {"pool": rng.random() < 0.15, "balcony": rng.random() < 0.35},
+        "external_features": {"parking": rng.randint(0, 4)},
+    }
+
+
+def seed(url: str, listings: int, users: int, rng: random.Random, rounds: int, mongo: FakeMongoDatabase,
+         batch_size: int = 10000):
+    """Create the schema and the users, then the listings in SQL and in the Mongo double."""
+    create_all(url)
+    hashed = build_context(settings.PASSWORD_HASH_SCHEME, rounds).hash(PASSWORD)
+    user_ids = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(users)]
+    emails = [f"load-{i}@example.com" for i in range(users)]
+    engine = create_engine(url)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all(User(id=user_id, email=email, hashed_password=hashed, first_name="Load", last_name="User",
+                        phone_number="0670000000", role="owner")
+                   for user_id, email in zip(user_ids, emails))
+        db.commit()
+
+    property_ids = []
+    with engine.begin() as connection:
+        for start in range(0, listings, batch_size):
+            rows = []
+            for i in range(start, min(start + batch_size, listings)):
+                property_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+                data = PropertyCreate.model_validate(listing(rng, user_ids[i % users]))
+                sql_values, document = new_property_records(data, property_id)
+                sql_values["created_at"] = sql_values["updated_at"] = BASE_TIME + timedelta(seconds=i)
+                rows.append(sql_values)
+                mongo.properties.documents.append(document)
+                property_ids.append(property_id)
+            connection.execute(insert(Property), rows)
+    engine.dispose()
+    return user_ids, emails, property_ids
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    route: str
+    request: Callable[[random.Random], Dict[str, Any]]  # httpx.request keyword arguments
+
+
+def scenarios(state: Dict[str, Any], import_rows: int) -> List[Scenario]:
+    emails, user_ids, property_ids = state["emails"], state["user_ids"], state["property_ids"]
+    deletable = state["deletable"]
+
+    def auth(rng):
+        return {"Authorization": f"Bearer {state['tokens'][rng.randrange(len(state['tokens']))]}"}
+
+    def near(rng):
+        _, lat, lng = rng.choice(AREAS)
+        return {"near_lat": lat, "near_lng": lng, "radius_km": 2}
+
+    def bbox(rng):
+        _, lat, lng = rng.choice(AREAS)
+        return f"{lng - 0.05:.4f},{lat - 0.05:.4f},{lng + 0.05:.4f},{lat + 0.05:.4f}"
+
+    def ndjson(rng):
+        return "\n".join(json.dumps(listing(rng)) for _ in range(import_rows)).encode()
+
+    export_since = (BASE_TIME + timedelta(seconds=max(len(property_ids) - EXPORT_ROWS, 0))).isoformat()
+    return [
+        Scenario("register", "POST", "/auth/register", lambda rng: {"json": {
+            "email": f"new-{uuid.UUID(int=rng.getrandbits(128))}@example.com", "password": PASSWORD,
+            "first_name": "New", "last_name": "User", "phone_number": 670000000}}),
+        Scenario("login", "POST", "/auth/token", lambda rng: {
+            "data": {"email": rng.choice(emails), "password": PASSWORD}}),
+        Scenario("create", "POST", "/properties/", lambda rng: {"json": listing(rng), "headers": auth(rng)}),
+        Scenario("import", "POST", "/properties/import", lambda rng: {
+            "params": {"format": "ndjson"}, "content": ndjson(rng), "headers": auth(rng)}),
+        Scenario("export", "GET", "/properties/export", lambda rng: {
+            "params": {"updated_since": export_since}, "headers": auth(rng)}),
+        Scenario("autocomplete", "GET", "/properties/autocomplete", lambda rng: {
+            "params": {"q": rng.choice(STREETS + [area for area, _, _ in AREAS])[:rng.randint(2, 5)]}}),
+        Scenario("search_sql", "GET", "/properties/search", lambda rng: {"params": {
+            "property_type": rng.choice(PROPERTY_TYPES), "min_price": rng.randrange(50, 2500) * 1000,
+            "sort": rng.choice(["created_at", "price"])}}),
+        Scenario("search_location", "GET", "/properties/search", lambda rng: {"params": {
+            "location": rng.choice(AREAS)[0], "min_bedrooms": rng.randint(1, 4)}}),
+        Scenario("search_text", "GET", "/properties/search", lambda rng: {"params": {
+            "q": rng.choice(STREETS).split()[0]}}),
+        Scenario("search_near", "GET", "/properties/search", lambda rng: {"params": near(rng)}),
+        Scenario("facets", "GET", "/properties/facets", lambda rng: {"params": {
+            "property_type": rng.choice(PROPERTY_TYPES), "min_price": rng.randrange(50, 2500, 50) * 1000}}),
+        Scenario("clusters", "GET", "/properties/map/clusters", lambda rng: {"params": {
+            "bbox": bbox(rng), "zoom": rng.randint(10, 14)}}),
+        Scenario("detail", "GET", "/properties/{property_id}", lambda rng: {
+            "url": f"/properties/{rng.choice(property_ids)}"}),
+        Scenario("user_listings", "GET", "/properties/user/{user_id}", lambda rng: {
+            "url": f"/properties/user/{rng.choice(user_ids)}", "params": {"sort": rng.choice(["created_at", "price"])}}),
+        Scenario("update", "PUT", "/properties/{property_id}", lambda rng: {
+            "url": f"/properties/{rng.choice(property_ids)}", "json": {"price": rng.randrange(50, 5000) * 1000}}),
+        # Last, so no other scenario asks for a deleted listing
+        Scenario("delete", "DELETE", "/properties/{property_id}", lambda rng: {
+            "url": f"/properties/{deletable.pop()}"}),
+    ]
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else 0.0
+
+
+async def drive(client: httpx.AsyncClient, scenario: Scenario, rng: random.Random, requests: int,
+                concurrency: int, max_seconds: float = float("inf")) -> Dict[str, Any]:
+    # Requests are built up front, so generating them is not timed
+    prepared = [scenario.request(rng) for _ in range(requests)]
+    for kwargs in prepared:
+        kwargs.setdefault("url", scenario.route)
+    queue = list(reversed(prepared))
+    latencies, statuses = [], Counter()
+
+    async def worker():
+        while queue and time.perf_counter() < deadline:
+            kwargs = queue.pop()
+            started = time.perf_counter()
+            response = await client.request(scenario.method, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    deadline = started + max_seconds
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    requests = len(latencies)
+    return {
+        "name": scenario.name,
+        "route": f"{scenario.method} {scenario.route}",
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+
+async def run_size(listings: int, args) -> Dict[str, Any]:
+    rng = random.Random(f"{args.seed}:{listings}")
+    url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), f"load-{listings}.db")
+    mongo = FakeMongoDatabase()
+    mongo.properties = IndexedCollection()
+
+    started = time.perf_counter()
+    user_ids, emails, property_ids = seed(url, listings, args.users, rng, args.hash_rounds, mongo)
+    seed_seconds = time.perf_counter() - started
+
+    async def documents():
+        for document in mongo.properties.documents:
+            yield document
+
+    await address_index.load(documents())
+
+    # A fresh pool on this size's database, and nothing cached from the previous size
+    await resources.shutdown()
+    resources.database_url = url
+    for cache in (property_cache, facet_cache, principal_cache):
+        if cache is not None:
+            await cache.clear()
+    app.dependency_overrides[get_mongo_db_async] = lambda: mongo
+
+    deletable = property_ids[:]
+    rng.shuffle(deletable)
+    state = {
+        "emails": emails, "user_ids": user_ids, "property_ids": property_ids,
+        "deletable": deletable[:args.requests + args.warmup],
+        "tokens": [create_access_token(data={"sub": email}) for email in emails],
+    }
+    results = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load",
+                                 timeout=None) as client:
+        for scenario in scenarios(state, args.import_rows):
+            if args.routes and scenario.name not in args.routes:
+                continue
+            if args.warmup:
+                await drive(client, scenario, rng, args.warmup, min(args.warmup, args.concurrency), args.route_seconds)
+            results.append(await drive(client, scenario, rng, args.requests, args.concurrency, args.route_seconds))
+            print(f"  {listings} listings, {scenario.name}: {results[-1]['requests_per_second']} req/s",
+                  file=sys.stderr)
+
+    await resources.shutdown()
+    return {"listings": listings, "users": args.users, "seed_seconds": round(seed_seconds, 2), "routes": results}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=BACKEND, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="listings to seed")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per route first")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--route-seconds", type=float, default=60,
+                        help="stop starting requests for a route after this long")
+    parser.add_argument("--import-rows", type=int, default=20, help="listings per import request")
+    parser.add_argument("--hash-rounds", type=int, default=settings.PASSWORD_HASH_ROUNDS)
+    parser.add_argument("--routes", nargs="+", help="only these scenarios (see `scenarios`)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(lambda: build_context(settings.PASSWORD_HASH_SCHEME, args.hash_rounds),
+                            workers=settings.PASSWORD_HASH_WORKERS,
+                            max_pending=max(settings.PASSWORD_HASH_MAX_PENDING, args.concurrency))
+    user_service.password_hasher = hasher
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "sizes": [],
+    }
+    for listings in args.sizes:
+        report["sizes"].append(asyncio.run(run_size(listings, args)))
+    hasher.shutdown()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
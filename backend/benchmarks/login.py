@@ -0,0 +1,139 @@
+"""
+Login throughput, and how much a login burst delays everything else, with password
+hashing inline on the event loop versus in the hashing pool (app.core.hashing).
+
+POST /auth/token is driven by --concurrency clients through the ASGI app in-process
+(no network). Alongside them a probe requests a route that does no work every few
+milliseconds; its latency is how long any other request would wait behind the logins.
+
+Usage:
+    python -m benchmarks.login --users 200 --logins 400 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+import app.users.service as user_service
+from app.api import auth
+from app.config import settings
+from app.core.hashing import PasswordHasher, build_context
+from app.users.models import User
+from db.database import Base, create_async_db_engine, get_db
+
+PASSWORD = "Bench-Pass-123!"
+
+
+def seed(url: str, users: int, rounds: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    hashed = build_context(settings.PASSWORD_HASH_SCHEME, rounds).hash(PASSWORD)
+    emails = [f"bench-{uuid.uuid4()}@example.com" for _ in range(users)]
+    with sessionmaker(bind=engine)() as db:
+        db.add_all(User(email=email, hashed_password=hashed, first_name="Bench", last_name="User")
+                   for email in emails)
+        db.commit()
+    engine.dispose()
+    return emails
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else 0.0
+
+
+async def run(mode: str, url: str, emails, logins: int, concurrency: int, rounds: int, workers: int):
+    hasher = PasswordHasher(lambda: build_context(settings.PASSWORD_HASH_SCHEME, rounds),
+                            workers=0 if mode == "inline" else workers, max_pending=logins)
+    user_service.password_hasher = hasher
+
+    engine = create_async_db_engine(url)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    api = FastAPI()
+    api.include_router(auth.router, prefix="/auth")
+    api.get("/ping")(lambda: {"ok": True})
+    api.dependency_overrides[get_db] = override_get_db
+
+    queue = [emails[i % len(emails)] for i in range(logins)]
+    login_ms, probe_ms, failures = [], [], 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://bench") as client:
+        async def login_worker():
+            nonlocal failures
+            while queue:
+                email = queue.pop()
+                started = time.perf_counter()
+                response = await client.post("/auth/token", data={"email": email, "password": PASSWORD})
+                login_ms.append((time.perf_counter() - started) * 1000)
+                failures += response.status_code != 200
+
+        async def probe(done: asyncio.Event):
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/ping")
+                probe_ms.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.005)
+
+        done = asyncio.Event()
+        probe_task = asyncio.create_task(probe(done))
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    hasher.shutdown()
+    await engine.dispose()
+    return {
+        "mode": mode,
+        "logins": logins,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(logins / elapsed, 1),
+        "login_p50_ms": round(statistics.median(login_ms), 2),
+        "login_p95_ms": round(percentile(login_ms, 0.95), 2),
+        "probe_p50_ms": round(statistics.median(probe_ms), 2) if probe_ms else None,
+        "probe_p99_ms": round(percentile(probe_ms, 0.99), 2),
+        "pool": hasher.stats.as_dict(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=settings.PASSWORD_HASH_ROUNDS)
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    emails = seed(url, args.users, args.rounds)
+
+    results = [
+        asyncio.run(run(mode, url, emails, args.logins, args.concurrency, args.rounds, args.workers))
+        for mode in ("inline", "pool")
+    ]
+    print(json.dumps({"concurrency": args.concurrency, "rounds": args.rounds, "workers": args.workers,
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Per-request cost of the metrics middleware (app.core.metrics), and of a /metrics scrape.
+
+A FastAPI app with one route that does no work is called directly through ASGI (no
+HTTP client, no network), so the middleware's cost is not lost in transport overhead.
+It is measured bare, with MetricsMiddleware, and with MetricsMiddleware plus the query
+accounting middleware (app.core.query_stats) as the app runs them. Each variant runs
+--requests requests in --concurrency concurrent streams, and the overhead is reported
+per request against the bare app. The scrape is timed after --routes distinct route
+templates have each been hit.
+
+Usage:
+    python -m benchmarks.metrics --requests 50000 --concurrency 16 --routes 40
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from fastapi import FastAPI
+
+from app.core.metrics import Metrics, MetricsMiddleware
+from app.core.query_stats import QueryStatsMiddleware
+
+VARIANTS = ("bare", "metrics", "metrics+query_stats")
+
+
+def build_app(variant: str, metrics: Metrics, routes: int) -> FastAPI:
+    api = FastAPI()
+    if variant == "metrics+query_stats":
+        api.add_middleware(QueryStatsMiddleware)
+    if variant != "bare":
+        api.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    async def noop(item_id: int):
+        return None
+
+    for i in range(routes):
+        api.get(f"/route{i}/{{item_id}}")(noop)
+    return api
+
+
+async def call(app, path: str):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def timed_run(app, paths, concurrency: int) -> float:
+    queue = list(paths)
+
+    async def stream():
+        while queue:
+            await call(app, queue.pop())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(stream() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+async def run(requests: int, concurrency: int, routes: int, repeats: int):
+    variants = {}
+    for variant in VARIANTS:
+        metrics = Metrics()
+        variants[variant] = (build_app(variant, metrics, routes), metrics, [])
+    paths = [f"/route{i % routes}/{i}" for i in range(requests)]
+
+    for app, _, _ in variants.values():  # untimed: builds the middleware stacks, warms the caches
+        await timed_run(app, paths[:routes * 10], concurrency)
+
+    # Interleaved, so drift in machine load hits every variant alike
+    for _ in range(repeats):
+        for app, _, runs in variants.values():
+            runs.append(await timed_run(app, paths, concurrency))
+
+    results = []
+    for variant, (_, metrics, runs) in variants.items():
+        best = min(runs)
+        result = {
+            "variant": variant,
+            "requests_per_second": round(requests / best, 1),
+            "us_per_request": round(best / requests * 1e6, 2),
+            "us_per_request_median_run": round(statistics.median(runs) / requests * 1e6, 2),
+        }
+        if variant != "bare":
+            started = time.perf_counter()
+            text = metrics.render()
+            result["scrape_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            result["scrape_bytes"] = len(text)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--routes", type=int, default=40)
+    parser.add_argument("--repeats", type=int, default=5, help="runs per variant; the best is reported")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests, args.concurrency, args.routes, args.repeats))
+    bare = results[0]["us_per_request"]
+    for result in results[1:]:
+        result["overhead_us_per_request"] = round(result["us_per_request"] - bare, 2)
+    print(json.dumps({"requests": args.requests, "concurrency": args.concurrency, "routes": args.routes,
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Startup profile of a fresh API worker: where import time goes, and what the first
+request to each router costs compared with the next one.
+
+The app is imported in a new interpreter under `python -X importtime`, so nothing is
+cached from this process. Import time is reported per first-party module and per
+third-party package (self time, so nothing is counted twice). Each probe request is
+then sent twice through the ASGI app in-process; the difference between the first and
+the warm latency is first-use work: deferred imports, engine and pool creation, caches.
+Imports that happen only during the probes are listed separately.
+
+The probes run against a temporary SQLite database. MongoDB is not needed; none of the
+probed routes reads documents.
+
+Usage:
+    python -m benchmarks.startup [--top 25]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+PASSWORD = "Startup-Pass-123!"
+# Written to stderr around `import app.main`, to split the -X importtime output
+IMPORTING_MARKER = "--- importing app ---"
+IMPORTED_MARKER = "--- app imported ---"
+
+FIRST_PARTY = ("app", "db")
+
+
+def seed(url: str) -> str:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.hashing import password_hasher
+    from app.users.models import User
+    from db.init_db import create_all
+
+    create_all(url)
+    email = f"startup-{uuid.uuid4()}@example.com"
+    engine = create_engine(url)
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(email=email, hashed_password=password_hasher.context.hash(PASSWORD),
+                    first_name="Startup", last_name="Probe", phone_number="0670000000"))
+        db.commit()
+    engine.dispose()
+    return email
+
+
+async def probe_app(email: str):
+    """Child process: import the app, then time each probe twice."""
+    import httpx  # the probe client's own imports are not the app's
+
+    print(IMPORTING_MARKER, file=sys.stderr, flush=True)
+    started = time.perf_counter()
+    from app.main import app
+    import_ms = (time.perf_counter() - started) * 1000
+    print(IMPORTED_MARKER, file=sys.stderr, flush=True)
+
+    results = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://startup") as client:
+        async def timed(module, method, path, route=None, **kwargs):
+            latencies, status = [], None
+            for _ in range(2):
+                started = time.perf_counter()
+                response = await client.request(method, path, **kwargs)
+                latencies.append((time.perf_counter() - started) * 1000)
+                status = response.status_code
+            results.append({"module": module, "route": f"{method} {route or path.split('?')[0]}", "status": status,
+                            "first_ms": round(latencies[0], 2), "warm_ms": round(latencies[1], 2)})
+            return response
+
+        await timed("app.main", "GET", "/")
+        login = await timed("app.api.auth", "POST", "/auth/token", data={"email": email, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {login.json().get('access_token')}"}
+        await timed("app.users.router", "GET", "/users/me", headers=headers)
+        await timed("app.properties.router", "GET", f"/properties/user/{uuid.uuid4()}",
+                    route="/properties/user/{user_id}")
+        await timed("app.properties.router", "GET", "/properties/autocomplete?q=ma")
+
+    from db.resources import resources
+    await resources.shutdown()
+    print(json.dumps({"import_ms": round(import_ms, 2), "first_requests": results}))
+
+
+def parse_importtime(stderr: str):
+    """(imports made by `import app.main`, imports made during the probes) as [(module, self µs)]."""
+    before, after, current = [], [], []
+    for line in stderr.splitlines():
+        if line.strip() in (IMPORTING_MARKER, IMPORTED_MARKER):
+            current = before if line.strip() == IMPORTING_MARKER else after
+            continue
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        current.append((name.strip(), int(self_us)))
+    return before, after
+
+
+def group(imports, top: int):
+    totals = defaultdict(int)
+    for name, self_us in imports:
+        parts = name.split(".")
+        key = ".".join(parts[:3]) if parts[0] in FIRST_PARTY else parts[0]
+        totals[key] += self_us
+    ranked = sorted(totals.items(), key=lambda item: -item[1])[:top]
+    return [{"module": name, "self_ms": round(us / 1000, 2)} for name, us in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=25, help="modules/packages to list")
+    parser.add_argument("--child", help=argparse.SUPPRESS)  # internal: the probed process
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(probe_app(args.child))
+        return
+
+    url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "startup.db")
+    env = {
+        **os.environ,
+        "DATABASE_URL": url,
+        "SQL_ECHO": "false",
+        "OUTBOX_WORKER_ENABLED": "false",
+        "AUTOCOMPLETE_ENABLED": "false",
+    }
+    os.environ.update(env)
+    email = seed(url)
+
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "benchmarks.startup", "--child", email],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env, capture_output=True, text=True,
+    )
+    process_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        sys.exit(result.stderr)
+
+    probes = json.loads(result.stdout.strip().splitlines()[-1])
+    before, after = parse_importtime(result.stderr)
+    print(json.dumps({
+        "process_ms": round(process_ms, 2),
+        "import_ms": probes["import_ms"],
+        "import_self_ms_total": round(sum(us for _, us in before) / 1000, 2),
+        "imports": group(before, args.top),
+        "deferred_imports": group(after, args.top),
+        "first_requests": probes["first_requests"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Explicit schema step: run it before starting (or scaling out) the API.
+
+The app performs no DDL on import or at startup. This command brings the databases up
+to date instead:
+
+* SQL: `alembic upgrade head` for a database that already has tables. An empty one is
+  bootstrapped instead: its tables are created straight from the models and stamped at
+  head (--create-all forces this). The migration chain cannot build a database from
+  scratch, because an early autogenerated revision (a0e5ddf568a4) drops `properties`
+  and later ones alter it. This command is therefore the only supported bootstrap; a
+  bare `alembic upgrade head` on an empty database fails.
+* MongoDB: the indexes the property queries rely on (idempotent)
+
+The Docker image runs it before starting uvicorn.
+
+Usage:
+    python -m db.init_db
+    python -m db.init_db --create-all
+    python -m db.init_db --skip-mongo
+"""
+import argparse
+import asyncio
+import os
+
+from alembic import command
+from alembic.config import Config
+
+from sqlalchemy import inspect
+
+from db.database import SQLALCHEMY_DATABASE_URL, Base, create_sync_engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+def alembic_config(url: str = SQLALCHEMY_DATABASE_URL) -> Config:
+    config = Config(ALEMBIC_INI)
+    config.attributes["database_url"] = url
+    return config
+
+
+def create_all(url: str = SQLALCHEMY_DATABASE_URL):
+    """Create every table from the models and mark the database as migrated to head."""
+    import app.properties.models  # noqa: F401  registers the tables on Base.metadata
+    import app.users.models  # noqa: F401
+
+    engine = create_sync_engine(url)
+    try:
+        Base.metadata.create_all(bind=engine)
+    finally:
+        engine.dispose()
+    command.stamp(alembic_config(url), "head")
+
+
+def is_empty(url: str = SQLALCHEMY_DATABASE_URL) -> bool:
+    engine = create_sync_engine(url)
+    try:
+        return not inspect(engine).get_table_names()
+    finally:
+        engine.dispose()
+
+
+def upgrade():
+    command.upgrade(alembic_config(), "head")
+
+
+async def ensure_mongo_indexes():
+    from db.mongo import mongo_db
+
+    try:
+        await mongo_db.ensure_indexes()
+    finally:
+        mongo_db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--create-all", action="store_true",
+                        help="create tables from the models, then stamp head (the default for an empty database)")
+    parser.add_argument("--skip-mongo", action="store_true", help="leave the MongoDB indexes alone")
+    args = parser.parse_args()
+
+    if args.create_all or is_empty():
+        create_all()
+        print("✅ Created the SQL tables and stamped them at the latest migration")
+    else:
+        upgrade()
+        print("✅ Applied SQL migrations up to head")
+    if not args.skip_mongo:
+        asyncio.run(ensure_mongo_indexes())
+        print("✅ Ensured the MongoDB indexes")
+
+
+if __name__ == "__main__":
+    main()
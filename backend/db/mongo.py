@@ -1,31 +1,83 @@
+from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from app.config import settings
 from pymongo.server_api import ServerApi
+from pymongo import ASCENDING, GEOSPHERE
+from app.core.metrics import mongo_pool_stats
+from app.core.query_stats import mongo_command_listener
+from app.properties.identity import LEGACY_ID_FIELD, id_filter, ids_filter
+from app.properties.search import LOCATION_COLLATION
 
 class MongoDB:
-    def __init__(self):
-        self.client: AsyncIOMotorClient = AsyncIOMotorClient(settings.MONGO_URI, server_api=ServerApi('1'))
-        self.db: AsyncIOMotorDatabase = self.client[settings.MONGO_DB_NAME]
-        self.properties = self.db.properties
+    def __init__(self, uri: str = settings.MONGO_URI, db_name: str = settings.MONGO_DB_NAME):
+        self.uri = uri
+        self.db_name = db_name
+        self._client: Optional[AsyncIOMotorClient] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._client is not None
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        """The one Motor client (and connection pool) of the process, created on first use."""
+        if self._client is None:
+            # Motor connects lazily, on the first operation; creating it touches no network
+            self._client = AsyncIOMotorClient(
+                self.uri,
+                server_api=ServerApi('1'),
+                maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+                event_listeners=[mongo_command_listener, mongo_pool_stats],
+            )
+        return self._client
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        return self.client[self.db_name]
+
+    @property
+    def properties(self):
+        return self.db.properties
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def ensure_indexes(self):
+        """Create the indexes the property queries rely on (no-op when they already exist)"""
+        # Only documents that predate `_id` == property id have this field; see db.mongo_migrations
+        await self.properties.create_index([(LEGACY_ID_FIELD, ASCENDING)], unique=True, sparse=True)
+        # Location search is case-insensitive, so these indexes share its collation
+        await self.properties.create_index([("location.address", ASCENDING)], collation=LOCATION_COLLATION)
+        await self.properties.create_index([("location.street_address", ASCENDING)], collation=LOCATION_COLLATION)
+        await self.properties.create_index([("details.bedrooms", ASCENDING)])
+        # Radius/bbox search; the trailing keys let $geoNear pre-filter on the SQL column copies
+        await self.properties.create_index(
+            [("geo", GEOSPHERE), ("property_type", ASCENDING), ("status", ASCENDING), ("price", ASCENDING)]
+        )
 
     async def insert_property(self, property_data: dict):
-        """Insert a property document into MongoDB"""
+        """Insert a property document into MongoDB (its `_id` is the SQL property id)"""
         return await self.properties.insert_one(property_data)
 
-    async def get_property_by_sql_id(self, sql_property_id: str): # Changed type to str for UUID
+    async def get_property(self, property_id):
         """Get property document by SQL property ID"""
-        return await self.properties.find_one({"sql_property_id": sql_property_id})
+        return await self.properties.find_one(id_filter(property_id))
 
-    async def update_property(self, sql_property_id: str, update_data: dict): # Changed type to str
+    async def get_properties(self, property_ids: list):
+        """Get the property documents for a batch of SQL property IDs in one query"""
+        cursor = self.properties.find(ids_filter(property_ids))
+        return await cursor.to_list(length=len(property_ids))
+
+    async def update_property(self, property_id, update_data: dict):
         """Update property document"""
-        return await self.properties.update_one(
-            {"sql_property_id": sql_property_id},
-            {"$set": update_data}
-        )
+        return await self.properties.update_one(id_filter(property_id), {"$set": update_data})
 
-    async def delete_property(self, sql_property_id: str): # Changed type to str
+    async def delete_property(self, property_id):
         """Delete property document"""
-        return await self.properties.delete_one({"sql_property_id": sql_property_id})
+        return await self.properties.delete_one(id_filter(property_id))
 
 # Global MongoDB instance
 mongo_db = MongoDB()
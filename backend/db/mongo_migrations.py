@@ -0,0 +1,120 @@
+"""
+One-off maintenance commands for the MongoDB properties collection.
+
+Usage:
+    python -m db.mongo_migrations backfill-geo
+    python -m db.mongo_migrations rekey-ids [--batch-size 500]
+    python -m db.mongo_migrations backfill-search [--batch-size 500]
+"""
+import argparse
+import asyncio
+from uuid import UUID
+
+from pymongo import ASCENDING, DeleteOne, ReplaceOne
+from sqlalchemy import select, update
+
+from app.properties.fulltext import search_address
+from app.properties.identity import LEGACY_ID_FIELD, document_property_id, ids_filter
+from app.properties.models import Property
+from db.database import AsyncSessionLocal
+from db.mongo import mongo_db
+
+
+async def backfill_geo_points() -> int:
+    """Add the GeoJSON `geo` field to documents written before geospatial search existed."""
+    result = await mongo_db.properties.update_many(
+        {"geo": {"$exists": False}, "location.coordinates.lat": {"$type": "number"}},
+        # Pipeline update: the projection is computed server-side, no documents leave Mongo
+        [{"$set": {"geo": {
+            "type": "Point",
+            "coordinates": ["$location.coordinates.lng", "$location.coordinates.lat"],
+        }}}],
+    )
+    return result.modified_count
+
+
+async def rekey_property_ids(batch_size: int = 500) -> int:
+    """
+    Re-key legacy documents (ObjectId `_id` + sql_property_id) to `_id` = property id.
+
+    Safe to run against a live collection with MONGO_LEGACY_ID_FALLBACK enabled. Each
+    batch is copied under its new `_id` (an idempotent upsert) and then each original is
+    deleted only if it is unchanged since it was read. A document updated in between
+    keeps its original and is copied again on the next run. Returns the number of
+    documents rekeyed; run it again until that is 0.
+    """
+    collection = mongo_db.properties
+    rekeyed = 0
+    last_id = None
+    while True:
+        query = {LEGACY_ID_FIELD: {"$exists": True}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(query).sort("_id", ASCENDING).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        copies = [
+            ReplaceOne(
+                {"_id": document[LEGACY_ID_FIELD]},
+                {k: v for k, v in document.items() if k not in ("_id", LEGACY_ID_FIELD)},
+                upsert=True,
+            )
+            for document in batch
+        ]
+        await collection.bulk_write(copies, ordered=False)
+        # Whole-document filter: only originals nobody modified since the read are removed
+        result = await collection.bulk_write([DeleteOne(document) for document in batch], ordered=False)
+        rekeyed += result.deleted_count
+    return rekeyed
+
+
+async def backfill_search_addresses(batch_size: int = 500) -> int:
+    """Copy each document's address text onto properties.search_address where it is still NULL."""
+    updated = 0
+    last_id = None
+    async with AsyncSessionLocal() as db:
+        while True:
+            query = select(Property.id).filter(Property.search_address.is_(None)).order_by(Property.id).limit(batch_size)
+            if last_id is not None:
+                query = query.filter(Property.id > last_id)
+            property_ids = (await db.scalars(query)).all()
+            if not property_ids:
+                break
+            last_id = property_ids[-1]
+
+            cursor = mongo_db.properties.find(ids_filter(property_ids), {"location": 1, LEGACY_ID_FIELD: 1})
+            documents = await cursor.to_list(length=len(property_ids))
+            rows = [
+                {"id": UUID(document_property_id(document)), "search_address": search_address(document.get("location"))}
+                for document in documents
+            ]
+            rows = [row for row in rows if row["search_address"]]
+            if rows:
+                # Bulk UPDATE by primary key, one executemany per batch
+                await db.execute(update(Property), rows)
+                updated += len(rows)
+            await db.commit()
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["backfill-geo", "rekey-ids", "backfill-search"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    if args.command == "backfill-geo":
+        modified = asyncio.run(backfill_geo_points())
+        print(f"✅ Added geo points to {modified} property documents")
+    elif args.command == "rekey-ids":
+        rekeyed = asyncio.run(rekey_property_ids(args.batch_size))
+        print(f"✅ Re-keyed {rekeyed} property documents")
+    elif args.command == "backfill-search":
+        updated = asyncio.run(backfill_search_addresses(args.batch_size))
+        print(f"✅ Indexed the address of {updated} properties for full-text search")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+The process's database resources: one SQL connection pool and one Motor client.
+
+Nothing here connects on import. The engine and the client are created on first use
+(which also covers scripts and tests that never run the app), and `startup`, run from
+the FastAPI lifespan, creates them up front and warms the pools so the first requests
+don't pay for connection setup. `shutdown` closes both pools.
+
+Pool sizes come from DB_POOL_SIZE / DB_MAX_OVERFLOW and MONGO_MIN_POOL_SIZE /
+MONGO_MAX_POOL_SIZE; DB_POOL_WARMUP connections are opened at startup.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.config import settings
+from db.database import SQLALCHEMY_DATABASE_URL, create_async_db_engine
+from db.mongo import MongoDB, mongo_db
+
+logger = logging.getLogger(__name__)
+
+
+class Resources:
+    """Owns the SQL engine and the Motor client; see the module docstring."""
+
+    def __init__(self, database_url: str, mongo: MongoDB):
+        self.database_url = database_url
+        self.mongo = mongo
+        self._engine: Optional[AsyncEngine] = None
+        self._sessions: Optional[async_sessionmaker] = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            self._engine = create_async_db_engine(self.database_url)
+            self._sessions = async_sessionmaker(self._engine, autoflush=False, expire_on_commit=False)
+        return self._engine
+
+    def sessions(self) -> AsyncSession:
+        """A new session; its connection is checked out of the pool on first use."""
+        if self._sessions is None:
+            self.engine
+        return self._sessions()
+
+    async def _warm_sql(self, connections: int):
+        # Held open together, so the pool ends up with that many distinct connections
+        opened = []
+        try:
+            for _ in range(max(connections, 1)):
+                connection = await self.engine.connect()
+                opened.append(connection)
+                await connection.execute(text("SELECT 1"))
+        finally:
+            for connection in opened:
+                await connection.close()
+
+    async def startup(self, warmup_connections: int = settings.DB_POOL_WARMUP,
+                      timeout: float = settings.STARTUP_WARMUP_TIMEOUT_SECONDS):
+        """Create both clients and open their first connections; failures are logged, not raised."""
+        try:
+            await asyncio.wait_for(self._warm_sql(warmup_connections), timeout)
+            logger.info(f"SQL pool warmed up: {self.pool_stats()}")
+        except Exception as e:
+            logger.error(f"SQL warm-up failed: {e!r}")
+        try:
+            await asyncio.wait_for(self.mongo.client.admin.command("ping"), timeout)
+            logger.info("MongoDB connection successful")
+        except Exception as e:
+            logger.error(f"MongoDB connection failed: {e!r}")
+
+    async def shutdown(self):
+        """Close both pools; the next use after this creates fresh ones."""
+        self.mongo.close()
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+            self._sessions = None
+
+    def pool_stats(self) -> Dict[str, Any]:
+        if self._engine is None:
+            return {"open": False}
+        pool = self._engine.pool
+        stats: Dict[str, Any] = {"open": True, "pool": pool.__class__.__name__}
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, name):
+                stats[name] = getattr(pool, name)()
+        return stats
+
+
+resources = Resources(SQLALCHEMY_DATABASE_URL, mongo_db)
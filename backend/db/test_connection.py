@@ -1,10 +1,12 @@
 from sqlalchemy import text
-from db.database import engine
+from db.database import create_sync_engine
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+engine = create_sync_engine()
+
 try:
     with engine.connect() as connection:
         result = connection.execute(text("SELECT version();"))
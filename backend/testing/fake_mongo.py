@@ -0,0 +1,395 @@
+"""
+In-memory stand-in for the parts of Motor's collection API that the services use.
+
+Every call is recorded in `calls` so tests can assert on the number of Mongo
+round trips a service method makes, and is reported to app.core.query_stats the way
+the Motor client's command listener would, so `track_queries` budgets cover it too.
+
+Shared by the tests and the load benchmark. Besides the classes, `matches`, `project`,
+`run_pipeline` and `uses_casefold` are public for subclasses such as the benchmark's
+indexed collection; the rest is private to this module.
+"""
+import copy
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+from app.core import query_stats
+
+
+def _get_path(document: Dict[str, Any], path: str):
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None, False
+        value = value[part]
+    return value, True
+
+
+def _distance_m(point, other) -> float:
+    """Haversine distance between two GeoJSON points, in metres."""
+    (lng1, lat1), (lng2, lat2) = point["coordinates"], other["coordinates"]
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * 6371008.8 * math.asin(math.sqrt(a))
+
+
+def _within(point, condition) -> bool:
+    if "$centerSphere" in condition:
+        center, radians = condition["$centerSphere"]
+        return _distance_m({"coordinates": center}, point) <= radians * 6378100
+    # Only the axis-aligned rectangles produced by bbox_filter are supported
+    geometry = condition["$geometry"]
+    ring = geometry["coordinates"][0]
+    lngs, lats = [p[0] for p in ring], [p[1] for p in ring]
+    lng, lat = point["coordinates"]
+    return min(lngs) <= lng <= max(lngs) and min(lats) <= lat <= max(lats)
+
+
+def _fold(value, casefold: bool):
+    if casefold and isinstance(value, str):
+        return value.casefold()
+    if casefold and isinstance(value, list):
+        return [_fold(v, casefold) for v in value]
+    return value
+
+
+def _match_condition(value, present: bool, condition, casefold: bool = False) -> bool:
+    value = _fold(value, casefold)
+    if not isinstance(condition, dict):
+        condition = _fold(condition, casefold)
+    else:
+        condition = {k: _fold(v, casefold) for k, v in condition.items()}
+    if not isinstance(condition, dict) or not any(str(k).startswith("$") for k in condition):
+        return present and value == condition
+
+    for op, expected in condition.items():
+        if op == "$eq" and not (present and value == expected):
+            return False
+        if op == "$ne" and present and value == expected:
+            return False
+        if op == "$in" and not (present and value in expected):
+            return False
+        if op == "$nin" and present and value in expected:
+            return False
+        if op == "$exists" and present != bool(expected):
+            return False
+        if op == "$type" and not (present and expected == "string" and isinstance(value, str)):
+            return False  # only the "string" alias is supported
+        if op == "$geoWithin" and not (present and _within(value, expected)):
+            return False
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            if not present or value is None:
+                return False
+            if op == "$gt" and not value > expected:
+                return False
+            if op == "$gte" and not value >= expected:
+                return False
+            if op == "$lt" and not value < expected:
+                return False
+            if op == "$lte" and not value <= expected:
+                return False
+    return True
+
+
+def matches(document: Dict[str, Any], query: Dict[str, Any], casefold: bool = False) -> bool:
+    """Evaluate a query; `casefold` mimics a strength-2 collation."""
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(document, sub, casefold) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, sub, casefold) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, sub, casefold) for sub in condition):
+                return False
+        else:
+            value, present = _get_path(document, key)
+            if not _match_condition(value, present, condition, casefold):
+                return False
+    return True
+
+
+def uses_casefold(kwargs) -> bool:
+    collation = kwargs.get("collation") or {}
+    return collation.get("strength", 3) <= 2
+
+
+def project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    document = copy.deepcopy(document)
+    if not projection:
+        return document
+    included = [k for k, v in projection.items() if v and k != "_id"]
+    if included:
+        projected = {}
+        for key in included:
+            value, present = _get_path(document, key)
+            if present:
+                target = projected
+                parts = key.split(".")
+                for part in parts[:-1]:
+                    target = target.setdefault(part, {})
+                target[parts[-1]] = value
+        if projection.get("_id", 1) and "_id" in document:
+            projected["_id"] = document["_id"]
+        return projected
+    for key, value in projection.items():
+        if not value:
+            document.pop(key, None)
+    return document
+
+
+def _evaluate(document: Dict[str, Any], expression):
+    """Evaluate the small subset of aggregation expressions the pipelines use."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _get_path(document, expression[1:])[0]
+    if isinstance(expression, dict):
+        if len(expression) == 1:
+            (op, args), = expression.items()
+            if op == "$add":
+                return sum(_evaluate(document, a) for a in args)
+            if op == "$divide":
+                return _evaluate(document, args[0]) / _evaluate(document, args[1])
+            if op == "$floor":
+                return math.floor(_evaluate(document, args))
+            if op == "$eq":
+                return _evaluate(document, args[0]) == _evaluate(document, args[1])
+            if op == "$cond":
+                return _evaluate(document, args[1] if _evaluate(document, args[0]) else args[2])
+            if op == "$ifNull":
+                value = _evaluate(document, args[0])
+                return _evaluate(document, args[1]) if value is None else value
+        return {k: _evaluate(document, v) for k, v in expression.items()}
+    return expression
+
+
+def _group(documents: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[Any, List[Dict[str, Any]]] = {}
+    for document in documents:
+        key = _evaluate(document, spec["_id"])
+        groups.setdefault(repr(key), [key, []])[1].append(document)
+
+    results = []
+    for key, members in groups.values():
+        result = {"_id": key}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, arg), = accumulator.items()
+            if op == "$firstN":
+                result[field] = [_evaluate(d, arg["input"]) for d in members[:arg["n"]]]
+                continue
+            values = [_evaluate(d, arg) for d in members]
+            present = [v for v in values if v is not None]
+            if op == "$sum":
+                result[field] = sum(values)
+            elif op == "$avg":
+                result[field] = sum(present) / len(present) if present else None
+            elif op == "$min":
+                result[field] = min(present) if present else None
+            elif op == "$max":
+                result[field] = max(present) if present else None
+            else:
+                raise NotImplementedError(op)
+        results.append(result)
+    return results
+
+
+def run_pipeline(documents: List[Dict[str, Any]], pipeline: List[Dict[str, Any]], casefold: bool):
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$geoNear":
+            nearby = []
+            for document in documents:
+                if "geo" not in document or not matches(document, spec.get("query", {}), casefold):
+                    continue
+                distance = _distance_m(spec["near"], document["geo"])
+                if spec.get("minDistance", 0) <= distance <= spec.get("maxDistance", math.inf):
+                    document[spec["distanceField"]] = distance
+                    nearby.append(document)
+            documents = sorted(nearby, key=lambda d: d[spec["distanceField"]])
+        elif name == "$match":
+            documents = [d for d in documents if matches(d, spec, casefold)]
+        elif name == "$group":
+            documents = _group(documents, spec)
+        elif name == "$bucket":
+            documents = _bucket(documents, spec)
+        elif name == "$facet":
+            documents = [{key: run_pipeline(documents, stages, casefold) for key, stages in spec.items()}]
+        elif name == "$limit":
+            documents = documents[:spec]
+        elif name == "$project":
+            documents = [project(d, spec) for d in documents]
+        else:
+            raise NotImplementedError(name)
+    return documents
+
+
+def _bucket(documents: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    boundaries = spec["boundaries"]
+    keyed = []
+    for document in documents:
+        value = _evaluate(document, spec["groupBy"])
+        lower = next((low for low, high in zip(boundaries, boundaries[1:])
+                      if isinstance(value, (int, float)) and low <= value < high), spec["default"])
+        keyed.append({**document, "__bucket": lower})
+    return sorted(_group(keyed, {"_id": "$__bucket", **spec["output"]}), key=lambda b: b["_id"])
+
+
+class FakeCursor:
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self._documents = documents
+        self._limit = 0
+
+    def sort(self, key, direction=None):
+        keys = key if isinstance(key, list) else [(key, direction or 1)]
+        for field, order in reversed(keys):
+            self._documents.sort(key=lambda d: _get_path(d, field)[0], reverse=order < 0)
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _results(self):
+        return self._documents[: self._limit] if self._limit else self._documents
+
+    async def to_list(self, length: Optional[int] = None):
+        results = self._results()
+        return results[:length] if length else results
+
+    def __aiter__(self):
+        self._iter = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents: List[Dict[str, Any]] = []
+        self.calls: Counter = Counter()
+
+    @property
+    def round_trips(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    def _call(self, name: str, query: Optional[Dict[str, Any]] = None, pipeline: Optional[List[Dict[str, Any]]] = None):
+        self.calls[name] += 1
+        command = {name: "properties", "pipeline": pipeline} if pipeline is not None else {name: "properties", "filter": query or {}}
+        query_stats.record("mongo", query_stats.mongo_shape(name, command))
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection=None, **kwargs):
+        self._call("find", query)
+        query = query or {}
+        casefold = uses_casefold(kwargs)
+        return FakeCursor([project(d, projection) for d in self.documents if matches(d, query, casefold)])
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection=None, **kwargs):
+        self._call("find_one", query)
+        query = query or {}
+        for document in self.documents:
+            if matches(document, query, uses_casefold(kwargs)):
+                return project(document, projection)
+        return None
+
+    async def insert_one(self, document: Dict[str, Any]):
+        self._call("insert_one")
+        document.setdefault("_id", f"fake-{len(self.documents) + 1:020d}")
+        self.documents.append(copy.deepcopy(document))
+        return type("InsertOneResult", (), {"inserted_id": document["_id"]})()
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True):
+        """Mimics a unique `_id`: duplicates are reported as E11000 write errors."""
+        self._call("insert_many")
+        existing = {d["_id"] for d in self.documents}
+        write_errors = []
+        for index, document in enumerate(documents):
+            document.setdefault("_id", f"fake-{len(self.documents) + 1:020d}")
+            if document["_id"] in existing:
+                write_errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"})
+                if ordered:
+                    break
+                continue
+            existing.add(document["_id"])
+            self.documents.append(copy.deepcopy(document))
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors, "nInserted": len(documents) - len(write_errors)})
+        return type("InsertManyResult", (), {"inserted_ids": [d["_id"] for d in documents]})()
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        self._call("update_one", query)
+        for document in self.documents:
+            if matches(document, query):
+                document.update(copy.deepcopy(update.get("$set", {})))
+                return type("UpdateResult", (), {"matched_count": 1})()
+        return type("UpdateResult", (), {"matched_count": 0})()
+
+    async def delete_one(self, query: Dict[str, Any]):
+        self._call("delete_one", query)
+        for index, document in enumerate(self.documents):
+            if matches(document, query):
+                del self.documents[index]
+                return type("DeleteResult", (), {"deleted_count": 1})()
+        return type("DeleteResult", (), {"deleted_count": 0})()
+
+    async def bulk_write(self, requests, ordered: bool = True):
+        """Supports pymongo's ReplaceOne (with upsert), UpdateOne ($set) and DeleteOne requests."""
+        self._call("bulk_write")
+        upserted = modified = deleted = 0
+        for request in requests:
+            kind = type(request).__name__
+            query = request._filter
+            if kind == "ReplaceOne":
+                index = next((i for i, d in enumerate(self.documents) if matches(d, query)), None)
+                replacement = {"_id": query["_id"], **copy.deepcopy(request._doc)}
+                if index is not None:
+                    self.documents[index] = replacement
+                elif request._upsert:
+                    self.documents.append(replacement)
+                    upserted += 1
+            elif kind == "UpdateOne":
+                document = next((d for d in self.documents if matches(d, query)), None)
+                if document is not None:
+                    document.update(copy.deepcopy(request._doc.get("$set", {})))
+                    modified += 1
+            elif kind == "DeleteOne":
+                index = next((i for i, d in enumerate(self.documents) if matches(d, query)), None)
+                if index is not None:
+                    del self.documents[index]
+                    deleted += 1
+            else:
+                raise NotImplementedError(kind)
+        return type("BulkWriteResult", (), {
+            "upserted_count": upserted, "modified_count": modified, "deleted_count": deleted
+        })()
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs):
+        """Supports the $geoNear, $match, $group, $bucket, $facet, $limit and $project stages."""
+        self._call("aggregate", pipeline=pipeline)
+        documents = [copy.deepcopy(d) for d in self.documents]
+        return FakeCursor(run_pipeline(documents, pipeline, uses_casefold(kwargs)))
+
+    async def count_documents(self, query: Dict[str, Any], **kwargs):
+        self._call("count_documents", query)
+        count = sum(1 for d in self.documents if matches(d, query, uses_casefold(kwargs)))
+        limit = kwargs.get("limit")
+        return min(count, limit) if limit else count
+
+
+class FakeMongoDatabase:
+    """Exposes `properties` the same way AsyncIOMotorDatabase does."""
+
+    def __init__(self):
+        self.properties = FakeCollection()
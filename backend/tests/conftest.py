@@ -1,6 +1,11 @@
+import asyncio
+from datetime import datetime
+from uuid import uuid4
+
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 import os
 import sys
 from pathlib import Path
@@ -11,36 +16,130 @@ sys.path.insert(0, str(project_root))
 
 from fastapi.testclient import TestClient
 from app.main import app
+from app.properties.geo import geo_point
+from app.properties.models import Property
+from app.properties.schema import PropertyCreate
 from db.base import Base
 from db.database import get_db
+from db.resources import resources
+from testing.fake_mongo import FakeMongoDatabase
 
 
-# Use a separate database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+@pytest.fixture(scope="session", autouse=True)
+def app_database(tmp_path_factory):
+    """
+    Points the app's own database at a throwaway SQLite file with the schema created.
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Covers tests that call the app without overriding get_db; the app creates no tables
+    itself (they come from db.init_db), and no test writes to a configured database.
+    """
+    url = f"sqlite:///{tmp_path_factory.mktemp('app') / 'app.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    configured = resources.database_url
+    resources.database_url = url
+    yield url
+    resources.database_url = configured
 
 
 @pytest.fixture(name="session")
-def session_fixture():
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-        Base.metadata.drop_all(bind=engine)
+def session_fixture(memory_session):
+    return memory_session
 
 
 @pytest.fixture(name="client")
 def client_fixture(session):
-    def override_get_db():
+    async def override_get_db():
         yield session
 
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as client:
         yield client
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+@pytest.fixture(name="memory_session")
+def memory_session_fixture():
+    """
+    A throwaway in-memory SQLite AsyncSession for service-level tests.
+
+    Tests are sync, so drive it with asyncio.run(...), e.g. asyncio.run(session.commit()).
+    """
+    memory_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+
+    async def create_tables():
+        async with memory_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    db = async_sessionmaker(memory_engine, autoflush=False, expire_on_commit=False)()
+    try:
+        yield db
+    finally:
+        asyncio.run(db.close())
+        asyncio.run(memory_engine.dispose())
+
+
+@pytest.fixture(name="fake_mongo")
+def fake_mongo_fixture():
+    return FakeMongoDatabase()
+
+
+@pytest.fixture(name="add_listing")
+def add_listing_fixture(memory_session, fake_mongo):
+    """
+    Adds a committed listing to memory_session and fake_mongo and returns its id.
+
+    Keyword arguments other than the SQL columns become fields of the Mongo document,
+    which also carries the column copies and `geo` point a synced write would have.
+    `synced=False` leaves the document out, as if the outbox had not applied it yet.
+    """
+    def add_listing(property_type="house", price=100000, status="available", title="Listing",
+                    user_id=None, updated_at=None, synced=True, **document):
+        property_id = uuid4()
+        memory_session.add(Property(
+            id=property_id, user_id=user_id or uuid4(), title=title, property_type=property_type,
+            price=price, status=status, updated_at=updated_at or datetime.utcnow(),
+        ))
+        if synced:
+            document.setdefault("location", {"address": "Kariakoo Street", "coordinates": {"lat": -6.8, "lng": 39.2}})
+            fake_mongo.properties.documents.append({
+                "_id": str(property_id), "title": title, "property_type": property_type, "price": price,
+                "status": status, "geo": geo_point(document["location"]["coordinates"]), **document,
+            })
+        asyncio.run(memory_session.commit())
+        return property_id
+
+    return add_listing
+
+
+@pytest.fixture(name="new_listing")
+def new_listing_fixture():
+    """Builds a PropertyCreate for a two bedroom flat; keyword arguments override its fields."""
+    def new_listing(**overrides):
+        data = {
+            "user_id": uuid4(),
+            "title": "Two bedroom flat",
+            "property_type": "apartment",
+            "price": 350000,
+            "location": {"address": "Msasani Road", "coordinates": {"lat": -6.75, "lng": 39.27}},
+            "details": {"bedrooms": 2},
+        }
+        data.update(overrides)
+        return PropertyCreate(**data)
+
+    return new_listing
+
+
+@pytest.fixture(name="sql_statements")
+def sql_statements_fixture(memory_session):
+    """Records every SQL statement the memory_session engine executes."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    bind = memory_session.bind.sync_engine
+    event.listen(bind, "before_cursor_execute", record)
+    yield statements
+    event.remove(bind, "before_cursor_execute", record)
@@ -0,0 +1,122 @@
+import asyncio
+from uuid import uuid4
+
+from app.core.cache import Generations, LRUCache, build_cache
+from app.properties.services import PropertyService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_cache_expires_entries_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(max_bytes=1024, max_entries=10, ttl_seconds=30, clock=clock)
+
+    asyncio.run(cache.set("a", b"1"))
+    clock.now = 29
+    assert asyncio.run(cache.get("a")) == b"1"
+    clock.now = 30
+    assert asyncio.run(cache.get("a")) is None
+
+    assert cache.stats.as_dict()["expirations"] == 1
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    assert cache.size_bytes == 0
+
+
+def test_lru_cache_evicts_least_recently_used_within_byte_bound():
+    cache = LRUCache(max_bytes=25, max_entries=100, ttl_seconds=60)
+
+    async def scenario():
+        await cache.set("a", b"x" * 9)
+        await cache.set("b", b"x" * 9)
+        await cache.get("a")  # "b" is now the least recently used
+        await cache.set("c", b"x" * 9)
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    a, b, c = asyncio.run(scenario())
+    assert a is not None and b is None and c is not None
+    assert cache.stats.evictions == 1
+    assert cache.size_bytes <= 25
+
+
+def test_lru_cache_skips_values_larger_than_the_bound():
+    cache = LRUCache(max_bytes=10, max_entries=100, ttl_seconds=60)
+    asyncio.run(cache.set("big", b"x" * 50))
+    assert len(cache) == 0
+
+
+def test_build_cache_none_disables_caching():
+    assert build_cache("none", ttl_seconds=1, max_bytes=1, max_entries=1) is None
+
+
+def test_property_detail_is_served_from_cache(memory_session, fake_mongo, add_listing, sql_statements):
+    property_id = add_listing()
+    cache = LRUCache(max_bytes=1 << 20, max_entries=100, ttl_seconds=60)
+    service = PropertyService(memory_session, fake_mongo, cache=cache)
+
+    first = asyncio.run(service.get_property_by_id(property_id))
+    sql_statements.clear()
+    fake_mongo.properties.reset_calls()
+    second = asyncio.run(service.get_property_by_id(property_id))
+
+    assert second == first
+    assert (len(sql_statements), fake_mongo.properties.round_trips) == (0, 0)
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_missing_property_is_not_cached(memory_session, fake_mongo):
+    cache = LRUCache(max_bytes=1 << 20, max_entries=100, ttl_seconds=60)
+    service = PropertyService(memory_session, fake_mongo, cache=cache)
+
+    assert asyncio.run(service.get_property_by_id(uuid4())) is None
+    assert len(cache) == 0
+
+
+def test_update_and_delete_invalidate_cached_detail(memory_session, fake_mongo, add_listing):
+    property_id = add_listing()
+    cache = LRUCache(max_bytes=1 << 20, max_entries=100, ttl_seconds=60)
+    service = PropertyService(memory_session, fake_mongo, cache=cache)
+
+    asyncio.run(service.get_property_by_id(property_id))
+    asyncio.run(service.update_property(property_id, {"title": "Renovated flat"}))
+    assert asyncio.run(service.get_property_by_id(property_id)).title == "Renovated flat"
+
+    asyncio.run(service.delete_property(property_id))
+    assert asyncio.run(service.get_property_by_id(property_id)) is None
+    assert cache.stats.invalidations == 2
+
+
+def test_load_racing_an_invalidation_is_not_cached(memory_session, fake_mongo, add_listing):
+    property_id = add_listing()
+    cache = LRUCache(max_bytes=1 << 20, max_entries=100, ttl_seconds=60)
+    service = PropertyService(memory_session, fake_mongo, cache=cache, fetches=None, generations=Generations())
+    original_find_one = fake_mongo.properties.find_one
+
+    async def find_one_then_write(*args, **kwargs):
+        document = await original_find_one(*args, **kwargs)
+        await service._invalidate(property_id)  # e.g. the outbox worker applying an update
+        return document
+
+    fake_mongo.properties.find_one = find_one_then_write
+    assert asyncio.run(service.get_property_by_id(property_id)) is not None
+    assert len(cache) == 0
+
+    fake_mongo.properties.find_one = original_find_one
+    asyncio.run(service.get_property_by_id(property_id))
+    assert len(cache) == 1
+
+
+def test_generations_never_report_a_dropped_key_as_unchanged():
+    generations = Generations(max_keys=2)
+    before = generations.current("a")
+    generations.bump("a")
+    generations.bump("b")
+    generations.bump("c")  # drops "a"
+
+    assert generations.current("a") != before
+    assert generations.current("c") > generations.current("b")
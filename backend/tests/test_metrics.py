@@ -0,0 +1,80 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.cache import LRUCache
+from app.core.metrics import (
+    Histogram,
+    Metrics,
+    MetricsMiddleware,
+    MetricsWriter,
+    MongoPoolStats,
+    collect_caches,
+    collect_mongo_pool,
+)
+from app.main import app
+
+
+def test_histogram_buckets_render_cumulatively():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    writer = MetricsWriter()
+
+    writer.histogram("latency_seconds", "Latency.", [({"route": "/x"}, histogram)])
+
+    assert writer.lines[2:] == [
+        'latency_seconds_bucket{route="/x",le="0.1"} 2',
+        'latency_seconds_bucket{route="/x",le="1"} 3',
+        'latency_seconds_bucket{route="/x",le="+Inf"} 4',
+        'latency_seconds_sum{route="/x"} 3.65',
+        'latency_seconds_count{route="/x"} 4',
+    ]
+
+
+def test_middleware_labels_requests_by_route_template():
+    metrics = Metrics()
+    api = FastAPI()
+    api.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @api.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(api)
+    for path in ("/items/1", "/items/2", "/nowhere"):
+        client.get(path)
+    text = metrics.render()
+
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 2' in text
+    assert 'http_responses_total{method="GET",route="/items/{item_id}",status="200"} 2' in text
+    assert 'http_responses_total{method="GET",route="unmatched",status="404"} 1' in text
+    assert "http_requests_in_flight 0" in text
+    assert "/items/1" not in text
+
+
+def test_collectors_read_cache_and_pool_stats():
+    cache = LRUCache(max_bytes=1024, max_entries=10, ttl_seconds=60)
+    cache.stats.hits, cache.stats.misses = 3, 1
+    pool = MongoPoolStats()
+    for _ in range(3):
+        pool.connection_created(None)
+    pool.connection_checked_out(None)
+    writer = MetricsWriter()
+
+    collect_caches(writer, {"property": cache, "disabled": None})
+    collect_mongo_pool(writer, pool)
+
+    assert 'cache_hit_ratio{cache="property"} 0.75' in writer.lines
+    assert not any('cache="disabled"' in line for line in writer.lines)
+    assert "mongo_pool_connections 3" in writer.lines
+    assert "mongo_pool_connections_in_use 1" in writer.lines
+
+
+def test_metrics_endpoint_serves_the_text_format():
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    for family in ("http_request_duration_seconds", "sql_pool_open", "mongo_pool_connections",
+                   "cache_hit_ratio", "singleflight_calls_total", "outbox_pending", "password_hash_pending"):
+        assert f"# TYPE {family} " in response.text
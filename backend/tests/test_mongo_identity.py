@@ -0,0 +1,88 @@
+import asyncio
+from uuid import uuid4
+
+from bson import ObjectId
+
+from app.config import settings
+from app.properties.geo import geo_point
+from app.properties.models import Property
+from app.properties.services import PropertyService
+from db import mongo_migrations
+
+
+def add_legacy_listing(session, mongo, **document):
+    """A listing whose document predates `_id` == property id."""
+    property_id = uuid4()
+    session.add(Property(
+        id=property_id, user_id=uuid4(), title="Legacy listing",
+        property_type="house", price=150000, status="available",
+    ))
+    asyncio.run(session.commit())
+    mongo.properties.documents.append({
+        "_id": ObjectId(), "sql_property_id": str(property_id), "details": {"bedrooms": 4}, **document,
+    })
+    return property_id
+
+
+def test_legacy_documents_are_found_with_the_fallback_enabled(memory_session, fake_mongo, monkeypatch):
+    property_id = add_legacy_listing(memory_session, fake_mongo)
+    service = PropertyService(memory_session, fake_mongo, cache=None)
+
+    # Without the fallback only the SQL half of the listing is found
+    assert asyncio.run(service.get_property_by_id(property_id)).details is None
+
+    monkeypatch.setattr(settings, "MONGO_LEGACY_ID_FALLBACK", True)
+    assert asyncio.run(service.get_property_by_id(property_id)).details.bedrooms == 4
+    page = asyncio.run(service.get_user_properties(
+        asyncio.run(memory_session.get(Property, property_id)).user_id
+    ))
+    assert page.items[0].details.bedrooms == 4
+
+
+def test_map_pins_of_legacy_documents_carry_the_property_id(memory_session, fake_mongo):
+    coordinates = {"lat": -6.77, "lng": 39.24}
+    property_id = add_legacy_listing(memory_session, fake_mongo, price=150000, property_type="house",
+                                     location={"address": "Mikocheni", "coordinates": coordinates},
+                                     geo=geo_point(coordinates))
+    service = PropertyService(memory_session, fake_mongo, cache=None)
+
+    result = asyncio.run(service.get_map_clusters({"bbox": "39.0,-7.0,39.5,-6.5"}, 10))
+
+    assert [pin.id for cell in result.clusters for pin in cell.pins] == [property_id]
+
+
+def test_rekey_moves_documents_to_the_property_id(memory_session, fake_mongo, monkeypatch):
+    monkeypatch.setattr(mongo_migrations, "mongo_db", fake_mongo)
+    ids = [add_legacy_listing(memory_session, fake_mongo) for _ in range(5)]
+
+    assert asyncio.run(mongo_migrations.rekey_property_ids(batch_size=2)) == 5
+
+    documents = fake_mongo.properties.documents
+    assert sorted(d["_id"] for d in documents) == sorted(str(i) for i in ids)
+    assert all("sql_property_id" not in d for d in documents)
+    service = PropertyService(memory_session, fake_mongo, cache=None)
+    assert asyncio.run(service.get_property_by_id(ids[0])).details.bedrooms == 4
+    # Nothing left to do on a second run
+    assert asyncio.run(mongo_migrations.rekey_property_ids(batch_size=2)) == 0
+
+
+def test_rekey_keeps_originals_modified_during_the_copy(memory_session, fake_mongo, monkeypatch):
+    monkeypatch.setattr(mongo_migrations, "mongo_db", fake_mongo)
+    property_id = add_legacy_listing(memory_session, fake_mongo)
+    collection = fake_mongo.properties
+    bulk_write = collection.bulk_write
+
+    async def write_racing_with_an_update(requests, ordered=True):
+        result = await bulk_write(requests, ordered=ordered)
+        if collection.calls["bulk_write"] == 1:
+            # The app updates the legacy document right after it was copied
+            collection.documents[0]["details"] = {"bedrooms": 5}
+        return result
+
+    monkeypatch.setattr(collection, "bulk_write", write_racing_with_an_update)
+    assert asyncio.run(mongo_migrations.rekey_property_ids()) == 0
+    assert len(collection.documents) == 2
+
+    # The next run copies the newer content and removes the original
+    assert asyncio.run(mongo_migrations.rekey_property_ids()) == 1
+    assert collection.documents == [{"_id": str(property_id), "details": {"bedrooms": 5}}]
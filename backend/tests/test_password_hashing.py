@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from passlib.context import CryptContext
+from sqlalchemy import select
+
+import app.users.service as user_service
+from app.core.hashing import HashingBusyError, PasswordHasher, build_context
+from app.users.models import User
+from app.users.service import authenticate_user
+
+
+def make_hasher(workers=2, max_pending=8):
+    return PasswordHasher(lambda: build_context("pbkdf2_sha256", 2000), workers=workers, max_pending=max_pending)
+
+
+def test_login_upgrades_hashes_made_under_an_older_policy(memory_session, monkeypatch):
+    hasher = make_hasher()
+    monkeypatch.setattr(user_service, "password_hasher", hasher)
+    legacy = CryptContext(schemes=["pbkdf2_sha256"], pbkdf2_sha256__default_rounds=1000).hash("s3cret!")
+    memory_session.add(User(email="old@makaziplus.com", hashed_password=legacy, first_name="A", last_name="B"))
+    asyncio.run(memory_session.commit())
+
+    assert asyncio.run(authenticate_user(memory_session, "old@makaziplus.com", "wrong")) is False
+    assert asyncio.run(authenticate_user(memory_session, "old@makaziplus.com", "s3cret!"))
+
+    stored = asyncio.run(memory_session.scalar(select(User.hashed_password)))
+    assert stored.startswith("$pbkdf2-sha256$2000$") and hasher.context.verify("s3cret!", stored)
+    assert asyncio.run(authenticate_user(memory_session, "old@makaziplus.com", "s3cret!"))
+    assert hasher.stats.rehashed == 1
+    hasher.shutdown()
+
+
+def test_admission_limit_rejects_instead_of_queueing():
+    hasher = make_hasher(workers=1, max_pending=2)
+
+    async def burst():
+        return await asyncio.gather(*(hasher.hash("pw") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert [isinstance(r, HashingBusyError) for r in results] == [False, False, True]
+    stats = hasher.stats.as_dict()
+    assert (stats["completed"], stats["rejected"], stats["pending"]) == (2, 1, 0)
+    assert stats["max_queue_depth"] >= 1
+    hasher.shutdown()
+
+
+def test_failed_operations_are_not_counted_as_completed():
+    hasher = make_hasher(workers=1)
+
+    assert asyncio.run(hasher.verify("pw", asyncio.run(hasher.hash("pw"))))
+    with pytest.raises(ValueError):
+        asyncio.run(hasher.verify("pw", "not a hash"))
+    stats = hasher.stats.as_dict()
+    assert (stats["completed"], stats["failed"], stats["pending"]) == (2, 1, 0)
+    hasher.shutdown()
+
+
+def test_cancelled_callers_keep_their_job_counted_until_it_ends():
+    hasher = PasswordHasher(lambda: build_context("pbkdf2_sha256", 200000), workers=1, max_pending=8)
+
+    async def run():
+        task = asyncio.create_task(hasher.hash("pw"))
+        while not hasher.stats.running:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        counted = hasher.stats.pending
+        while hasher.stats.pending:
+            await asyncio.sleep(0.005)
+        return counted
+
+    assert asyncio.run(run()) == 1
+    assert (hasher.stats.failed, hasher.stats.running) == (1, 0)
+    hasher.shutdown()
+
+
+def test_hashing_leaves_the_event_loop_free():
+    hasher = PasswordHasher(lambda: build_context("pbkdf2_sha256", 200000), workers=1, max_pending=8)
+    ticks = 0
+
+    async def ticker(done):
+        nonlocal ticks
+        while not done.is_set():
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    async def run():
+        done = asyncio.Event()
+        task = asyncio.create_task(ticker(done))
+        hashed = await hasher.hash("pw")
+        done.set()
+        await task
+        return hashed
+
+    assert hasher.context.verify("pw", asyncio.run(run()))
+    assert ticks > 1
+    hasher.shutdown()
+
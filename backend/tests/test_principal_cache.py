@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import app.core.security as security
+import app.users.cache as users_cache
+from app.core.cache import LRUCache
+from app.core.security import create_access_token, get_current_active_user, get_current_user, load_principal
+from app.users.models import User
+from app.users.repository import UserRepository
+
+
+@pytest.fixture(name="principals")
+def principals_fixture(monkeypatch):
+    cache = LRUCache(max_bytes=1 << 20, max_entries=100, ttl_seconds=30)
+    monkeypatch.setattr(security, "principal_cache", cache)
+    monkeypatch.setattr(users_cache, "principal_cache", cache)
+    return cache
+
+
+def add_user(session, email="agent@makaziplus.com", role="agent"):
+    user = User(email=email, hashed_password="x", first_name="Asha", last_name="Mushi",
+                phone_number="0671234567", role=role, is_active=True)
+    session.add(user)
+    asyncio.run(session.commit())
+    return user
+
+
+def test_token_subject_is_resolved_once_per_ttl(memory_session, sql_statements, principals):
+    user = add_user(memory_session)
+    token = create_access_token({"sub": user.email})
+    sql_statements.clear()
+
+    first = asyncio.run(get_current_user(token, memory_session))
+    second = asyncio.run(get_current_user(token, memory_session))
+
+    assert first == second and (second.id, second.role) == (user.id, "agent")
+    assert [s for s in sql_statements if "users" in s] and len(sql_statements) == 1
+    assert principals.stats.as_dict()["hits"] == 1 and principals.stats.hit_ratio == 0.5
+
+
+def test_access_changes_invalidate_the_cached_principal(memory_session, principals):
+    user = add_user(memory_session)
+    assert asyncio.run(load_principal(memory_session, user.email)).role == "agent"
+
+    asyncio.run(UserRepository(memory_session).update_access(user, role="admin"))
+    assert asyncio.run(load_principal(memory_session, user.email)).role == "admin"
+
+    asyncio.run(UserRepository(memory_session).update_access(user, is_active=False))
+    principal = asyncio.run(load_principal(memory_session, user.email))
+    with pytest.raises(HTTPException) as e:
+        get_current_active_user(principal)
+    assert e.value.status_code == 400
+    assert principals.stats.invalidations == 2
+
+
+def test_access_changed_outside_the_repository_applies_within_the_ttl(memory_session, monkeypatch):
+    now = [0.0]
+    cache = LRUCache(max_bytes=1 << 20, max_entries=100, ttl_seconds=30, clock=lambda: now[0])
+    monkeypatch.setattr(security, "principal_cache", cache)
+    user = add_user(memory_session)
+    assert asyncio.run(load_principal(memory_session, user.email)).is_active
+
+    user.is_active = False  # e.g. an admin editing the users table directly
+    asyncio.run(memory_session.commit())
+    now[0] = 29.0
+    assert asyncio.run(load_principal(memory_session, user.email)).is_active
+    now[0] = 30.0
+    assert not asyncio.run(load_principal(memory_session, user.email)).is_active
+
+
+def test_unknown_subjects_are_not_cached(memory_session, principals):
+    token = create_access_token({"sub": "late@makaziplus.com"})
+    with pytest.raises(HTTPException):
+        asyncio.run(get_current_user(token, memory_session))
+
+    add_user(memory_session, email="late@makaziplus.com")
+    assert asyncio.run(get_current_user(token, memory_session)).email == "late@makaziplus.com"
+    assert len(principals) == 1
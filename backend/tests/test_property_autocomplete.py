@@ -0,0 +1,134 @@
+import asyncio
+import random
+from uuid import uuid4
+
+from app.properties.autocomplete import AddressIndex, location_phrases
+from app.properties.schema import PropertyCreate
+from app.properties.services import PropertyService
+
+
+def location(address, street_address=None):
+    return {"address": address, "street_address": street_address, "coordinates": {"lat": -6.8, "lng": 39.28}}
+
+
+def texts(suggestions):
+    return [(s["text"], s["listings"]) for s in suggestions]
+
+
+def test_phrases_include_the_street_without_its_house_number():
+    assert location_phrases(location("Masaki", "12A Haile Selassie Road")) == [
+        ("address", "Masaki"), ("street_address", "12A Haile Selassie Road"), ("street", "Haile Selassie Road"),
+    ]
+    assert location_phrases(location("Masaki", "Haile Selassie Road")) == [
+        ("address", "Masaki"), ("street_address", "Haile Selassie Road"),
+    ]
+
+
+def test_suggestions_match_any_word_and_rank_by_listing_count():
+    index = AddressIndex()
+    index.set_location(uuid4(), location("Masaki", "12 Haile Selassie Road"))
+    index.set_location(uuid4(), location("masaki", "40 Haile Selassie Road"))
+    index.set_location(uuid4(), location("Mbezi Beach"))
+
+    assert texts(index.suggest("m")) == [("Masaki", 2), ("Mbezi Beach", 1)]
+    assert texts(index.suggest("SELASSIE r")) == [
+        ("Haile Selassie Road", 2), ("12 Haile Selassie Road", 1), ("40 Haile Selassie Road", 1),
+    ]
+    assert texts(index.suggest("beach")) == [("Mbezi Beach", 1)]
+    assert index.suggest("oyster") == [] and index.suggest("  ,") == []
+    assert len(index.suggest("h", limit=2)) == 2
+
+
+def test_moves_and_deletes_update_the_counts():
+    index = AddressIndex()
+    first, second = uuid4(), uuid4()
+    index.set_location(first, location("Masaki"))
+    index.set_location(second, location("Masaki"))
+
+    index.set_location(first, location("Oysterbay"))
+    assert texts(index.suggest("ma")) == [("Masaki", 1)]
+    index.remove(second)
+    index.remove(uuid4())  # never indexed
+
+    assert index.suggest("ma") == []
+    assert texts(index.suggest("oy")) == [("Oysterbay", 1)]
+    assert index.as_dict()["phrases"] == 1
+
+
+def test_snapshot_load_keeps_writes_made_while_it_ran(fake_mongo):
+    kept, moved, deleted = (str(uuid4()) for _ in range(3))
+    fake_mongo.properties.documents = [
+        {"_id": kept, "title": "Flat", "location": location("Upanga")},
+        {"_id": moved, "title": "House", "location": location("Kariakoo")},
+        {"_id": deleted, "title": "Plot", "location": location("Kariakoo")},
+    ]
+    index = AddressIndex()
+    index.set_location(uuid4(), location("Stale entry"))
+
+    async def snapshot():
+        async for document in fake_mongo.properties.find({}):
+            # Writes landing mid-load are newer than the documents being read
+            index.set_location(moved, location("Kinondoni"))
+            index.remove(deleted)
+            yield document
+
+    asyncio.run(index.load(snapshot()))
+
+    assert texts(index.suggest("k")) == [("Kinondoni", 1)]
+    assert texts(index.suggest("up")) == [("Upanga", 1)]
+    assert index.suggest("stale") == []
+    assert index.loaded_at is not None
+
+
+def test_ranked_prefixes_match_a_full_scan_as_writes_land():
+    rng = random.Random(7)
+    areas = ["Masaki", "Mbezi Beach", "Mikocheni", "Msasani", "Kariakoo", "Kinondoni", "Upanga"]
+    streets = ["Haile Selassie Road", "Chole Road", "Mwai Kibaki Road", "Toure Drive", "Morogoro Road"]
+    ranked, scanned = AddressIndex(ranked_min_run=8), AddressIndex(ranked_min_run=10 ** 9)
+    ids = [uuid4() for _ in range(300)]
+
+    for step in range(1500):
+        property_id = rng.choice(ids)
+        if step % 7 == 0:
+            place = None
+        else:
+            place = location(f"{rng.choice(areas)} {rng.randint(1, 40)}",
+                             f"{rng.randint(1, 99)} {rng.choice(streets)}")
+        for index in (ranked, scanned):
+            index.set_location(property_id, place)
+        if step % 50 == 0:
+            for prefix in ("m", "ma", "road", "k", "1", "haile s", "mbezi beach"):
+                assert ranked.suggest(prefix) == scanned.suggest(prefix), (step, prefix)
+
+    assert ranked.as_dict()["ranked_prefixes"] >= 4
+    assert scanned.as_dict()["ranked_prefixes"] == 0
+
+
+def test_multi_word_prefixes_stay_correct_across_moves_and_removes():
+    index = AddressIndex(ranked_min_run=2)
+    north, south = uuid4(), uuid4()
+    index.set_location(north, location("Main Road North"))
+    index.set_location(south, location("Main Road South"))
+    assert len(index.suggest("main road")) == 2
+
+    index.remove(north)
+    index.set_location(south, location("Upanga"))
+    assert index.suggest("main road") == []
+    assert index.as_dict()["ranked_prefixes"] == 0
+
+
+def test_service_writes_keep_the_index_current(memory_session, fake_mongo):
+    index = AddressIndex()
+    service = PropertyService(memory_session, fake_mongo, cache=None, suggestions=index)
+    created = asyncio.run(service.create_property(PropertyCreate(
+        user_id=uuid4(), title="Sea view villa", property_type="house", price=900000,
+        location=location("Msasani", "7 Chole Road"),
+    )))
+    assert texts(index.suggest("chole")) == [("Chole Road", 1), ("7 Chole Road", 1)]
+
+    asyncio.run(service.update_property(created.id, {"location": location("Mikocheni")}))
+    assert index.suggest("msa") == [] and texts(index.suggest("mik")) == [("Mikocheni", 1)]
+
+    asyncio.run(service.delete_property(created.id))
+    assert len(index) == 0
+
@@ -0,0 +1,70 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.properties.export import export_lines, gzip_chunks
+from app.properties.services import PropertyService
+
+
+def seed(add_listing, count, updated_at=None):
+    # Every fifth listing has no Mongo document
+    return [add_listing(title=f"Listing {i}", price=100000 + i, updated_at=updated_at, synced=bool(i % 5),
+                        details={"bedrooms": i}) for i in range(count)]
+
+
+def collect(chunks):
+    async def run():
+        return b"".join([chunk async for chunk in chunks])
+    return asyncio.run(run())
+
+
+def export(session, mongo, **kwargs):
+    return export_lines(async_sessionmaker(session.bind, expire_on_commit=False), mongo, **kwargs)
+
+
+def test_export_streams_every_listing_in_batches(memory_session, fake_mongo, add_listing):
+    ids = seed(add_listing, 25)
+
+    chunks = []
+
+    async def run():
+        async for chunk in export(memory_session, fake_mongo, batch_size=10):
+            chunks.append(chunk)
+
+    asyncio.run(run())
+    rows = [json.loads(line) for line in b"".join(chunks).splitlines()]
+
+    assert len(chunks) == 3
+    assert fake_mongo.properties.calls["find"] == 3
+    assert sorted(r["id"] for r in rows) == sorted(str(i) for i in ids)
+    by_id = {r["id"]: r for r in rows}
+    assert by_id[str(ids[1])]["details"]["bedrooms"] == 1
+    assert by_id[str(ids[0])]["details"] is None  # exported even without a Mongo document
+
+
+def test_updated_since_only_exports_later_changes(memory_session, fake_mongo, add_listing):
+    last_week = datetime.utcnow() - timedelta(days=7)
+    old_ids = seed(add_listing, 3, updated_at=last_week)
+    new_ids = seed(add_listing, 2)
+    asyncio.run(PropertyService(memory_session, fake_mongo, cache=None).update_property(
+        old_ids[1], {"details": {"bedrooms": 9}}
+    ))
+
+    rows = [json.loads(line) for line in collect(export(
+        memory_session, fake_mongo, updated_since=last_week + timedelta(days=1)
+    )).splitlines()]
+
+    assert {r["id"] for r in rows} == {str(i) for i in new_ids + [old_ids[1]]}
+    assert rows[-1]["id"] == str(old_ids[1])  # most recently updated comes last
+
+
+def test_gzip_export_round_trips(memory_session, fake_mongo, add_listing):
+    seed(add_listing, 12)
+
+    plain = collect(export(memory_session, fake_mongo, batch_size=5))
+    compressed = collect(gzip_chunks(export(memory_session, fake_mongo, batch_size=5)))
+
+    assert gzip.decompress(compressed) == plain
@@ -0,0 +1,104 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.core.cache import LRUCache
+from app.properties import services
+from app.properties.facets import facet_cache_key, sql_facet_query
+from app.properties.models import Property
+from app.properties.services import PropertyService
+
+
+def seed(add_listing):
+    add_listing("house", 90000, details={"bedrooms": 3}, features={"pool": True})
+    add_listing("house", 300000, details={"bedrooms": 4}, features={"pool": True, "balcony": True})
+    add_listing("apartment", 300000, "rented", details={"bedrooms": 2}, features={"pool": False})
+    add_listing("land", 3000000, location={"address": "Kariakoo Street", "coordinates": {"lat": -3.37, "lng": 36.68}})
+
+
+def facets(session, mongo, filters, cache=None):
+    return asyncio.run(PropertyService(session, mongo, facets_cache=cache).get_facets(filters))
+
+
+def counts(buckets):
+    return {bucket.value: bucket.count for bucket in buckets}
+
+
+def test_facets_take_one_sql_query_and_one_aggregation(memory_session, fake_mongo, add_listing, sql_statements):
+    seed(add_listing)
+    sql_statements.clear()
+    fake_mongo.properties.reset_calls()
+
+    result = facets(memory_session, fake_mongo, {"min_price": 100000})
+
+    assert len(sql_statements) == 1
+    assert fake_mongo.properties.calls == {"aggregate": 1}
+    assert result.total == 3
+    assert counts(result.property_type) == {"house": 1, "apartment": 1, "land": 1}
+    assert counts(result.status) == {"available": 2, "rented": 1}
+    assert [(b.min_price, b.max_price, b.count) for b in result.price_band] == [
+        (250000, 500000, 2), (2500000, None, 1),
+    ]
+    assert [(b.value, b.count) for b in result.bedrooms] == [(2, 1), (4, 1), (None, 1)]
+    assert result.features["pool"] == 1 and result.features["balcony"] == 1
+
+
+def test_document_filters_compute_every_facet_in_mongo(memory_session, fake_mongo, add_listing, sql_statements):
+    seed(add_listing)
+    sql_statements.clear()
+
+    result = facets(memory_session, fake_mongo, {"pool": True, "property_type": "house"})
+
+    assert sql_statements == []
+    assert result.total == 2
+    assert counts(result.property_type) == {"house": 2}
+    assert [(b.min_price, b.count) for b in result.price_band] == [(0, 1), (250000, 1)]
+    assert counts(result.bedrooms) == {3: 1, 4: 1}
+
+
+def test_radius_filter_is_applied_to_facets(memory_session, fake_mongo, add_listing):
+    seed(add_listing)
+
+    result = facets(memory_session, fake_mongo, {"near_lat": -3.37, "near_lng": 36.68, "radius_km": 5})
+
+    assert result.total == 1
+    assert counts(result.property_type) == {"land": 1}
+
+
+def test_facets_are_cached_by_normalized_filter(memory_session, fake_mongo, add_listing, sql_statements):
+    seed(add_listing)
+    cache = LRUCache(max_bytes=1 << 20, max_entries=100, ttl_seconds=30)
+    first = facets(memory_session, fake_mongo, {"location": "Kariakoo Street", "min_price": 100000}, cache)
+    sql_statements.clear()
+    fake_mongo.properties.reset_calls()
+
+    again = facets(memory_session, fake_mongo, {"min_price": 100000.0, "location": "kariakoo street "}, cache)
+
+    assert again == first
+    assert (len(sql_statements), fake_mongo.properties.round_trips) == (0, 0)
+    assert facet_cache_key({"bbox": "39.2,-6.85,39.3,-6.75"}) == facet_cache_key({"bbox": "39.20,-6.85,39.30,-6.750"})
+
+
+def test_postgres_uses_grouping_sets():
+    query = sql_facet_query(select(Property).filter(Property.status == "available"), "postgresql")
+    sql = str(query.compile(dialect=postgresql.dialect()))
+
+    assert "GROUP BY GROUPING SETS(properties.property_type, properties.status, CASE" in sql
+    assert "UNION" not in sql
+
+
+def test_text_search_restricts_every_facet_to_the_same_listings(memory_session, fake_mongo, add_listing,
+                                                                monkeypatch):
+    seed(add_listing)
+    add_listing("house", 400000, title="Sea view villa", details={"bedrooms": 5}, features={"pool": True})
+    add_listing("house", 600000, title="Hilltop villa", details={"bedrooms": 4}, features={"balcony": True})
+    monkeypatch.setattr(services, "FACET_ID_CHUNK", 1)  # one aggregation per match, summed
+
+    result = facets(memory_session, fake_mongo, {"q": "villa"})
+
+    assert result.total == 2
+    assert counts(result.property_type) == {"house": 2}
+    assert counts(result.bedrooms) == {4: 1, 5: 1}
+    assert (result.features["pool"], result.features["balcony"]) == (1, 1)
+    assert fake_mongo.properties.calls["aggregate"] == 2
@@ -0,0 +1,90 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from app.properties.fulltext import search_terms, text_match
+from app.properties.models import Property
+from app.properties.schema import PageParams, PropertyCreate
+from app.properties.services import PropertyService
+
+
+def add_listing(service, title, address, street_address=None, property_type="house"):
+    location = {"address": address, "coordinates": {"lat": -6.8, "lng": 39.2}}
+    if street_address:
+        location["street_address"] = street_address
+    return asyncio.run(service.create_property(PropertyCreate(
+        user_id=uuid4(), title=title, property_type=property_type, price=150000, location=location,
+    ), consistent=True)).id
+
+
+def search(service, filters, page=None):
+    return asyncio.run(service.search_properties(filters, page))
+
+
+@pytest.fixture(name="service")
+def service_fixture(memory_session, fake_mongo):
+    return PropertyService(memory_session, fake_mongo, cache=None)
+
+
+def test_q_matches_title_and_address_prefixes(service):
+    sea_view = add_listing(service, "Sea view villa", "Msasani Peninsula", "12 Haile Selassie Road")
+    garden = add_listing(service, "Garden cottage", "Mikocheni", "Old Bagamoyo Road", property_type="apartment")
+    add_listing(service, "City loft", "Kariakoo")
+
+    assert [p.id for p in search(service, {"q": "SEA vi"}).items] == [sea_view]
+    assert {p.id for p in search(service, {"q": "road"}).items} == {sea_view, garden}
+    assert [p.id for p in search(service, {"q": "road", "property_type": "apartment"}).items] == [garden]
+    assert search(service, {"q": "road mikocheni villa"}).items == []
+
+
+def test_q_treats_like_wildcards_literally(service):
+    add_listing(service, "Loft", "Kariakoo")
+
+    with pytest.raises(ValueError):
+        search(service, {"q": "%%"})
+    assert search(service, {"q": "k_r"}).items == []
+
+
+def test_relevance_sort_pages_through_matches(service):
+    ids = {add_listing(service, f"Beach house {i}", "Kigamboni") for i in range(5)}
+    add_listing(service, "Town flat", "Upanga")
+
+    page = search(service, {"q": "beach"}, PageParams(page_size=2, sort="relevance"))
+    seen = [p.id for p in page.items]
+    while page.next_cursor:
+        page = search(service, {"q": "beach"}, PageParams(page_size=2, sort="relevance", cursor=page.next_cursor))
+        seen += [p.id for p in page.items]
+
+    assert len(seen) == 5 and set(seen) == ids
+    with pytest.raises(ValueError):
+        search(service, {}, PageParams(sort="relevance"))
+
+
+def test_moving_a_listing_reindexes_its_address(service, memory_session):
+    listing = add_listing(service, "Family home", "Oysterbay")
+
+    asyncio.run(service.update_property(listing, {
+        "location": {"address": "Mbezi Beach", "coordinates": {"lat": -6.7, "lng": 39.2}},
+    }))
+
+    assert asyncio.run(memory_session.get(Property, listing)).search_address == "Mbezi Beach"
+    assert [p.id for p in search(service, {"q": "mbezi"}).items] == [listing]
+    assert search(service, {"q": "oysterbay"}).items == []
+
+
+def test_postgres_query_repeats_the_indexed_expression():
+    (index,) = [i for i in Property.__table__.indexes if i.name == "ix_properties_search_vector"]
+    indexed = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    predicate, rank = text_match("sea views", "postgresql")
+    query = str(select(Property.id, rank).filter(predicate).compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    ))
+
+    vector = indexed[indexed.index("((") + 2:indexed.rindex("))")]
+    assert vector.replace("title", "properties.title").replace("search_address", "properties.search_address") in query
+    assert "to_tsquery(CAST('english' AS REGCONFIG), 'sea:* & views:*')" in query
+    assert search_terms("Sea-view, 3 bed!") == ["sea", "view", "3", "bed"]
@@ -0,0 +1,165 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.properties import bulk
+from app.properties.bulk import import_properties, iter_lines, parse_rows
+from app.properties.models import Property, PropertyOutbox
+from app.properties.outbox import apply_pending
+
+LOCATION = {"address": "Mikocheni", "coordinates": {"lat": -6.77, "lng": 39.24}}
+
+
+def listing(n, **overrides):
+    record = {"title": f"Listing {n}", "property_type": "house", "price": 100000 + n, "location": LOCATION}
+    record.update(overrides)
+    return record
+
+
+async def stream(data: bytes, chunk_size: int = 7):
+    # Small, arbitrary chunk boundaries, including inside multi-byte characters
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def ndjson(records):
+    return "\n".join(r if isinstance(r, str) else json.dumps(r) for r in records).encode()
+
+
+def run_import(session, data, file_format="ndjson", **kwargs):
+    rows = parse_rows(stream(data), file_format, skip=kwargs.get("resume_from", 0))
+    return asyncio.run(import_properties(session, rows, uuid4(), **kwargs))
+
+
+def count_rows(session, model=Property):
+    return asyncio.run(session.scalar(select(func.count()).select_from(model)))
+
+
+def sync(session, mongo):
+    asyncio.run(apply_pending(session, mongo.properties))
+
+
+def test_lines_survive_arbitrary_chunk_boundaries():
+    data = "Msasani ✓\r\nOyster Bay\n\nlast".encode()
+
+    async def collect():
+        return [line async for line in iter_lines(stream(data, chunk_size=3))]
+
+    assert asyncio.run(collect()) == ["Msasani ✓", "Oyster Bay", "", "last"]
+
+
+def test_ndjson_import_reports_bad_rows_and_keeps_going(memory_session, fake_mongo, sql_statements):
+    data = ndjson([listing(1), "{not json", listing(3, price="lots"), listing(4), listing(5)])
+
+    sql_statements.clear()
+    report = run_import(memory_session, data, chunk_size=10)
+
+    assert (report.imported, report.failed, report.checkpoint) == (3, 2, 5)
+    assert [e.row for e in report.errors] == [2, 3]
+    assert report.errors[1].errors[0].startswith("price:")
+    assert count_rows(memory_session) == count_rows(memory_session, PropertyOutbox) == 3
+    # One multi-row insert each for the rows and their outbox entries; Mongo is left to the outbox
+    assert sum(s.startswith("INSERT") for s in sql_statements) == 2
+    assert fake_mongo.properties.round_trips == 0
+
+    sync(memory_session, fake_mongo)
+    assert len(fake_mongo.properties.documents) == 3
+
+
+def test_csv_import_nests_dotted_columns(memory_session, fake_mongo):
+    data = (
+        "title,property_type,price,location.address,location.coordinates.lat,location.coordinates.lng,details.bedrooms\n"
+        '"Flat, sea view",apartment,250000,"Plot 12\nMsasani",-6.75,39.27,2\n'
+        "Bare plot,land,90000,Kigamboni,-6.85,39.31,\n"
+    ).encode()
+
+    report = run_import(memory_session, data, file_format="csv")
+    sync(memory_session, fake_mongo)
+
+    assert (report.imported, report.failed) == (2, 0)
+    documents = {d["title"]: d for d in fake_mongo.properties.documents}
+    assert documents["Flat, sea view"]["location"]["address"] == "Plot 12\nMsasani"
+    assert documents["Flat, sea view"]["details"]["bedrooms"] == 2
+    assert "details" not in documents["Bare plot"]
+
+
+def test_reimport_with_the_same_import_id_is_idempotent(memory_session):
+    data = ndjson([listing(n) for n in range(1, 6)])
+
+    first = run_import(memory_session, data, import_id="feed-1", chunk_size=2)
+    again = run_import(memory_session, data, import_id="feed-1", chunk_size=2)
+    resumed = run_import(memory_session, data, import_id="feed-1", resume_from=4)
+
+    assert (first.imported, again.imported, again.skipped) == (5, 0, 5)
+    assert (resumed.imported, resumed.skipped) == (0, 1)
+    assert count_rows(memory_session) == 5
+
+
+def test_resuming_skips_the_imported_rows_before_parsing(memory_session):
+    # Rows 1-2 were imported by an earlier run; read again, they would be reported as errors
+    ndjson_feed = ndjson(["{not json", "[]", listing(3)])
+    csv_feed = 'title,price\n"Plot,\nwest",x,y\nshort\nBare plot,90000\n'.encode()
+
+    async def parse(data, file_format):
+        return [row async for row in parse_rows(stream(data), file_format, skip=2)]
+
+    assert asyncio.run(parse(ndjson_feed, "ndjson")) == [(3, listing(3), None)]
+    assert asyncio.run(parse(csv_feed, "csv")) == [(3, {"title": "Bare plot", "price": "90000"}, None)]
+
+    report = run_import(memory_session, ndjson_feed, resume_from=2)
+    assert (report.imported, report.failed, report.checkpoint) == (1, 0, 3)
+
+
+def test_failed_commit_leaves_nothing_in_either_store(memory_session, fake_mongo, monkeypatch):
+    async def commit():
+        raise OperationalError("COMMIT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(memory_session, "commit", commit)
+    report = run_import(memory_session, ndjson([listing(1), listing(2)]))
+    monkeypatch.undo()
+    sync(memory_session, fake_mongo)
+
+    assert report.aborted and report.imported == 0
+    assert count_rows(memory_session) == count_rows(memory_session, PropertyOutbox) == 0
+    assert fake_mongo.properties.documents == []
+
+
+def test_rows_beyond_the_column_limits_are_reported_per_row(memory_session):
+    data = ndjson([listing(1), listing(2, title="x" * 256), listing(3, price=1e13), listing(4)])
+
+    report = run_import(memory_session, data, chunk_size=10)
+
+    assert (report.imported, report.failed, report.aborted) == (2, 2, False)
+    assert [(e.row, e.errors[0].split(":")[0]) for e in report.errors] == [(2, "title"), (3, "price")]
+
+
+def test_a_chunk_the_database_rejects_is_retried_row_by_row(memory_session, monkeypatch):
+    insert_rows = bulk._insert_rows
+
+    async def reject_row_two(db, rows):
+        if any(sql_values["title"] == "Listing 2" for _, sql_values, _ in rows):
+            raise IntegrityError("INSERT", {}, Exception("violates check constraint"))
+        await insert_rows(db, rows)
+
+    monkeypatch.setattr(bulk, "_insert_rows", reject_row_two)
+    report = run_import(memory_session, ndjson([listing(1), listing(2), listing(3)]), chunk_size=10)
+
+    assert (report.imported, report.failed, report.aborted, report.checkpoint) == (2, 1, False, 3)
+    assert report.errors[0].row == 2 and "check constraint" in report.errors[0].errors[0]
+    assert count_rows(memory_session) == count_rows(memory_session, PropertyOutbox) == 2
+
+
+def test_checkpoints_are_reported_per_chunk(memory_session, fake_mongo):
+    checkpoints = []
+    rows = parse_rows(stream(ndjson([listing(n) for n in range(1, 6)])), "ndjson")
+
+    asyncio.run(import_properties(
+        memory_session, rows, uuid4(), chunk_size=2,
+        on_checkpoint=lambda report: checkpoints.append(report.checkpoint),
+    ))
+
+    assert checkpoints == [2, 4, 5]
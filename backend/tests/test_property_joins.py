@@ -0,0 +1,65 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.properties.services import PropertyService
+
+
+def seed_properties(add_listing, mongo, user_id, count, address="Kariakoo Street"):
+    for i in range(count):
+        add_listing(title=f"Listing {i}", price=100000 + i, user_id=user_id, details={"bedrooms": 3},
+                    location={"address": address, "coordinates": {"lat": -6.79, "lng": 39.2}})
+        mongo.properties.documents[-1]["title"] = "stale mongo title"
+
+
+def count_round_trips(session, mongo, sql_statements, call):
+    sql_statements.clear()
+    mongo.properties.reset_calls()
+    results = asyncio.run(call(PropertyService(session, mongo))).items
+    return results, len(sql_statements), mongo.properties.round_trips
+
+
+@pytest.mark.parametrize("count", [1, 25, 400])
+def test_get_user_properties_round_trips_are_constant(memory_session, fake_mongo, add_listing, sql_statements,
+                                                      count):
+    user_id = uuid4()
+    seed_properties(add_listing, fake_mongo, user_id, count)
+
+    results, sql_count, mongo_count = count_round_trips(
+        memory_session, fake_mongo, sql_statements, lambda s: s.get_user_properties(user_id)
+    )
+
+    assert len(results) == min(count, 20)
+    assert (sql_count, mongo_count) == (1, 1)
+    assert results[0].location.address == "Kariakoo Street"
+    assert results[0].details.bedrooms == 3
+    # SQL stays the source of truth for the columns it owns
+    assert results[0].title.startswith("Listing")
+
+
+@pytest.mark.parametrize("filters", [
+    {"property_type": "house"},
+    {"property_type": "house", "location": "msasani road"},
+])
+def test_search_properties_round_trips_are_constant(memory_session, fake_mongo, add_listing, sql_statements,
+                                                    filters):
+    round_trips = []
+    for count in (1, 25, 400):
+        seed_properties(add_listing, fake_mongo, uuid4(), count, address="Msasani Road")
+        results, sql_count, mongo_count = count_round_trips(
+            memory_session, fake_mongo, sql_statements, lambda s: s.search_properties(filters)
+        )
+        assert all(r.location.address == "Msasani Road" for r in results)
+        round_trips.append((sql_count, mongo_count))
+
+    assert len(set(round_trips)) == 1
+
+
+def test_get_user_properties_without_listings_skips_mongo(memory_session, fake_mongo, sql_statements):
+    results, sql_count, mongo_count = count_round_trips(
+        memory_session, fake_mongo, sql_statements, lambda s: s.get_user_properties(uuid4())
+    )
+
+    assert results == []
+    assert mongo_count == 0
@@ -0,0 +1,153 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+from pymongo.errors import BulkWriteError
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.cache import LRUCache
+from app.properties import outbox
+from app.properties.models import PropertyOutbox
+from app.properties.outbox import OutboxWorker, apply_pending, decode_payload, encode_payload, enqueue
+from app.properties.services import PropertyService
+
+
+def pending(session):
+    return asyncio.run(session.scalar(select(func.count()).select_from(PropertyOutbox)))
+
+
+def make_worker(memory_session, fake_mongo, **kwargs):
+    factory = async_sessionmaker(memory_session.bind, expire_on_commit=False)
+    return OutboxWorker(factory, lambda: fake_mongo.properties, **kwargs)
+
+
+def test_worker_applies_writes_in_one_bulk_write(memory_session, fake_mongo, new_listing):
+    service = PropertyService(memory_session, fake_mongo, cache=None)
+    created = asyncio.run(service.create_property(new_listing()))
+    asyncio.run(service.update_property(created.id, {"price": 300000, "details": {"bedrooms": 3}}))
+    other = asyncio.run(service.create_property(new_listing(title="Beach plot")))
+    asyncio.run(service.delete_property(other.id))
+    assert pending(memory_session) == 4
+
+    worker = make_worker(memory_session, fake_mongo, cache=None, fetches=None)
+    assert asyncio.run(worker.drain_once()) == 4
+
+    assert fake_mongo.properties.calls["bulk_write"] == 1
+    (document,) = fake_mongo.properties.documents
+    assert document["_id"] == str(created.id)
+    assert (document["price"], document["details"]) == (300000, {"bedrooms": 3})
+    assert pending(memory_session) == 0
+    assert worker.stats.as_dict()["applied"] == 4
+
+
+def test_payloads_keep_bson_datetimes():
+    listed_at = datetime(2026, 10, 1, 9, 30)
+    payload = encode_payload({"listed_at": listed_at, "details": {"occupation_date": date(2026, 11, 1)}})
+
+    assert decode_payload(payload) == {"listed_at": listed_at, "details": {"occupation_date": "2026-11-01"}}
+
+
+def test_reapplying_a_batch_is_harmless(memory_session, fake_mongo, new_listing):
+    service = PropertyService(memory_session, fake_mongo, cache=None)
+    created = asyncio.run(service.create_property(new_listing()))
+    asyncio.run(service.update_property(created.id, {"price": 300000}))
+    entries = asyncio.run(memory_session.scalars(select(PropertyOutbox))).all()
+
+    # As if the rows had survived a crash between the Mongo write and the SQL delete
+    for _ in range(2):
+        asyncio.run(apply_pending(memory_session, fake_mongo.properties))
+        for entry in entries:
+            memory_session.add(PropertyOutbox(
+                id=entry.id, property_id=entry.property_id, operation=entry.operation, payload=entry.payload,
+            ))
+        asyncio.run(memory_session.commit())
+
+    assert len(fake_mongo.properties.documents) == 1
+    assert fake_mongo.properties.documents[0]["price"] == 300000
+
+
+def test_failed_row_is_retried_and_only_holds_back_its_own_property(memory_session, fake_mongo):
+    stuck, healthy = uuid4(), uuid4()
+    enqueue(memory_session, stuck, "insert", {"title": "Stuck"})
+    enqueue(memory_session, stuck, "update", {"title": "Stuck, renamed"})
+    enqueue(memory_session, healthy, "insert", {"title": "Healthy"})
+    asyncio.run(memory_session.commit())
+
+    original_bulk_write = fake_mongo.properties.bulk_write
+
+    async def failing_first_write(requests, ordered=True):
+        if requests[0]._filter["_id"] == str(stuck):
+            raise BulkWriteError({"writeErrors": [{"index": 0, "errmsg": "document failed validation"}]})
+        return await original_bulk_write(requests, ordered)
+
+    fake_mongo.properties.bulk_write = failing_first_write
+    assert asyncio.run(apply_pending(memory_session, fake_mongo.properties)) == []
+
+    failed = asyncio.run(memory_session.scalar(select(PropertyOutbox).order_by(PropertyOutbox.id)))
+    assert (failed.attempts, failed.last_error) == (1, "document failed validation")
+    assert failed.available_at > datetime.utcnow()
+
+    # The stuck property's update waits behind its insert; the other property goes ahead
+    assert asyncio.run(apply_pending(memory_session, fake_mongo.properties)) == [healthy]
+    assert [d["title"] for d in fake_mongo.properties.documents] == ["Healthy"]
+
+    fake_mongo.properties.bulk_write = original_bulk_write
+    failed.available_at = datetime.utcnow() - timedelta(seconds=1)
+    asyncio.run(memory_session.commit())
+    assert asyncio.run(apply_pending(memory_session, fake_mongo.properties)) == [stuck]
+    assert sorted(d["title"] for d in fake_mongo.properties.documents) == ["Healthy", "Stuck, renamed"]
+
+
+def test_worker_reports_lag_and_invalidates_cached_details(memory_session, fake_mongo, new_listing):
+    cache = LRUCache(max_bytes=1 << 20, max_entries=100, ttl_seconds=60)
+    service = PropertyService(memory_session, fake_mongo, cache=cache)
+    created = asyncio.run(service.create_property(new_listing(), consistent=True))
+    asyncio.run(service.update_property(created.id, {"details": {"bedrooms": 5}}))
+
+    # Read between the commit and the sync: cached with the old document
+    assert asyncio.run(service.get_property_by_id(created.id)).details.bedrooms == 2
+    worker = make_worker(memory_session, fake_mongo, cache=cache, fetches=None)
+    asyncio.run(worker.refresh_lag(memory_session))
+    assert worker.stats.pending == 1 and worker.stats.lag_seconds >= 0
+
+    asyncio.run(worker.drain_once())
+
+    assert worker.stats.pending == 0 and worker.stats.lag_seconds == 0
+    assert asyncio.run(service.get_property_by_id(created.id)).details.bedrooms == 5
+
+
+def test_worker_task_drains_when_notified(memory_session, fake_mongo, new_listing):
+    service = PropertyService(memory_session, fake_mongo, cache=None)
+    created = asyncio.run(service.create_property(new_listing()))
+    worker = make_worker(memory_session, fake_mongo, cache=None, fetches=None, poll_interval=60)
+
+    async def run():
+        worker.start()
+        worker.notify()
+        for _ in range(100):
+            if fake_mongo.properties.documents:
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+
+    asyncio.run(run())
+    assert fake_mongo.properties.documents[0]["_id"] == str(created.id)
+
+
+def test_rows_behind_one_held_by_another_worker_wait(memory_session, fake_mongo, monkeypatch):
+    held, other = uuid4(), uuid4()
+    held_entry = enqueue(memory_session, held, "insert", {"title": "Held"})
+    enqueue(memory_session, held, "update", {"title": "Held, renamed"})
+    enqueue(memory_session, other, "insert", {"title": "Other"})
+    asyncio.run(memory_session.commit())
+
+    # SQLite cannot lock rows; leave the first one out as SKIP LOCKED would on PostgreSQL
+    pending_query = outbox._pending_query
+    monkeypatch.setattr(outbox, "_pending_query", lambda now, batch_size: pending_query(
+        now, batch_size).filter(PropertyOutbox.id != held_entry.id))
+
+    assert asyncio.run(apply_pending(memory_session, fake_mongo.properties)) == [other]
+    assert pending(memory_session) == 2
+    assert "FOR UPDATE SKIP LOCKED" in str(pending_query(datetime.utcnow(), 10).compile(dialect=postgresql.dialect()))
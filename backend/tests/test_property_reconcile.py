@@ -0,0 +1,103 @@
+import asyncio
+from uuid import UUID, uuid4
+
+from sqlalchemy import select
+
+from app.properties.models import Property, PropertyOutbox
+from app.properties.outbox import apply_pending, enqueue
+from app.properties.reconcile import ReconcileReport, reconcile
+
+
+def add_row(session, title="Garden flat", price=250000, property_id=None):
+    property_id = property_id or uuid4()
+    session.add(Property(
+        id=property_id, user_id=uuid4(), title=title,
+        property_type="apartment", price=price, status="available",
+    ))
+    return property_id
+
+
+def add_document(mongo, property_id, title="Garden flat", price=250000):
+    mongo.properties.documents.append({
+        "_id": str(property_id), "title": title, "property_type": "apartment",
+        "price": price, "status": "available",
+    })
+
+
+def seed_drift(session, mongo):
+    in_sync = add_row(session)
+    add_document(mongo, in_sync)
+    renamed = add_row(session, title="Renovated garden flat", price=275000)
+    add_document(mongo, renamed)
+    no_document = add_row(session)
+    orphan = uuid4()
+    add_document(mongo, orphan)
+    asyncio.run(session.commit())
+    return {"in_sync": in_sync, "renamed": renamed, "no_document": no_document, "orphan": orphan}
+
+
+def run(session, mongo, **kwargs):
+    issues = []
+    report = asyncio.run(reconcile(session, mongo, on_issue=issues.append, **kwargs))
+    return report, {UUID(i["property_id"]): i for i in issues}
+
+
+def test_reports_missing_and_diverged_records(memory_session, fake_mongo):
+    ids = seed_drift(memory_session, fake_mongo)
+
+    report, issues = run(memory_session, fake_mongo, batch_size=2)
+
+    assert (report.checked, report.missing_in_mongo, report.missing_in_sql, report.mismatched) == (4, 1, 1, 1)
+    assert report.checkpoint is None
+    assert issues[ids["no_document"]]["issue"] == "missing_in_mongo"
+    assert issues[ids["orphan"]]["issue"] == "missing_in_sql"
+    assert issues[ids["renamed"]]["fields"] == {
+        "title": {"sql": "Renovated garden flat", "mongo": "Garden flat"},
+        "price": {"sql": 275000, "mongo": 250000},
+    }
+    assert ids["in_sync"] not in issues
+
+
+def test_scan_reads_in_batches_and_resumes_from_a_checkpoint(memory_session, fake_mongo):
+    for _ in range(10):
+        property_id = add_row(memory_session)
+        add_document(fake_mongo, property_id)
+    asyncio.run(memory_session.commit())
+    checkpoints = []
+
+    report, _ = run(memory_session, fake_mongo, batch_size=3,
+                    on_checkpoint=lambda r: checkpoints.append(r.checkpoint))
+
+    assert report.checked == 10
+    assert len(checkpoints) == 4 and checkpoints[-1] is None
+    # Each Mongo query is bounded by the batch size
+    assert fake_mongo.properties.calls["find"] == 4
+
+    resumed, _ = run(memory_session, fake_mongo, batch_size=3, start_after=UUID(checkpoints[1]),
+                     report=ReconcileReport(checked=6))
+    assert resumed.checked == 10
+
+
+def test_pending_syncs_are_not_reported(memory_session, fake_mongo):
+    property_id = add_row(memory_session)
+    enqueue(memory_session, property_id, "insert", {"title": "Garden flat"})
+    asyncio.run(memory_session.commit())
+
+    report, issues = run(memory_session, fake_mongo)
+
+    assert (report.missing_in_mongo, report.in_flight, issues) == (0, 1, {})
+
+
+def test_repair_queues_fixes_through_the_outbox(memory_session, fake_mongo):
+    ids = seed_drift(memory_session, fake_mongo)
+
+    report, _ = run(memory_session, fake_mongo, repair=True)
+    assert report.repaired == 2
+    operations = asyncio.run(memory_session.execute(
+        select(PropertyOutbox.property_id, PropertyOutbox.operation)
+    )).all()
+    assert sorted(operations) == sorted([(ids["renamed"], "update"), (ids["orphan"], "delete")])
+
+    asyncio.run(apply_pending(memory_session, fake_mongo.properties))
+    report, issues = run(memory_session, fake_mongo)
+    assert list(issues) == [ids["no_document"]]
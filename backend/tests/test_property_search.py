@@ -0,0 +1,224 @@
+import asyncio
+
+import pytest
+
+from app.properties.pagination import InvalidCursorError
+from app.properties.schema import PageParams
+from app.properties.search import split_filters
+from app.properties.services import PropertyService
+
+
+def search(session, mongo, filters, page=None):
+    return asyncio.run(PropertyService(session, mongo).search_properties(filters, page)).items
+
+
+def test_split_filters_routes_predicates_to_each_store():
+    sql_filters, mongo_filter = split_filters({
+        "property_type": "house",
+        "max_price": 500000,
+        "location": "Msasani",
+        "min_bedrooms": 3,
+        "pool": True,
+        "amenities.pets_allowed": False,
+    })
+
+    assert sql_filters == {"property_type": "house", "max_price": 500000}
+    assert mongo_filter == {"$and": [
+        {"$or": [{"location.address": "Msasani"}, {"location.street_address": "Msasani"}]},
+        {"details.bedrooms": {"$gte": 3}},
+        {"features.pool": True},
+        {"amenities.pets_allowed": False},
+    ]}
+
+
+def test_split_filters_rejects_unknown_keys():
+    with pytest.raises(ValueError):
+        split_filters({"bedrooms; drop": 3})
+
+
+def test_nested_filters_are_evaluated_in_mongo(memory_session, fake_mongo, add_listing):
+    wanted = add_listing(details={"bedrooms": 4}, features={"pool": True})
+    add_listing(details={"bedrooms": 4}, features={"pool": False})
+    add_listing(details={"bedrooms": 2}, features={"pool": True})
+
+    results = search(memory_session, fake_mongo, {"min_bedrooms": 3, "pool": True})
+
+    assert [r.id for r in results] == [wanted]
+    # Estimate, matching ids, then the documents for the page
+    assert fake_mongo.properties.round_trips == 3
+
+
+def test_selective_sql_side_drives_the_mongo_lookup(memory_session, fake_mongo, add_listing):
+    for _ in range(5):
+        add_listing(features={"pool": True})
+    wanted = add_listing(property_type="land", features={"pool": True})
+
+    results = search(memory_session, fake_mongo, {"property_type": "land", "pool": True})
+
+    assert [r.id for r in results] == [wanted]
+
+
+def test_location_match_is_case_insensitive(memory_session, fake_mongo, add_listing):
+    wanted = add_listing(location={
+        "address": "12 Ocean Drive", "street_address": "Msasani Road", "coordinates": {"lat": 0, "lng": 0},
+    })
+    add_listing()
+
+    results = search(memory_session, fake_mongo, {"location": "MSASANI ROAD"})
+
+    assert [r.id for r in results] == [wanted]
+
+
+def walk_pages(session, mongo, filters, **page_args):
+    service = PropertyService(session, mongo)
+    pages, cursor = [], None
+    while True:
+        page = asyncio.run(service.search_properties(filters, PageParams(cursor=cursor, **page_args)))
+        pages.append(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+def test_cursor_pages_cover_every_match_exactly_once(memory_session, fake_mongo, add_listing):
+    ids = {add_listing(price=100000 + i % 7) for i in range(23)}
+
+    pages = walk_pages(memory_session, fake_mongo, {}, page_size=5, sort="price", order="asc")
+
+    assert [len(p) for p in pages] == [5, 5, 5, 5, 3]
+    seen = [item.id for p in pages for item in p]
+    assert set(seen) == ids and len(seen) == len(ids)
+    prices = [item.price for p in pages for item in p]
+    assert prices == sorted(prices)
+
+
+def test_cursor_pages_skip_rows_filtered_out_in_mongo(memory_session, fake_mongo, add_listing):
+    wanted = set()
+    for i in range(30):
+        listing_id = add_listing(features={"pool": i % 3 == 0})
+        if i % 3 == 0:
+            wanted.add(listing_id)
+    # Push the plan onto the SQL-driven path regardless of the Mongo estimate
+    for _ in range(3):
+        add_listing(property_type="land", features={"pool": True})
+
+    pages = walk_pages(memory_session, fake_mongo, {"property_type": "house", "pool": True}, page_size=4)
+
+    seen = [item.id for p in pages for item in p]
+    assert set(seen) == wanted and len(seen) == len(wanted)
+
+
+def test_deep_pages_issue_the_same_queries_as_the_first(memory_session, fake_mongo, add_listing, sql_statements):
+    for _ in range(50):
+        add_listing()
+    service = PropertyService(memory_session, fake_mongo)
+
+    sql_statements.clear()
+    first = asyncio.run(service.search_properties({}, PageParams(page_size=5)))
+    first_page_queries = list(sql_statements)
+
+    cursor = first.next_cursor
+    for _ in range(8):
+        cursor = asyncio.run(service.search_properties({}, PageParams(page_size=5, cursor=cursor))).next_cursor
+    sql_statements.clear()
+    asyncio.run(service.search_properties({}, PageParams(page_size=5, cursor=cursor)))
+
+    assert len(sql_statements) == len(first_page_queries) == 1
+    # Seeks past the cursor instead of skipping rows
+    assert "(properties.created_at, properties.id) < (?, ?)" in sql_statements[0]
+
+
+def test_cursor_from_another_ordering_is_rejected(memory_session, fake_mongo, add_listing):
+    for _ in range(3):
+        add_listing()
+    service = PropertyService(memory_session, fake_mongo)
+    cursor = asyncio.run(service.search_properties({}, PageParams(page_size=1, sort="price"))).next_cursor
+
+    with pytest.raises(InvalidCursorError):
+        asyncio.run(service.search_properties({}, PageParams(page_size=1, cursor=cursor)))
+    with pytest.raises(InvalidCursorError):
+        asyncio.run(service.search_properties({}, PageParams(cursor="not-a-cursor")))
+
+
+def add_located_listing(add_listing, lat, lng, **kwargs):
+    return add_listing(location={"address": "Somewhere", "coordinates": {"lat": lat, "lng": lng}}, **kwargs)
+
+
+def test_radius_search_is_sorted_by_distance_and_honours_sql_filters(memory_session, fake_mongo, add_listing):
+    # Roughly 1.1 km per 0.01 degree of latitude
+    at_centre = add_located_listing(add_listing, -6.80, 39.28)
+    near = add_located_listing(add_listing, -6.80, 39.281)
+    nearest = add_located_listing(add_listing, -6.80, 39.2801)
+    add_located_listing(add_listing, -6.80, 39.2802, property_type="land")
+    add_located_listing(add_listing, -7.50, 39.28)  # ~78 km away
+
+    results = search(memory_session, fake_mongo, {
+        "near_lat": -6.80, "near_lng": 39.2800, "radius_km": 5, "property_type": "house",
+    })
+
+    assert [r.id for r in results] == [at_centre, nearest, near]
+    assert results[0].distance_km == 0
+    assert 0.10 < results[2].distance_km < 0.12
+
+
+def test_radius_search_pages_through_tied_distances(memory_session, fake_mongo, add_listing):
+    ids = {add_located_listing(add_listing, -6.8, 39.28) for _ in range(7)}
+    ids.add(add_located_listing(add_listing, -6.8, 39.29))
+
+    pages = walk_pages(
+        memory_session, fake_mongo, {"near_lat": -6.8, "near_lng": 39.28, "radius_km": 10}, page_size=3
+    )
+
+    seen = [item.id for p in pages for item in p]
+    assert set(seen) == ids and len(seen) == len(ids)
+
+
+def test_bbox_search(memory_session, fake_mongo, add_listing):
+    inside = add_located_listing(add_listing, -6.80, 39.28)
+    add_located_listing(add_listing, -6.70, 39.28)
+
+    results = search(memory_session, fake_mongo, {"bbox": "39.2,-6.85,39.3,-6.75"})
+
+    assert [r.id for r in results] == [inside]
+    with pytest.raises(ValueError):
+        search(memory_session, fake_mongo, {"bbox": "39.3,-6.85,39.2,-6.75"})
+
+
+def test_update_and_delete_keep_the_geo_point_in_sync(memory_session, fake_mongo, add_listing):
+    listing_id = add_located_listing(add_listing, -6.80, 39.28)
+    service = PropertyService(memory_session, fake_mongo)
+    moved = {"address": "Somewhere else", "coordinates": {"lat": -3.37, "lng": 36.68}}
+
+    asyncio.run(service.update_property(listing_id, {"location": moved, "price": 250000}, consistent=True))
+
+    document = fake_mongo.properties.documents[0]
+    assert document["geo"] == {"type": "Point", "coordinates": [36.68, -3.37]}
+    assert document["price"] == 250000
+    assert search(memory_session, fake_mongo, {"near_lat": -6.8, "near_lng": 39.28, "radius_km": 5}) == []
+
+    assert asyncio.run(service.delete_property(listing_id, consistent=True)) is True
+    assert fake_mongo.properties.documents == []
+
+
+def test_map_clusters_group_listings_per_cell(memory_session, fake_mongo, add_listing):
+    # Zoom 10 cells are ~0.088 degrees wide
+    for i in range(8):
+        add_located_listing(add_listing, -6.80 + i * 0.001, 39.28, price=100000 + i)
+    sparse = add_located_listing(add_listing, -6.70, 39.10, price=50000)
+    add_located_listing(add_listing, -6.70, 39.10, property_type="land")
+    add_located_listing(add_listing, -1.28, 36.82)  # outside the viewport
+    service = PropertyService(memory_session, fake_mongo)
+
+    result = asyncio.run(service.get_map_clusters({"bbox": "39.0,-7.0,39.5,-6.5", "property_type": "house"}, 10))
+
+    cells = sorted(result.clusters, key=lambda c: c.count)
+    assert [c.count for c in cells] == [1, 8]
+    assert cells[0].pins[0].id == sparse
+    assert cells[1].pins == []
+    assert (cells[1].min_price, cells[1].max_price) == (100000, 100007)
+    assert -6.80 < cells[1].lat < -6.79
+    # Everything happened inside a single aggregation
+    assert fake_mongo.properties.round_trips == 1
+
+    with pytest.raises(ValueError):
+        asyncio.run(service.get_map_clusters({}, 10))
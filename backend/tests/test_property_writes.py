@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from pymongo.errors import PyMongoError
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from app.core.cache import LRUCache
+from app.properties.models import Property, PropertyOutbox
+from app.properties.services import PropertyService
+
+
+def count_rows(session):
+    return asyncio.run(session.scalar(select(func.count()).select_from(Property)))
+
+
+def test_create_property_only_waits_on_sql(memory_session, fake_mongo, new_listing, sql_statements):
+    service = PropertyService(memory_session, fake_mongo, cache=None)
+
+    sql_statements.clear()
+    created = asyncio.run(service.create_property(new_listing()))
+
+    # The property row and its outbox entry, in one transaction; Mongo is left to the worker
+    assert [s.split()[0] for s in sql_statements] == ["INSERT", "INSERT"]
+    assert fake_mongo.properties.round_trips == 0
+    assert created.location.address == "Msasani Road"
+    assert created.details.bedrooms == 2
+    assert created.status == "available"
+    assert created.created_at is not None
+    assert asyncio.run(memory_session.scalar(select(func.count()).select_from(PropertyOutbox))) == 1
+
+
+def test_consistent_create_is_readable_immediately(memory_session, fake_mongo, new_listing):
+    service = PropertyService(memory_session, fake_mongo, cache=None)
+
+    created = asyncio.run(service.create_property(new_listing(), consistent=True))
+
+    assert fake_mongo.properties.calls["bulk_write"] == 1
+    document = fake_mongo.properties.documents[0]
+    assert document["_id"] == str(created.id)
+    assert document["status"] == "available"
+    assert asyncio.run(memory_session.scalar(select(func.count()).select_from(PropertyOutbox))) == 0
+    # The response matches what a later read returns
+    assert asyncio.run(service.get_property_by_id(created.id)) == created
+
+
+def test_update_response_shows_the_update_before_it_syncs(memory_session, fake_mongo, new_listing):
+    cache = LRUCache(max_bytes=1 << 20, max_entries=100, ttl_seconds=60)
+    service = PropertyService(memory_session, fake_mongo, cache=cache)
+    created = asyncio.run(service.create_property(new_listing(), consistent=True))
+
+    updated = asyncio.run(service.update_property(created.id, {"title": "new", "details": {"bedrooms": 5}}))
+
+    assert fake_mongo.properties.documents[0]["details"]["bedrooms"] == 2  # the outbox has not run
+    assert (updated.title, updated.details.bedrooms, updated.location) == ("new", 5, created.location)
+    assert len(cache) == 0
+
+
+def test_create_succeeds_while_mongo_is_down(memory_session, fake_mongo, new_listing):
+    async def bulk_write(requests, ordered=True):
+        raise PyMongoError("mongo unavailable")
+
+    fake_mongo.properties.bulk_write = bulk_write
+    service = PropertyService(memory_session, fake_mongo, cache=None)
+
+    created = asyncio.run(service.create_property(new_listing(), consistent=True))
+
+    assert count_rows(memory_session) == 1
+    entry = asyncio.run(memory_session.scalar(select(PropertyOutbox)))
+    assert entry.property_id == created.id
+    assert entry.attempts == 1
+    assert "mongo unavailable" in entry.last_error
+
+
+def test_failed_sql_commit_leaves_nothing_to_sync(memory_session, fake_mongo, new_listing, monkeypatch):
+    async def commit():
+        raise OperationalError("COMMIT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(memory_session, "commit", commit)
+    service = PropertyService(memory_session, fake_mongo, cache=None)
+
+    with pytest.raises(OperationalError):
+        asyncio.run(service.create_property(new_listing()))
+    assert fake_mongo.properties.documents == []
+    assert count_rows(memory_session) == 0
+    assert asyncio.run(memory_session.scalar(select(func.count()).select_from(PropertyOutbox))) == 0
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.core.query_stats import (
+    QueryBudgetExceeded,
+    QueryStatsMiddleware,
+    install_sql_listeners,
+    mongo_command_listener,
+    mongo_shape,
+    sql_shape,
+    track_queries,
+)
+from app.properties.services import PropertyService
+
+install_sql_listeners()
+
+
+def test_sql_shape_collapses_values_and_placeholder_lists():
+    first = sql_shape("SELECT * FROM properties\n WHERE id IN (?, ?, ?) AND price > 100 AND title = 'a'")
+    second = sql_shape("SELECT * FROM properties WHERE id IN ($1, $2) AND price > 250000 AND title = 'b'")
+
+    assert first == second == "SELECT * FROM properties WHERE id IN (?) AND price > ? AND title = ?"
+    assert sql_shape("INSERT INTO t (a, b) VALUES (?, ?), (?, ?)") == "INSERT INTO t (a, b) VALUES (?)"
+    assert sql_shape("SELECT x::text FROM t WHERE y = :y_1") == "SELECT x::text FROM t WHERE y = ?"
+
+
+def test_mongo_shape_keeps_the_filter_keys_only():
+    one = mongo_shape("find", {"find": "properties", "filter": {"_id": {"$in": ["a", "b"]}}})
+    other = mongo_shape("find", {"find": "properties", "filter": {"_id": {"$in": ["c"]}}})
+
+    assert one == other == "find properties {_id: {$in: ?}}"
+    assert mongo_shape("aggregate", {"aggregate": "properties", "pipeline": [{"$match": {}}, {"$limit": 5}]}) \
+        == "aggregate properties [$match, $limit]"
+
+
+def test_service_call_fits_a_constant_budget(memory_session, fake_mongo, add_listing):
+    user_id = uuid4()
+    for i in range(25):
+        add_listing(title=f"Listing {i}", price=100000 + i, user_id=user_id)
+
+    with track_queries(max_queries=2, max_repeats=1) as stats:
+        page = asyncio.run(PropertyService(memory_session, fake_mongo).get_user_properties(user_id))
+
+    assert len(page.items) == 20
+    assert (stats.sql, stats.mongo) == (1, 1)
+
+
+def test_budget_failure_names_the_repeated_shape(memory_session, fake_mongo, add_listing):
+    for _ in range(5):
+        add_listing()
+    ids = [document["_id"] for document in fake_mongo.properties.documents]
+
+    async def one_lookup_per_row():
+        for property_id in ids:
+            await fake_mongo.properties.find_one({"_id": property_id})
+
+    with pytest.raises(QueryBudgetExceeded, match=r"5x mongo: find_one properties \{_id: \?\}"):
+        with track_queries(max_repeats=1):
+            asyncio.run(one_lookup_per_row())
+
+
+def test_mongo_listener_charges_the_current_block():
+    started = SimpleNamespace(command_name="find", command={"find": "properties", "filter": {"_id": "x"}})
+
+    mongo_command_listener.started(started)  # outside any request: ignored
+    with track_queries() as stats:
+        mongo_command_listener.started(started)
+        mongo_command_listener.succeeded(SimpleNamespace(duration_micros=1500))
+
+    assert (stats.mongo, stats.shapes["mongo: find properties {_id: ?}"]) == (1, 1)
+    assert stats.mongo_seconds == pytest.approx(0.0015)
+
+
+def test_middleware_reports_queries_and_warns_on_repeats(caplog):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    api = FastAPI()
+    api.add_middleware(QueryStatsMiddleware, warn_threshold=3)
+
+    @api.get("/rows/{count}")
+    def rows(count: int):
+        with engine.connect() as connection:
+            for i in range(count):
+                connection.execute(text("SELECT :i"), {"i": i})
+        return {"ok": True}
+
+    with caplog.at_level(logging.WARNING, logger="app.core.query_stats"):
+        with TestClient(api) as client:
+            few = client.get("/rows/2")
+            many = client.get("/rows/6")
+    engine.dispose()
+
+    assert few.headers["X-DB-Queries"] == "2"
+    assert many.headers["X-DB-Queries"] == "6"
+    assert many.headers["Server-Timing"].startswith("sql;dur=")
+    assert 'desc="6 queries"' in many.headers["Server-Timing"]
+    warnings = [record.getMessage() for record in caplog.records if record.name == "app.core.query_stats"]
+    assert warnings == ["Possible N+1 on GET /rows/{count}: 6x sql: SELECT ?"]
@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+
+from app.core.singleflight import SingleFlight
+from app.properties.services import PropertyService
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    executions = []
+
+    async def fetch():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        return "listing"
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("key", fetch) for _ in range(20)))
+
+    results = asyncio.run(scenario())
+    assert results == ["listing"] * 20
+    assert len(executions) == 1
+    assert flights.as_dict() == {"calls": 20, "executions": 1, "coalesced": 19, "in_flight": 0}
+
+
+def test_exception_is_delivered_to_every_waiter():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("backend down")
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("key", fetch) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flights.executions == 1
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_fetch():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return 42
+
+    async def scenario():
+        first = asyncio.ensure_future(flights.do("key", fetch))
+        second = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == 42
+
+
+def test_completed_flight_is_not_reused():
+    flights = SingleFlight()
+
+    async def fetch():
+        return object()
+
+    async def scenario():
+        return await flights.do("key", fetch), await flights.do("key", fetch)
+
+    first, second = asyncio.run(scenario())
+    assert first is not second
+    assert flights.coalesced == 0
+
+
+@pytest.mark.parametrize("concurrency", [1, 50])
+def test_hot_listing_reads_hit_the_backends_once(memory_session, fake_mongo, add_listing, sql_statements,
+                                                 concurrency):
+    property_id = add_listing(title="Featured villa", price=900000)
+    flights = SingleFlight()
+    service = PropertyService(memory_session, fake_mongo, cache=None, fetches=flights)
+
+    async def scenario():
+        return await asyncio.gather(*(service.get_property_by_id(property_id) for _ in range(concurrency)))
+
+    sql_statements.clear()
+    results = asyncio.run(scenario())
+
+    assert all(result.title == "Featured villa" for result in results)
+    assert (len(sql_statements), fake_mongo.properties.round_trips) == (1, 1)
+    assert flights.coalesced == concurrency - 1
+
+
+def test_sql_and_mongo_lookups_overlap(memory_session, fake_mongo, add_listing):
+    property_id = add_listing(title="Garden cottage", price=120000)
+
+    events = []
+    original_find_one = fake_mongo.properties.find_one
+
+    async def find_one(*args, **kwargs):
+        events.append("mongo sent")
+        return await original_find_one(*args, **kwargs)
+
+    def sql_sent(conn, cursor, statement, parameters, context, executemany):
+        events.append("sql sent")
+
+    def sql_done(conn, cursor, statement, parameters, context, executemany):
+        events.append("sql done")
+
+    fake_mongo.properties.find_one = find_one
+    bind = memory_session.bind.sync_engine
+    event.listen(bind, "before_cursor_execute", sql_sent)
+    event.listen(bind, "after_cursor_execute", sql_done)
+    try:
+        service = PropertyService(memory_session, fake_mongo, cache=None, fetches=None)
+        result = asyncio.run(service.get_property_by_id(property_id))
+    finally:
+        event.remove(bind, "before_cursor_execute", sql_sent)
+        event.remove(bind, "after_cursor_execute", sql_done)
+
+    assert result.title == "Garden cottage"
+    # Mongo was queried while the SQL statement was still in flight
+    assert events == ["sql sent", "mongo sent", "sql done"]
+
+
+class RequestSession:
+    """A request's session that, like one closed by get_db, fails any query still running once closed."""
+
+    def __init__(self, session):
+        self._session = session
+        self.closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    async def scalar(self, statement):
+        await asyncio.sleep(0.02)
+        if self.closed:
+            raise InvalidRequestError("session closed by get_db")
+        return await self._session.scalar(statement)
+
+    async def close(self):
+        self.closed = True
+
+
+def test_cancelled_first_caller_does_not_break_the_shared_fetch(memory_session, fake_mongo, add_listing):
+    property_id = add_listing(title="Featured villa")
+    flights = SingleFlight()
+
+    async def request(wait_before=0.0):
+        await asyncio.sleep(wait_before)
+        session = RequestSession(memory_session)
+        try:
+            service = PropertyService(session, fake_mongo, cache=None, fetches=flights)
+            return await service.get_property_by_id(property_id)
+        finally:
+            await session.close()
+
+    async def scenario():
+        first = asyncio.ensure_future(request())
+        second = asyncio.ensure_future(request(wait_before=0.001))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        return await second
+
+    result = asyncio.run(scenario())
+    assert result is not None and result.title == "Featured villa"
+    assert flights.coalesced == 1